@@ -0,0 +1,105 @@
+import re
+from bisect import bisect_left, bisect_right
+
+# shared structure for the "percent nearest an anchor phrase" fields: a joined
+# window of text is scanned once for sentence ends and percent tokens, and
+# every field query (anchor -> its sentence -> nearest percent) is answered
+# from those positions instead of re-scanning slices of the text per field
+
+PCT_ANY = re.compile(r"\(?(<?\d{1,3}(?:\.\d+)?)\s*%\)?")
+SENT_BOUNDARY = re.compile(r"[.!?\n]")
+
+
+class AnchorWindow:
+    def __init__(self, text):
+        self.text = text
+        self.boundaries = [m.start() for m in SENT_BOUNDARY.finditer(text)]
+        pcts = list(PCT_ANY.finditer(text))
+        self.pct_starts = [m.start() for m in pcts]
+        self.pct_ends = [m.end() for m in pcts]
+        self.pct_values = [m.group(1) for m in pcts]
+        self.anchors = {}  # pattern -> first match in text
+
+    # first match of an anchor pattern, searched once per window
+    def find(self, pat):
+        if pat not in self.anchors:
+            self.anchors[pat] = pat.search(self.text)
+        return self.anchors[pat]
+
+    # (start, end) of the sentence around a match, at most max_chars out on
+    # either side; same span as scanning the chunks for a boundary
+    def sentence_span(self, m, max_chars):
+        a0, a1 = m.start(), m.end()
+        left_limit = max(0, a0 - max_chars)
+        i = bisect_left(self.boundaries, a0)
+        if i and self.boundaries[i - 1] >= left_limit:
+            start = self.boundaries[i - 1] + 1
+        else:
+            start = left_limit
+        right_limit = min(len(self.text), a1 + max_chars)
+        j = bisect_left(self.boundaries, a1)
+        if j < len(self.boundaries) and self.boundaries[j] < right_limit:
+            end = self.boundaries[j] + 1
+        else:
+            end = right_limit
+        return start, end
+
+    # group(1) of every PCT_ANY match in text[start:end]; the whole-text
+    # tokens give the same answer unless one is cut by the slice, in which
+    # case the slice is scanned the old way
+    def percents(self, start, end):
+        i = bisect_left(self.pct_starts, start)
+        j = bisect_left(self.pct_starts, end)
+        if (i and self.pct_ends[i - 1] > start) or (j > i and self.pct_ends[j - 1] > end):
+            return [m.group(1) for m in PCT_ANY.finditer(self.text[start:end])]
+        return self.pct_values[i:j]
+
+    # the sentence an anchor sits in, as (sentence start, sentence, match of
+    # the anchor in the sentence), or None if the anchor or sentence fails
+    def anchor_sentence(self, anchor_pat, max_chars, require_pat=None, block_pat=None):
+        m = self.find(anchor_pat)
+        if not m:
+            return None
+        start, end = self.sentence_span(m, max_chars)
+        sentence = self.text[start:end]
+        if not sentence:
+            return None
+        if require_pat and not require_pat.search(sentence):
+            return None
+        if block_pat and block_pat.search(sentence):
+            return None
+        m2 = anchor_pat.search(sentence)
+        if not m2:
+            return None
+        return start, sentence, m2
+
+    # last percent in the tail_chars before the anchor
+    def pct_before(self, found, tail_chars):
+        start, _sentence, m2 = found
+        end = start + m2.start()
+        hits = self.percents(max(start, end - tail_chars) if tail_chars > 0 else start, end)
+        return hits[-1] if hits else None
+
+    # first percent after the anchor, up to stop_pat
+    def pct_after(self, found, stop_pat=None):
+        start, sentence, m2 = found
+        forward = sentence[m2.end():]
+        if stop_pat:
+            s = stop_pat.search(forward)
+            if s:
+                forward = forward[:s.start()]
+        hits = self.percents(start + m2.end(), start + m2.end() + len(forward))
+        return hits[0] if hits else None
+
+
+_current = (None, None)
+
+
+# window for a text, kept while the same string is queried field after field
+def anchor_window(text):
+    global _current
+    current, window = _current
+    if current is not text:
+        window = AnchorWindow(text)
+        _current = (text, window)
+    return window
@@ -0,0 +1,80 @@
+import argparse
+import contextlib
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+# parity check and throughput for the pdf backends (see pdf_backend): every
+# backend runs all four extractors over the same reports, each csv has to be
+# byte-identical to the pdfplumber one
+#
+#   python benchmarks/backend_parity.py                       # generated reports
+#   python benchmarks/backend_parity.py --folder "Grad Reports"
+#
+# exits 1 if any backend's csvs differ from the reference
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pdf_backend
+import report_engine
+from make_reports import make_reports
+
+
+def count_pages(folder):
+    pages = 0
+    for _year, path in report_engine.report_files(folder):
+        with pdf_backend.open_pdf(path) as pdf:
+            pages += len(pdf.pages)
+    return pages
+
+
+# csv paths written by one backend, and its run time in seconds
+def run_backend(folder, backend, out_dir):
+    out_paths = {name: os.path.join(out_dir, mod.CSV_NAME)
+                 for name, mod in report_engine.load_extractors()}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        report_engine.run_extractors(folder, out_paths, backend=backend)
+        seconds = time.perf_counter() - start
+    return out_paths, seconds
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="check the pdf backends give identical csvs")
+    ap.add_argument("--folder", help="folder of reports (default: generated ones)")
+    ap.add_argument("--pages", type=int, default=50, help="pages per generated report")
+    ap.add_argument("--reports", type=int, default=2, help="generated reports")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if folder is None:
+            folder = os.path.join(tmp, "reports")
+            make_reports(folder, args.pages, args.reports)
+        pages = count_pages(folder)
+
+        print(f"{'backend':<12}{'pages':>7}{'sec':>9}{'pages/s':>10}{'speedup':>9}  csvs")
+        reference = None
+        failed = False
+        for backend in pdf_backend.BACKENDS:
+            out_dir = os.path.join(tmp, backend)
+            os.makedirs(out_dir)
+            out_paths, seconds = run_backend(folder, backend, out_dir)
+            if reference is None:
+                reference = (out_paths, seconds)
+                verdict = "reference"
+            else:
+                differ = [os.path.basename(path) for name, path in out_paths.items()
+                          if not filecmp.cmp(path, reference[0][name], shallow=False)]
+                failed = failed or bool(differ)
+                verdict = "DIFFER " + ", ".join(differ) if differ else "identical"
+            print(f"{backend:<12}{pages:>7}{seconds:>9.2f}{pages / seconds:>10.1f}"
+                  f"{reference[1] / seconds:>9.2f}  {verdict}", flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# line reconstruction micro-benchmark: the dict-based _group_rows against the
+# numpy _group_rows_np on the words of generated report pages, for the three
+# views week3 builds per page (all words, left column, right column)
+#
+#   python benchmarks/bench_lines.py [--pages 100] [--repeat 20] [--scale 1]
+#
+# --scale N repeats every page's words N times down the page, for a feel of
+# denser pages than the generator writes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import page_layout
+from make_reports import make_reports
+
+
+def load_pages(pages_per_report, scale):
+    import pdfplumber
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_reports(tmp, pages_per_report, 1)[0]
+        with pdfplumber.open(path) as pdf:
+            pages = []
+            for page in pdf.pages:
+                words = page.extract_words(use_text_flow=True)
+                height = float(page.height)
+                words = [dict(w, top=w["top"] + k * height) for k in range(scale) for w in words]
+                pages.append((float(page.width), page_layout.store_from_words(words)))
+                page_layout.release_page(page)
+    return pages
+
+
+def run_dict(pages):
+    for width, words in pages:
+        mid = width / 2.0
+        page_layout._group_rows(words, 2.0, None, None)
+        page_layout._group_rows(words, 2.0, None, mid)
+        page_layout._group_rows(words, 2.0, mid, None)
+
+
+def run_numpy(pages):
+    for width, words in pages:
+        mid = width / 2.0
+        page_layout._group_rows_np(words, 2.0, None, None)
+        page_layout._group_rows_np(words, 2.0, None, mid)
+        page_layout._group_rows_np(words, 2.0, mid, None)
+
+
+def best_of(fn, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(pages)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="compare the dict and numpy line builders")
+    ap.add_argument("--pages", type=int, default=100, help="pages in the generated report")
+    ap.add_argument("--repeat", type=int, default=20, help="runs per builder, best is kept")
+    ap.add_argument("--scale", type=int, default=1, help="copies of each page's words")
+    args = ap.parse_args(argv)
+
+    pages = load_pages(args.pages, args.scale)
+    n_words = sum(len(words) for _width, words in pages)
+
+    # both builders have to agree before their times mean anything
+    as_tuples = lambda lines: [(o.y, o.text, o.x0, o.x1) for o in lines]
+    for width, words in pages:
+        for lo, hi in ((None, None), (None, width / 2.0), (width / 2.0, None)):
+            if (as_tuples(page_layout._group_rows(words, 2.0, lo, hi))
+                    != as_tuples(page_layout._group_rows_np(words, 2.0, lo, hi))):
+                raise SystemExit("builders disagree")
+
+    print(f"{len(pages)} pages, {n_words / len(pages):.0f} words per page")
+    print(f"{'builder':<10}{'ms':>10}{'us/page':>10}")
+    for name, fn in (("dict", run_dict), ("numpy", run_numpy)):
+        seconds = best_of(fn, pages, args.repeat)
+        print(f"{name:<10}{seconds * 1000:>10.1f}{seconds * 1e6 / len(pages):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import os
+import random
+import sys
+import textwrap
+
+# writes synthetic graduate-outcome style reports as real PDFs, stdlib only
+# every unit gets a header page, a Type of Degree table, an internship page
+# with pie-chart labels and a nature of position page (two columns for 2020+);
+# the first unit also gets a geographic summary
+#
+#   python benchmarks/make_reports.py OUT_DIR [PAGES_PER_REPORT] [REPORTS]
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from unit_names import UNIT_ORDER
+
+PAGE_WIDTH = 612.0
+PAGE_HEIGHT = 792.0
+FONT_SIZE = 9.0
+LINE_HEIGHT = 14.0
+YEARS = [2016, 2018, 2019, 2020, 2021, 2023]
+
+# pages one unit takes without filler (header, cont ed, internship, nature)
+PAGES_PER_UNIT = 4
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+# content stream for one page; columns are (x, wrap width in chars, lines)
+def _page_stream(columns):
+    ops = ["BT", f"/F1 {FONT_SIZE:g} Tf"]
+    for x, wrap, lines in columns:
+        top = 40.0
+        for line in lines:
+            for part in textwrap.wrap(line, wrap) or [""]:
+                y = PAGE_HEIGHT - top - FONT_SIZE
+                ops.append(f"1 0 0 1 {x:g} {y:g} Tm ({_escape(part)}) Tj")
+                top += LINE_HEIGHT
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_pdf(path, pages):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for columns in pages:
+        stream = _page_stream(columns)
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def full_page(lines):
+    return [(40.0, 100, lines)]
+
+
+def two_column_page(left, right):
+    return [(40.0, 45, left), (330.0, 45, right)]
+
+
+# page list for one report, roughly n_pages long
+def report_pages(year, n_pages, seed=0):
+    r = random.Random(seed)
+    pct = lambda lo=1, hi=60: r.randint(lo, hi)
+
+    units = UNIT_ORDER
+    per_unit = max(PAGES_PER_UNIT, (n_pages - 2) // len(units))
+    filler = per_unit - PAGES_PER_UNIT
+
+    pages = [full_page(["Table of Contents"] + units)]
+    for i, unit in enumerate(units):
+        pages.append(full_page([unit, f"Survey Response Rate {pct(40, 90)}%",
+                                f"Knowledge rate {pct(80, 99)}%"]))
+
+        masters, doctoral = pct(10, 400), pct(1, 80)
+        pages.append(full_page([
+            "Continuing Education", "Type of Degree N %",
+            f"Masters/MBA {masters} {pct()}%",
+            f"Ph.D. or Doctoral {doctoral} {pct()}%",
+            "Law (J.D.) 10 1%", "Certificate 22 2%", "Unspecified 20 <1%",
+            f"Total {masters + doctoral + 52} 100%",
+        ]))
+
+        pages.append(full_page([
+            "INTERNSHIP PARTICIPATION",
+            f"{pct(50, 90)}% of graduates completed at least one internship",
+            f"Sixty percent ({pct()}%) of respondents reported a paid internship.",
+            f"Forty percent ({pct()}%) completed an internship for academic credit.",
+            "Internship Frequency",
+            f"1 Internship {pct(20, 40)}%", f"2 Internships {pct(20, 40)}%", "3+ Internships",
+            "Conversion to Full-Time Employment",
+            f"Accepted FT offer {pct(5, 45)}%", f"Chose not to accept offer {pct(1, 20)}%",
+            f"Pursued but no offer {pct(1, 30)}%", f"Chose not to pursue {pct(30, 70)}%",
+        ]))
+
+        for _ in range(filler):
+            pages.append(full_page([f"Salary information and other narrative for {unit}.",
+                                    f"Nothing else here {pct()}."]))
+
+        aligned, stepping = pct(20, 60), pct(10, 35)
+        summary = (f"Employment is directly aligned with career goals ({aligned}%) "
+                   f"and a stepping stone ({stepping}%) toward goals.")
+        if year <= 2019:
+            pages.append(full_page([
+                "NATURE OF POSITION", f"Based on {pct(20, 2000)} survey responses",
+                f"Graduates reported their position is directly aligned with career goals ({aligned}%), "
+                f"a stepping stone ({stepping}%), or pays the bills ({100 - aligned - stepping}%).",
+                f"Positions directly related to field of study ({pct()}%), utilizes knowledge "
+                f"({pct()}%) and not at all related ({pct()}%).",
+                "SALARY",
+            ]))
+        else:
+            pages.append(two_column_page(
+                ["NATURE OF POSITION", f"Based on {pct(20, 2000)} survey responses", summary],
+                ["Field of study",
+                 f"Directly related to field of study ({pct()}%), utilizes knowledge ({pct()}%), "
+                 f"not at all related ({pct()}%).",
+                 "SALARY"],
+            ))
+
+        if i == 0:
+            pages.append(full_page([
+                "GEOGRAPHIC DISTRIBUTION",
+                f"{pct(40, 80)}% reported employment in Maryland (1,{pct(100, 999)}), "
+                f"{pct(5, 20)}% in Virginia (300) and 5% in D.C. (120).",
+                "TOP 10 CITIES",
+            ]))
+    pages.append(full_page(["APPENDIX", "Methodology"]))
+    return pages
+
+
+# writes n_reports reports of about pages_per_report pages, returns their paths
+def make_reports(out_dir, pages_per_report, n_reports):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(n_reports):
+        year = YEARS[i % len(YEARS)]
+        path = os.path.join(out_dir, f"{year} Graduation Survey Report {i}.pdf")
+        write_pdf(path, report_pages(year, pages_per_report, seed=i))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    out_dir = sys.argv[1]
+    pages_per_report = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    n_reports = int(sys.argv[3]) if len(sys.argv) > 3 else len(YEARS)
+    for path in make_reports(out_dir, pages_per_report, n_reports):
+        print(path)
@@ -0,0 +1,81 @@
+import argparse
+import copy
+import os
+import sys
+import tempfile
+
+# check for the page prefilter (report_engine.is_candidate_page): every page
+# goes through each extractor's process_page, and a page the PAGE_MARKERS
+# rule out must leave the extractor's state as prepass_page alone leaves it.
+# a marker that misses a header the extractor matches on the page's word
+# lines shows up here instead of as rows silently missing from a csv
+#
+#   python benchmarks/marker_check.py                       # generated reports
+#   python benchmarks/marker_check.py --folder "Grad Reports"
+#
+# exits 1 on any page that is skipped but would have produced something, or
+# if the filtered and unfiltered walks end with different results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import report_engine
+from layout_store import open_report
+from make_reports import make_reports
+from page_layout import PageTexts, iter_page_windows, release_document
+
+
+# (missed pages [(extractor, page number)], extractors whose results differ)
+# for one report
+def check_report(path, year, extractors, cache_dir=None):
+    missed = []
+    with open_report(path, cache_dir) as pdf:
+        page_texts = PageTexts(pdf.pages)
+        filtered = {name: mod.new_document_state(year) for name, mod in extractors}
+        full = {name: mod.new_document_state(year) for name, mod in extractors}
+        for page_num, page, next_page in iter_page_windows(pdf.pages):
+            for name, mod in extractors:
+                mod.process_page(full[name], page_num, page, next_page, page_texts)
+                if report_engine.is_candidate_page(mod, page_num, page_texts):
+                    mod.process_page(filtered[name], page_num, page, next_page, page_texts)
+                    continue
+                visited = copy.deepcopy(filtered[name])
+                mod.process_page(visited, page_num, page, next_page, page_texts)
+                mod.prepass_page(filtered[name], page_num, page_texts)
+                if visited != filtered[name]:
+                    missed.append((name, page_num))
+        differ = [name for name, mod in extractors
+                  if mod.document_results(filtered[name]) != mod.document_results(full[name])]
+        release_document(pdf)
+    return missed, differ
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="check the page markers never skip a page with output")
+    ap.add_argument("--folder", help="folder of reports (default: generated ones)")
+    ap.add_argument("--cache-dir", help="layout cache folder")
+    ap.add_argument("--pages", type=int, default=50, help="pages per generated report")
+    ap.add_argument("--reports", type=int, default=2, help="generated reports")
+    args = ap.parse_args(argv)
+
+    extractors = report_engine.load_extractors()
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder
+        if folder is None:
+            folder = os.path.join(tmp, "reports")
+            make_reports(folder, args.pages, args.reports)
+
+        for year, path in report_engine.report_files(folder):
+            missed, differ = check_report(path, year, extractors, args.cache_dir)
+            for name, page_num in missed:
+                print(f"{os.path.basename(path)}: {name} skips page {page_num}, which has output")
+            if differ:
+                print(f"{os.path.basename(path)}: results differ for {', '.join(differ)}")
+            failed = failed or bool(missed or differ)
+            print(f"{os.path.basename(path)}: {'FAILED' if missed or differ else 'ok'}", flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
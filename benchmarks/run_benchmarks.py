@@ -0,0 +1,154 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# throughput benchmarks over synthetic reports from make_reports.py
+#
+#   python benchmarks/run_benchmarks.py                     # full sweep
+#   python benchmarks/run_benchmarks.py --quick --out r.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+#
+# every case runs in a fresh process so peak memory is per case; with
+# --baseline the run fails if a case gets slower (pages/sec) or bigger
+# (peak memory) than the baseline by more than --threshold
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from make_reports import make_reports
+
+# name, pages per report, reports, workers, extractors (None = all four),
+# pdf backend
+FULL_CASES = (
+    [(f"pages_{n}", n, 2, 1, None, "pdfplumber") for n in (50, 100, 200, 400)]
+    + [(f"reports_{n}", 100, n, 1, None, "pdfplumber") for n in (1, 2, 4, 8)]
+    + [(f"workers_{n}", 100, 8, n, None, "pdfplumber") for n in (1, 2, 4)]
+    + [(f"extractor_{name}", 200, 2, 1, [name], "pdfplumber")
+       for name in ("cont_ed", "internship", "nature", "geo")]
+    + [(f"backend_{b}", 200, 2, 1, None, b) for b in ("pdfplumber", "lean")]
+)
+QUICK_CASES = (
+    [(f"pages_{n}", n, 1, 1, None, "pdfplumber") for n in (50, 100)]
+    + [("workers_2", 50, 4, 2, None, "pdfplumber")]
+    + [(f"extractor_{name}", 50, 1, 1, [name], "pdfplumber")
+       for name in ("cont_ed", "internship", "nature", "geo")]
+    + [(f"backend_{b}", 50, 1, 1, None, b) for b in ("pdfplumber", "lean")]
+)
+
+
+# runs in the child process: one case, result as json on stdout
+def run_case(folder, workers, names, backend):
+    import resource
+
+    import pdf_backend
+    import report_engine
+    from pdfplumber import open as open_pdf
+
+    pdf_backend.set_backend(backend)
+    reports = report_engine.report_files(folder)
+    pages = 0
+    for _year, path in reports:
+        with open_pdf(path) as pdf:
+            pages += len(pdf.pages)
+
+    extractors = report_engine.load_extractors(names)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        report_engine.extract_reports(reports, extractors, None, workers)
+        seconds = time.perf_counter() - start
+
+    # ru_maxrss is KB on linux
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+    return {"pages": pages, "seconds": seconds, "pages_per_sec": pages / seconds, "peak_bytes": peak}
+
+
+def measure(name, pages_per_report, n_reports, workers, names, backend, work_dir):
+    folder = os.path.join(work_dir, f"{pages_per_report}p_{n_reports}r")
+    if not os.path.isdir(folder):
+        make_reports(folder, pages_per_report, n_reports)
+
+    child = [sys.executable, os.path.abspath(__file__), "--child", folder, str(workers), backend]
+    if names:
+        child.append(",".join(names))
+    out = subprocess.run(child, check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result.update({"name": name, "pages_per_report": pages_per_report,
+                   "reports": n_reports, "workers": workers, "extractors": names or "all",
+                   "backend": backend})
+    return result
+
+
+HEADER = f"{'case':<22}{'pages':>7}{'sec':>9}{'pages/s':>10}{'scale':>7}{'peak MB':>9}"
+
+
+# one row per case; scale is pages/s relative to the first case of its sweep
+# (pages_*, reports_*, workers_*, backend_*), which gives the scaling curve per
+# dimension and the speedup of each pdf backend over pdfplumber
+def format_row(r, results):
+    group = r["name"].rsplit("_", 1)[0]
+    first = next(x for x in results if x["name"].rsplit("_", 1)[0] == group)
+    scale = r["pages_per_sec"] / first["pages_per_sec"]
+    return (f"{r['name']:<22}{r['pages']:>7}{r['seconds']:>9.2f}"
+            f"{r['pages_per_sec']:>10.1f}{scale:>7.2f}{r['peak_bytes'] / 2**20:>9.0f}")
+
+
+# cases that got slower or bigger than the baseline by more than threshold
+def regressions(results, baseline, threshold):
+    old = {r["name"]: r for r in baseline}
+    found = []
+    for r in results:
+        b = old.get(r["name"])
+        if b is None:
+            continue
+        if r["pages_per_sec"] < b["pages_per_sec"] * (1 - threshold):
+            found.append(f"{r['name']}: {r['pages_per_sec']:.1f} pages/s, baseline {b['pages_per_sec']:.1f}")
+        if r["peak_bytes"] > b["peak_bytes"] * (1 + threshold):
+            found.append(f"{r['name']}: peak {r['peak_bytes'] / 2**20:.0f} MB, "
+                         f"baseline {b['peak_bytes'] / 2**20:.0f} MB")
+    return found
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="benchmark the extractors on synthetic reports")
+    ap.add_argument("--quick", action="store_true", help="small sweep for a fast check")
+    ap.add_argument("--out", help="write results as json")
+    ap.add_argument("--baseline", help="json from an earlier --out to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="allowed slowdown / memory growth vs the baseline (default 0.25)")
+    ap.add_argument("--work-dir", help="where generated reports go (default: a temp dir)")
+    args = ap.parse_args(argv)
+
+    cases = QUICK_CASES if args.quick else FULL_CASES
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = args.work_dir or tmp
+        results = []
+        print(HEADER)
+        for case in cases:
+            results.append(measure(*case, work_dir))
+            print(format_row(results[-1], results), flush=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for line in found:
+            print("REGRESSION", line)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        names = sys.argv[5].split(",") if len(sys.argv) > 5 else None
+        print(json.dumps(run_case(sys.argv[2], int(sys.argv[3]), names, sys.argv[4])))
+    else:
+        sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# startup cost of cli.py: wall time, and import time beyond a bare
+# interpreter's as reported by python -X importtime (top-level imports,
+# including ones a run does lazily)
+#
+#   python benchmarks/startup_time.py
+#   python benchmarks/startup_time.py --runs 20 --budget 100
+#
+# cases: --help, a small "all" run over a warm layout cache (nothing to parse,
+# so no pdfplumber / numpy), the same with the pandas csv engine, and a cold
+# run that has to parse. exits 1 if --help or the warm plain run imports more
+# than --budget ms
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from make_reports import make_reports
+
+CLI = os.path.join(ROOT, "cli.py")
+
+
+# summed cumulative time of the top-level imports in -X importtime output, ms
+def import_ms(stderr):
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" ") and not name.startswith("  ") and cumulative.strip().isdigit():
+            total += int(cumulative)
+    return total / 1000
+
+
+# median (wall ms, import ms) over runs of python -X importtime args
+def measure(args, runs, before=None):
+    walls, imports = [], []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *args],
+                              capture_output=True, text=True, check=True)
+        walls.append((time.perf_counter() - start) * 1000)
+        imports.append(import_ms(proc.stderr))
+    return statistics.median(walls), statistics.median(imports)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="measure cli.py startup time")
+    ap.add_argument("--runs", type=int, default=10, help="runs per case (median is reported)")
+    ap.add_argument("--pages", type=int, default=8, help="pages per generated report")
+    ap.add_argument("--budget", type=float, default=100.0,
+                    help="import ms allowed for --help and the warm run")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "reports")
+        make_reports(folder, args.pages, 1)
+        cache = os.path.join(tmp, "layouts")
+        out = os.path.join(tmp, "out")
+        run = [CLI, "all", "-i", folder, "-o", out, "--cache-dir", cache]
+        subprocess.run([sys.executable, *run], capture_output=True, check=True)  # warms the cache
+
+        def clear_cache():
+            shutil.rmtree(cache, ignore_errors=True)
+
+        base_wall, base_import = measure(["-c", "pass"], args.runs)
+        cases = [
+            ("help", [CLI, "--help"], None, True),
+            ("warm_plain", run, None, True),
+            ("warm_pandas", run + ["--csv-engine", "pandas"], None, False),
+            ("cold_plain", run, clear_cache, False),
+        ]
+        print(f"{'case':<14}{'+wall ms':>9}{'+import ms':>11}  (bare interpreter {base_wall:.0f} ms, "
+              f"{base_import:.0f} ms of imports)")
+        failed = False
+        for name, case_args, before, budgeted in cases:
+            wall, imported = measure(case_args, args.runs, before)
+            over = imported - base_import
+            verdict = ""
+            if budgeted:
+                failed = failed or over > args.budget
+                verdict = "  over budget" if over > args.budget else "  ok"
+            print(f"{name:<14}{wall - base_wall:>9.0f}{over:>11.0f}{verdict}", flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import argparse
+import os
+import sys
+
+import csv_output
+import pdf_backend
+import report_engine
+import typed_output
+import watch
+
+# one command line for the extractors: a subcommand per extractor, or "all"
+# to run every one over a single pass of the reports
+#
+#   python cli.py all -i "Grad Reports" -o out --cache-dir .layouts -w 4
+#   python cli.py cont_ed -i "Grad Reports" -o cont_ed.csv
+#   python cli.py watch -i "Grad Reports" -o out      # keep the csvs current (see watch)
+#
+# an option left out falls back to report_engine's setting of the same name
+# (a script run directly passes its own settings first). pdfplumber, numpy
+# and pandas are only imported once a run needs them, so --help and runs
+# over cached layouts start without them
+
+# option dest -> report_engine setting it defaults to
+SETTINGS = {
+    "input": "gradReportFolder",
+    "cache_dir": "layoutCacheFolder",
+    "workers": "workerCount",
+    "shards": "pageShards",
+    "result_cache": "resultCacheFolder",
+    "manifest": "manifestFile",
+    "backend": "pdfBackend",
+    "pipeline_depth": "pipelineDepth",
+    "typed": "typedOutput",
+    "fact_db": "factDatabase",
+    "csv_engine": "csvEngine",
+    "trace": "traceFile",
+}
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-i", "--input", metavar="FOLDER", help="folder of report pdfs")
+    common.add_argument("-w", "--workers", type=int, metavar="N",
+                        help="worker processes (1 = serial, 0 = one per core)")
+    common.add_argument("--cache-dir", metavar="DIR", help="keep parsed page layouts here")
+    common.add_argument("--backend", choices=pdf_backend.BACKENDS, help="pdf library")
+    common.add_argument("--typed", choices=typed_output.FORMATS, help="also write typed tables")
+    common.add_argument("--fact-db", metavar="SQLITE", help="export the csvs through a fact store")
+    common.add_argument("--csv-engine", choices=csv_output.ENGINES, help="csv writer")
+
+    # one-off runs only
+    batch = argparse.ArgumentParser(add_help=False)
+    batch.add_argument("--shards", type=int, metavar="N", help="page ranges per report")
+    batch.add_argument("--result-cache", metavar="DIR", help="keep extractor results here")
+    batch.add_argument("--manifest", metavar="JSON", help="only extract new or changed reports")
+    batch.add_argument("--pipeline-depth", type=int, metavar="N",
+                       help="overlap parsing with extraction, N chunks ahead")
+    batch.add_argument("--trace", metavar="JSON", help="write a chrome trace of the run")
+
+    ap = argparse.ArgumentParser(prog="cli.py", description="extract csvs from graduation survey reports")
+    sub = ap.add_subparsers(dest="command", metavar="command", required=True)
+    for name, module in report_engine.EXTRACTORS.items():
+        p = sub.add_parser(name, parents=[common, batch], help=f"write {module}.csv")
+        p.add_argument("-o", "--output", metavar="CSV", help="csv path")
+    p = sub.add_parser("all", parents=[common, batch], help="run every extractor")
+    p.add_argument("-o", "--output-dir", metavar="DIR", help="folder for the csvs")
+    p = sub.add_parser("watch", parents=[common], help="keep every csv current as reports change")
+    p.add_argument("-o", "--output-dir", metavar="DIR", help="folder for the csvs")
+    p.add_argument("--poll", type=float, default=watch.POLL_SECONDS, metavar="SECONDS",
+                   help="how often the folder is looked at")
+    return ap
+
+
+# argv without the program name; defaults are settings that win over
+# report_engine's (a script's own gradReportFolder etc.), None ones are skipped
+def main(argv=None, defaults=None):
+    defaults = defaults or {}
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    for dest, setting in SETTINGS.items():
+        if getattr(args, dest, None) is None:
+            value = defaults.get(dest)
+            setattr(args, dest, value if value is not None else getattr(report_engine, setting))
+    if args.input is None:
+        ap.error("no report folder, pass -i or set gradReportFolder")
+
+    if args.command in ("all", "watch"):
+        out_dir = args.output_dir or report_engine.outputFolder or "."
+        out_paths = {name: os.path.join(out_dir, mod.CSV_NAME)
+                     for name, mod in report_engine.load_extractors()}
+    else:
+        (name, mod), = report_engine.load_extractors([args.command])
+        output = args.output or defaults.get("output")
+        out_paths = {name: output or os.path.join(report_engine.outputFolder or ".", mod.CSV_NAME)}
+    for path in out_paths.values():
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if args.command == "watch":
+        report_engine.configure(args.backend, args.csv_engine, args.typed)
+        watch.watch(args.input, out_paths, args.cache_dir, args.workers, args.typed, args.fact_db,
+                    args.poll)
+        return
+    report_engine.run_extractors(args.input, out_paths, args.cache_dir, args.workers, args.shards,
+                                 args.trace, args.manifest, args.result_cache, args.backend,
+                                 args.pipeline_depth, args.typed, args.fact_db, args.csv_engine)
+
+
+# a script run directly: its extractor's subcommand, the script's settings
+# as defaults
+def script_main(name, defaults):
+    main([name, *sys.argv[1:]], defaults)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,112 +1,21 @@
-import pdfplumber
-import pandas as pd
-import os
 import re
 
+from csv_output import write_rows
+from page_layout import build_lines_from_words
+from section_index import section_index
+from unit_names import UNIT_ORDER as unit_order, normalize_unit
+
 #change for commit
 gradReportFolder = None
-contEdTables = []
-print("script started")
-
-# order for csv output
-unit_order = [
-    "University-Wide",
-    "College of Agriculture and Natural Resources",
-    "College of Arts and Humanities",
-    "College of Behavioral and Social Sciences",
-    "College of Computer, Mathematical, and Natural Sciences",
-    "College of Education",
-    "College of Information",
-    "The A. James Clark School of Engineering",
-    "Philip Merrill College of Journalism",
-    "School of Architecture, Planning, and Preservation",
-    "School of Public Health",
-    "School of Public Policy",
-    "The Robert H. Smith School of Business",
-    "College Park Scholars",
-    "Honors College",
-    "Letters and Sciences",
-    "Undergraduate Studies"
-]
-unit_mapping = {u.lower(): u for u in unit_order}
-
-# normalize differences in names over years
-def normalize_unit(name):
-    if not name:
-        return None
-    n = " ".join(name.strip().split()).lower()
-    n = n.replace("&", "and")
-    n = n.replace("university wide", "university-wide")
-    n = n.replace("letters & sciences", "letters and sciences")
-    n = n.replace("college of information studies", "college of information")
-    n = n.replace("school of architecture, planning and preservation",
-              "school of architecture, planning, and preservation")
-    
-    n = n.replace("phillip merrill college of journalism", "philip merrill college of journalism")
-
-    n = n.replace("office of undergraduate studies", "undergraduate studies")
-    n = n.replace("office of undergrad studies", "undergraduate studies")
-
-    n = n.replace("the school of public policy", "school of public policy")
-    n = n.replace("school of public policy and administration", "school of public policy")
-
-    n = n.replace("the a. james clark school of engineering", "the a. james clark school of engineering")
-    if "clark school of engineering" in n:
-        n = "the a. james clark school of engineering"
-
-    if n in ["overall"]:
-        n = "university-wide"
-
-    if n in ["a. james clark school of engineering", "james clark school of engineering"]:
-        n = "the a. james clark school of engineering"
-
-    if n.startswith("college of computer, mathematical"):
-        n = "college of computer, mathematical, and natural sciences"
-    if "school of architecture" in n:
-        n = "school of architecture, planning, and preservation"
-
-    # all names standardized
-    return unit_mapping.get(n, None)
-
-# all schools in report accounting for line splits, etc.
-school_pattern = re.compile(
-    r"("
-    r"College of Agriculture and Natural Resources|"
-    r"College of Arts and Humanities|"
-    r"College of Behavioral and Social Sciences|"
-    r"College of Computer, Mathematical, and Natural Sciences|"
-    r"College of Computer, Mathematical,|"
-    r"College of Computer, Mathematical|"
-    r"College of Education|"
-    r"College of Information Studies|"
-    r"College of Information|"
-    r"(?:The\s+)?A\.?\s*James\s+Clark\s+School\s+of\s+Engineering|"
-    r"Clark\s+School\s+of\s+Engineering|"
-    r"Philip Merrill College of Journalism|"
-    r"Phillip Merrill College of Journalism|"
-    r"School of Architecture, Planning, and Preservation|"
-    r"SCHOOL OF ARCHITECTURE, PLANNING|"
-    r"School of Architecture, Planning and Preservation|"
-    r"SCHOOL OF ARCHITECTURE,\s*PLANNING\s*AND\s*PRESERVATION|"
-    r"SCHOOL OF PUBLIC HEALTH|"
-    r"School of Public Health|"
-    r"School of Public Policy|"
-    r"The School of Public Policy|"
-    r"School of Public Policy and Administration|"
-    r"The Robert H\. Smith School of Business|"
-    r"College Park Scholars|"
-    r"Honors College|"
-    r"Letters\s*&\s*Sciences|"
-    r"Letters and Sciences|"
-    r"Overall|"
-    r"University Wide|"
-    r"University-Wide|"
-    r"Undergraduate Studies|"
-    r"Office of Undergraduate Studies|"
-    r"OFFICE OF UNDERGRADUATE STUDIES|"
-    r")",
-    re.IGNORECASE
-)
+out_path = None
+# set to a folder to keep parsed page layouts between runs
+layoutCacheFolder = None
+# worker processes for reports (1 = serial, 0 = one per core)
+workerCount = 1
+CSV_NAME = "continuing_education_week1.csv"
+# code changes are picked up by result_cache's fingerprint; bump this when
+# rows change for another reason (e.g. a pdfplumber upgrade)
+EXTRACTOR_VERSION = "1"
 
 #indicates a continuing education table
 pattern_type_degree = re.compile(
@@ -120,6 +29,9 @@ pattern_total_row = re.compile(r"(?:Grand\s+)?Total|TOTAL", re.IGNORECASE)
 pattern_pct = re.compile(r"%")
 pattern_total  = re.compile(r"(?:Grand\s+)?Total|TOTAL", re.IGNORECASE)
 
+# words that have to be on a page for it to hold a cont ed table
+PAGE_MARKERS = (("type", "of", "degree"), ("masters/mba",))
+
 # finds all pages with continuing education tables
 def is_cont_ed_table_page(text: str) -> bool:
     if not text:
@@ -138,30 +50,6 @@ def is_cont_ed_table_page(text: str) -> bool:
 
     return False
 
-# turns words into lines
-def build_lines_from_words(page, y_tol=2.0):
-    """
-    Turn extract_words() into stable line strings by grouping words with similar 'top' y.
-    """
-    words = page.extract_words(use_text_flow=True) or []
-    rows = {}
-    for w in words:
-        txt = (w.get("text") or "").strip()
-        if not txt:
-            continue
-        y = w["top"]
-        key = round(y / y_tol) * y_tol
-        rows.setdefault(key, []).append(w)
-
-    lines = []
-    for y in sorted(rows.keys()):
-        row_words = sorted(rows[y], key=lambda ww: ww["x0"])
-        line = " ".join(ww["text"] for ww in row_words)
-        line = " ".join(line.split())
-        if line:
-            lines.append(line)
-    return lines
-
 def extract_table_lines_word_based(page):
     # builds lines of table based on last function
     lines = build_lines_from_words(page)
@@ -184,96 +72,86 @@ def extract_table_lines_word_based(page):
 
     return lines[start_idx:end_idx + 1]
 
-# extracting continuing education tables from each file
-for file in os.listdir(gradReportFolder):
-    if not file.endswith(".pdf"):
-        continue
-
-    year = file.split(" ")[0]
-    fullPath = os.path.join(gradReportFolder, file)
-
-    with pdfplumber.open(fullPath) as pdf:
-        page_texts = [p.extract_text() or "" for p in pdf.pages]
-        # memory vars
-        last_school_norm = None 
-        last_table_page = None
-        for page_num, page in enumerate(pdf.pages, start=1):
-            text = page_texts[page_num - 1]
-            if not is_cont_ed_table_page(text):
-                continue
-
-            table_lines = extract_table_lines_word_based(page)
-            if not table_lines:
-                continue
-
-            ### finding school header by scanning back a few pages
-            # school is real header
-            school = None
-            # fall back is best match if no header found
-            fallback_school = None
-
-            # scan farther back only at start of file (when we don't have a last_school_norm yet)
-            lookback = 120 if last_school_norm is None else 25
-
-            for p in range(page_num - 1, max(page_num - lookback, -1), -1):
-                raw = page_texts[p] or ""
-                top = "\n".join(raw.splitlines()[:40])          # only top of page
-                flat_top = " ".join(top.split())
-
-                # dont take school name from table of contents page
-                if re.search(r"Table\s+of\s+Contents|Contents\b", flat_top, re.IGNORECASE):
-                    continue
-
-                m = school_pattern.search(flat_top)
-                if not m:
-                    continue
-                
-                # signals that the header is likely on the page with Survey Response Rate
-                # stop scanning once found
-                if re.search(r"Survey\s+Response\s+Rate", flat_top, re.IGNORECASE):
-                    school = m.group(0)
-                    break
-                
-                # if header not found but a school mentioned near table just use that
-                if fallback_school is None:
-                    fallback_school = m.group(0)
-
-            if school is None:
-                school = fallback_school
-
-
-
-
-
-            # normalize school name if possible
-            school_norm = normalize_unit(school)
-
-            if not school_norm:
-                # if table is split between 2 pages
-                if last_school_norm and last_table_page == page_num - 1:
-                    school_norm = last_school_norm
-                # overall/univ wide always first
-                elif last_school_norm is None:
-                    school_norm = "University-Wide"
-                else:
-                    continue
-
-
-
-            last_school_norm = school_norm
-
-            contEdTables.append({
-                "year": year,
-                "page": page_num,
-                "school": school_norm,
-                "lines": table_lines
-            })
-            last_school_norm = school_norm
-            last_table_page = page_num
-
-            print(year, school_norm)
-
-print(f"Found {len(contEdTables)} cont ed tables")
+# per document memory vars
+def new_document_state(year):
+    return {
+        "year": year,
+        "tables": [],
+        "last_school_norm": None,
+        "last_table_page": None,
+    }
+
+# state that flows from one page to the next
+CARRIED_STATE = ("last_school_norm", "last_table_page")
+
+# school for a cont ed table on page_num, None if the page should be skipped
+def find_table_school(state, page_num, page_texts):
+    # scan farther back only at start of file (when we don't have a last_school_norm yet)
+    lookback = 120 if state["last_school_norm"] is None else 25
+
+    # nearest header on a Survey Response Rate page, else nearest school mentioned
+    school = section_index(page_texts).governing_header(
+        page_num - 1, max(page_num - lookback, -1))
+
+    # normalize school name if possible
+    school_norm = normalize_unit(school)
+
+    if not school_norm:
+        # if table is split between 2 pages
+        if state["last_school_norm"] and state["last_table_page"] == page_num - 1:
+            school_norm = state["last_school_norm"]
+        # overall/univ wide always first
+        elif state["last_school_norm"] is None:
+            school_norm = "University-Wide"
+
+    return school_norm
+
+# extracting continuing education tables from one page
+def process_page(state, page_num, page, next_page, page_texts):
+    year = state["year"]
+
+    text = page_texts[page_num - 1]
+    if not is_cont_ed_table_page(text):
+        return
+
+    table_lines = extract_table_lines_word_based(page)
+    if not table_lines:
+        return
+
+    school_norm = find_table_school(state, page_num, page_texts)
+    if not school_norm:
+        return
+
+    state["tables"].append({
+        "year": year,
+        "page": page_num,
+        "school": school_norm,
+        "lines": table_lines
+    })
+    state["last_school_norm"] = school_norm
+    state["last_table_page"] = page_num
+
+    print(year, school_norm)
+
+# text-only version of process_page, cheap guess of the carried state
+# (assumes every cont ed page has a word-level table)
+def prepass_page(state, page_num, page_texts):
+    if not is_cont_ed_table_page(page_texts[page_num - 1]):
+        return
+    school_norm = find_table_school(state, page_num, page_texts)
+    if school_norm:
+        state["last_school_norm"] = school_norm
+        state["last_table_page"] = page_num
+
+def document_results(state):
+    return state["tables"]
+
+# tables from every document (or page shard), in order
+def merge_results(partials):
+    contEdTables = []
+    for tables in partials:
+        contEdTables.extend(tables)
+    return contEdTables
 
 
 # Regex for CSV creation
@@ -341,61 +219,103 @@ def pair_lines_into_rows(lines):
 
     return fixed
 
-# csv creation
-years = sorted({int(t["year"]) for t in contEdTables})
-template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
+# csv metrics, each has an "N" count and a "%" column
+METRIC_NAMES = ["Masters","PhD/Doctoral","Law","Health Prof","Certificate","Second Bachelor’s",
+                "Associate’s","Non-degree","Unspecified","Other","Total"]
+METRIC_COLUMNS = [col for name in METRIC_NAMES for col in (f"{name} N", f"{name} %")]
+# column types for typed output (see typed_output)
+COUNT_COLUMNS = tuple(f"{name} N" for name in METRIC_NAMES)
+PERCENT_COLUMNS = tuple(f"{name} %" for name in METRIC_NAMES)
+# across reports the first table to give a pathway keeps it, totals are
+# taken from the last one (see fact_store)
+KEEP_FIRST_COLUMNS = tuple(col for col in METRIC_COLUMNS if not col.startswith("Total "))
+
+
+# csv values from tables: (years, {(year, unit): {column: value}},
+# {(year, unit): {column: page the value came from}})
+def table_values(contEdTables):
+    years = sorted({int(t["year"]) for t in contEdTables})
+
+    data_lookup = {}
+    sources = {}
+
+    for t in contEdTables:
+        year = int(t["year"])
+        unit = normalize_unit(t["school"]) or t["school"]
+        if not unit:
+            continue
+
+        key = (year, unit)
 
-data_lookup = {}
+        fixed_rows = pair_lines_into_rows(t["lines"])
 
-for t in contEdTables:
-    year = int(t["year"])
-    unit = normalize_unit(t["school"]) or t["school"]
-    if not unit:
-        continue
+        #accumulate across pages instead of overwriting
+        out = data_lookup.setdefault(key, {})
+        pages = sources.setdefault(key, {})
 
-    key = (year, unit)
+        for rline in fixed_rows:
+            for k, pat in pathways.items():
+                if k == "Total":
+                    continue
+                m = pat.search(rline)
+                if m:
+                    # only set if missing (prevents later pages wiping earlier ones)
+                    out.setdefault(f"{k} N", int(m.group(1).replace(",", "")))
+                    out.setdefault(f"{k} %", m.group(2))
+                    pages.setdefault(f"{k} N", t["page"])
+                    pages.setdefault(f"{k} %", t["page"])
 
-    fixed_rows = pair_lines_into_rows(t["lines"])
+            if re.search(r"(?:Grand\s+)?Total|TOTAL", rline, re.IGNORECASE):
+                m = re.search(rf"{COUNT}\s+{PCT}", rline)
+                if m:
+                    out["Total N"] = int(m.group(1).replace(",", ""))
+                    out["Total %"] = m.group(2)
+                    pages["Total N"] = pages["Total %"] = t["page"]
 
-    #accumulate across pages instead of overwriting
-    out = data_lookup.setdefault(key, {})
+    return years, data_lookup, sources
 
-    for rline in fixed_rows:
-        for k, pat in pathways.items():
-            if k == "Total":
-                continue
-            m = pat.search(rline)
-            if m:
-                # only set if missing (prevents later pages wiping earlier ones)
-                out.setdefault(f"{k} N", int(m.group(1).replace(",", "")))
-                out.setdefault(f"{k} %", m.group(2))
 
-        if re.search(r"(?:Grand\s+)?Total|TOTAL", rline, re.IGNORECASE):
-            m = re.search(rf"{COUNT}\s+{PCT}", rline)
-            if m:
-                out["Total N"] = int(m.group(1).replace(",", ""))
-                out["Total %"] = m.group(2)
+# csv creation, returns the csv's frame
+def write_csv(contEdTables, out_path):
+    print(f"Found {len(contEdTables)} cont ed tables")
 
+    years, data_lookup, _sources = table_values(contEdTables)
+    return write_facts(years, data_lookup, out_path)
 
-final_rows = []
-metric_names = ["Masters","PhD/Doctoral","Law","Health Prof","Certificate","Second Bachelor’s",
-                "Associate’s","Non-degree","Unspecified","Other","Total"]
-for base in template_rows:
-    y = base["Year"]
-    u = base["Unit"]
-    row = dict(base)
-    row.update(data_lookup.get((y, u), {}))
-    final_rows.append(row)
-
-metric_cols = []
-for name in metric_names:
-    metric_cols.extend([f"{name} N", f"{name} %"])
-
-df = pd.DataFrame(final_rows)
-for c in metric_cols:
-    if c not in df.columns:
-        df[c] = ""
-
-df = df[["Unit","Year"] + metric_cols]
-#change for commit
-df.to_csv(None, index=False)
+
+# one document's values for the fact store: (years, [(year, unit, column,
+# value, page)])
+def document_facts(contEdTables):
+    years, data_lookup, sources = table_values(contEdTables)
+    facts = [(year, unit, col, value, sources[(year, unit)][col])
+             for (year, unit), out in data_lookup.items() for col, value in out.items()]
+    return years, facts
+
+
+# csv from {(year, unit): {column: value}} for the given years
+def write_facts(years, data_lookup, out_path):
+    template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
+
+    final_rows = []
+    for base in template_rows:
+        y = base["Year"]
+        u = base["Unit"]
+        row = dict(base)
+        row.update(data_lookup.get((y, u), {}))
+        final_rows.append(row)
+
+    metric_cols = list(METRIC_COLUMNS)
+
+    return write_rows(final_rows, ["Unit", "Year"] + metric_cols, out_path)
+
+
+def main():
+    from cli import script_main
+
+    print("script started")
+    script_main("cont_ed", {"input": gradReportFolder, "output": out_path,
+                            "cache_dir": layoutCacheFolder, "workers": workerCount})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import csv
+
+# how the scripts write their csvs: a list of row dicts and the columns to
+# keep, cells a row does not have are blank
+#
+#   plain   the csv module, each cell formatted as pandas' to_csv formats the
+#           DataFrame built from the same rows, so the files are identical
+#           without importing pandas (most of a run's startup)
+#   pandas  pd.DataFrame(rows)[columns].to_csv, the reference
+#
+# pandas makes a column whose cells are all numbers float64 if one is missing
+# or a float (404 -> "404.0", missing -> ""), otherwise it writes each cell
+# as str(). both engines return a frame with .columns and frame[col].tolist()
+# (see typed_output)
+
+ENGINES = ("plain", "pandas")
+
+engine = "plain"
+
+
+def set_engine(name):
+    global engine
+    if name not in ENGINES:
+        raise ValueError(f"unknown csv engine {name!r}, expected one of {', '.join(ENGINES)}")
+    engine = name
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _format_column(values):
+    present = [v for v in values if not _missing(v)]
+    numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present)
+    if numeric and (len(present) < len(values) or any(isinstance(v, float) for v in present)):
+        return ["" if _missing(v) else repr(float(v)) for v in values]
+    return ["" if _missing(v) else str(v) for v in values]
+
+
+class Column(list):
+    def tolist(self):
+        return list(self)
+
+
+# the rows as written, cells as the scripts gave them (None when missing)
+class PlainFrame:
+    def __init__(self, columns, rows):
+        self.columns = list(columns)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, col):
+        i = self.columns.index(col)
+        return Column(row[i] for row in self.rows)
+
+    def to_csv(self, path):
+        cells = [_format_column([row[i] for row in self.rows]) for i in range(len(self.columns))]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(self.columns)
+            writer.writerows(zip(*cells))
+
+
+# writes the rows' columns to out_path with the current engine, returns the frame
+def write_rows(rows, columns, out_path):
+    if engine == "pandas":
+        import pandas as pd
+
+        df = pd.DataFrame(rows)
+        for c in columns:
+            if c not in df.columns:
+                df[c] = ""
+        df = df[list(columns)]
+        df.to_csv(out_path, index=False)
+        return df
+    frame = PlainFrame(columns, [[row.get(c) for c in columns] for row in rows])
+    frame.to_csv(out_path)
+    return frame
@@ -0,0 +1,134 @@
+from typed_output import PERCENT_VALUE
+
+# every extracted value as one long-format fact row in sqlite, the csvs are
+# views over it
+#
+#   facts          extractor, report, seq (report order), year, unit, metric,
+#                  value (as the extractor gave it), number and less_than
+#                  (parsed, for querying), page (source page), rank
+#   fact_years     years each extractor saw tables for, so a csv keeps its
+#                  blank template rows
+#   current_facts  the value of each (extractor, year, unit, metric) that
+#                  makes it into the csv: the highest rank
+#   csv_<name>     an extractor's facts pivoted back to its csv columns
+#
+# rank is the report's seq, so a later report wins as merge_results does it;
+# columns a script lists in KEEP_FIRST_COLUMNS rank by -seq so the first
+# report to give one keeps it. a document's facts go in with one executemany
+# in one transaction; indexes on (unit, year) and (metric, year) serve the
+# usual lookups across reports
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    extractor TEXT NOT NULL,
+    report TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    unit TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value,
+    number REAL,
+    less_than INTEGER,
+    page INTEGER,
+    rank INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS facts_unit_year ON facts (unit, year);
+CREATE INDEX IF NOT EXISTS facts_metric_year ON facts (metric, year);
+CREATE INDEX IF NOT EXISTS facts_pick ON facts (extractor, year, unit, metric, rank);
+CREATE TABLE IF NOT EXISTS fact_years (
+    extractor TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    PRIMARY KEY (extractor, year)
+);
+CREATE VIEW IF NOT EXISTS current_facts AS
+SELECT extractor, report, year, unit, metric, value, number, less_than, page
+FROM (
+    SELECT *, ROW_NUMBER() OVER (
+        PARTITION BY extractor, year, unit, metric ORDER BY rank DESC) AS pick
+    FROM facts
+)
+WHERE pick = 1;
+"""
+
+
+def open_store(path):
+    import sqlite3
+
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# drops the extractors' facts, a run rebuilds them from its reports
+def clear(conn, names):
+    with conn:
+        for name in names:
+            conn.execute("DELETE FROM facts WHERE extractor = ?", (name,))
+            conn.execute("DELETE FROM fact_years WHERE extractor = ?", (name,))
+
+
+# (number, less than) for a value, (None, None) if it is not numeric
+def parse_number(value):
+    if value is None or isinstance(value, bool):
+        return None, None
+    if isinstance(value, (int, float)):
+        return value, 0
+    m = PERCENT_VALUE.fullmatch(str(value).replace(",", ""))
+    if not m:
+        return None, None
+    return float(m.group(2)), int(m.group(1) is not None)
+
+
+# one report's facts for every extractor, docs is [(name, module, result)]
+def insert_document(conn, report, seq, docs):
+    rows = []
+    years = []
+    for name, mod, result in docs:
+        doc_years, facts = mod.document_facts(result)
+        keep_first = set(getattr(mod, "KEEP_FIRST_COLUMNS", ()))
+        years += [(name, year) for year in doc_years]
+        for year, unit, metric, value, page in facts:
+            number, less_than = parse_number(value)
+            rank = -seq if metric in keep_first else seq
+            rows.append((name, report, seq, year, unit, metric, value, number, less_than, page, rank))
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO fact_years VALUES (?, ?)", years)
+        conn.executemany("INSERT INTO facts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# wide csv_<name> view: Year, Unit and one column per metric
+def create_csv_view(conn, name, columns):
+    pivots = "".join(f",\n    MAX(CASE WHEN metric = {_literal(col)} THEN value END) AS {_identifier(col)}"
+                     for col in columns)
+    view = _identifier(f"csv_{name}")
+    with conn:
+        conn.execute(f"DROP VIEW IF EXISTS {view}")
+        conn.execute(f"""
+CREATE VIEW {view} AS
+SELECT year AS "Year", unit AS "Unit"{pivots}
+FROM current_facts
+WHERE extractor = {_literal(name)}
+GROUP BY year, unit
+""")
+
+
+# an extractor's csv values read back from its view: (years, {(year, unit):
+# {column: value}}), blank cells left out
+def csv_values(conn, name):
+    years = [year for (year,) in conn.execute(
+        "SELECT year FROM fact_years WHERE extractor = ? ORDER BY year", (name,))]
+    cursor = conn.execute(f"SELECT * FROM {_identifier(f'csv_{name}')}")
+    columns = [d[0] for d in cursor.description]
+    values = {}
+    for year, unit, *cells in cursor:
+        values[(year, unit)] = {col: value for col, value in zip(columns[2:], cells)
+                                if value is not None}
+    return years, values
@@ -1,106 +1,21 @@
-import pdfplumber
-import pandas as pd
-import os
 import re
 
-gradReportFolder = None
+from anchor_text import anchor_window
+from csv_output import write_rows
+from page_layout import build_lines_from_words
+from section_index import section_index
+from unit_names import UNIT_ORDER as unit_order, is_unit_line, normalize_unit
 
-# order for csv rows
-unit_order = [
-    "University-Wide",
-    "College of Agriculture and Natural Resources",
-    "College of Arts and Humanities",
-    "College of Behavioral and Social Sciences",
-    "College of Computer, Mathematical, and Natural Sciences",
-    "College of Education",
-    "College of Information",
-    "The A. James Clark School of Engineering",
-    "Philip Merrill College of Journalism",
-    "School of Architecture, Planning, and Preservation",
-    "School of Public Health",
-    "School of Public Policy",
-    "The Robert H. Smith School of Business",
-    "College Park Scholars",
-    "Honors College",
-    "Letters and Sciences",
-    "Undergraduate Studies"
-]
-unit_mapping = {u.lower(): u for u in unit_order}
-
-# normalize differences in unit names
-def normalize_unit(name):
-    if not name:
-        return None
-    n = " ".join(name.strip().split()).lower()
-    n = n.replace("&", "and")
-    n = n.replace("university wide", "university-wide")
-    n = n.replace("letters & sciences", "letters and sciences")
-    n = n.replace("college of information studies", "college of information")
-    n = n.replace("school of architecture, planning and preservation",
-                  "school of architecture, planning, and preservation")
-    n = n.replace("phillip merrill college of journalism", "philip merrill college of journalism")
-
-    n = n.replace("office of undergraduate studies", "undergraduate studies")
-    n = n.replace("office of undergrad studies", "undergraduate studies")
-
-    n = n.replace("the school of public policy", "school of public policy")
-    n = n.replace("school of public policy and administration", "school of public policy")
-
-    if "clark school of engineering" in n:
-        n = "the a. james clark school of engineering"
-
-    if n in ["overall"]:
-        n = "university-wide"
-
-    if n in ["a. james clark school of engineering", "james clark school of engineering"]:
-        n = "the a. james clark school of engineering"
-
-    if n.startswith("college of computer, mathematical"):
-        n = "college of computer, mathematical, and natural sciences"
-    if "school of architecture" in n:
-        n = "school of architecture, planning, and preservation"
-
-    return unit_mapping.get(n, None)
-
-# all schools in reports
-school_pattern = re.compile(
-    r"("
-    r"College of Agriculture and Natural Resources|"
-    r"College of Arts and Humanities|"
-    r"College of Behavioral and Social Sciences|"
-    r"College of Computer, Mathematical, and Natural Sciences|"
-    r"College of Computer, Mathematical,|"
-    r"College of Computer, Mathematical|"
-    r"College of Education|"
-    r"College of Information Studies|"
-    r"College of Information|"
-    r"(?:The\s+)?A\.?\s*James\s+Clark\s+School\s+of\s+Engineering|"
-    r"Clark\s+School\s+of\s+Engineering|"
-    r"Philip Merrill College of Journalism|"
-    r"Phillip Merrill College of Journalism|"
-    r"School of Architecture, Planning, and Preservation|"
-    r"SCHOOL OF ARCHITECTURE, PLANNING|"
-    r"School of Architecture, Planning and Preservation|"
-    r"SCHOOL OF ARCHITECTURE,\s*PLANNING\s*AND\s*PRESERVATION|"
-    r"SCHOOL OF PUBLIC HEALTH|"
-    r"School of Public Health|"
-    r"School of Public Policy|"
-    r"The School of Public Policy|"
-    r"School of Public Policy and Administration|"
-    r"The Robert H\. Smith School of Business|"
-    r"College Park Scholars|"
-    r"Honors College|"
-    r"Letters\s*&\s*Sciences|"
-    r"Letters and Sciences|"
-    r"Overall|"
-    r"University Wide|"
-    r"University-Wide|"
-    r"Undergraduate Studies|"
-    r"Office of Undergraduate Studies|"
-    r"OFFICE OF UNDERGRADUATE STUDIES|"
-    r")",
-    re.IGNORECASE
-)
+gradReportFolder = None
+out_path = None
+# set to a folder to keep parsed page layouts between runs
+layoutCacheFolder = None
+# worker processes for reports (1 = serial, 0 = one per core)
+workerCount = 1
+CSV_NAME = "internship_participation_week2.csv"
+# code changes are picked up by result_cache's fingerprint; bump this when
+# rows change for another reason (e.g. a pdfplumber upgrade)
+EXTRACTOR_VERSION = "1"
 
 # regex helpers
 WS = r"(?:[\s\u00A0]+)"
@@ -112,30 +27,12 @@ PCT_ANY = re.compile(r"\(?(<?\d{1,3}(?:\.\d+)?)\s*%\)?")
 internshipHeader = re.compile(rf"\bINTERNSHIP{WS}PARTICIPATION\b", re.IGNORECASE)
 appendixStop = re.compile(r"\bAPPENDIX\b", re.IGNORECASE)
 
+# words that have to be on a page for it to hold the internship section
+PAGE_MARKERS = (("internship", "participation"),)
+
 # total internship percent
 participation_line_pat = re.compile(rf"\bat{WS}least{WS}one{WS}internship\b", re.IGNORECASE)
 
-## word based line reconstruction
-def build_lines_from_words(page, y_tol=2.0):
-    words = page.extract_words(use_text_flow=True) or []
-    rows = {}
-    for w in words:
-        txt = (w.get("text") or "").strip()
-        if not txt:
-            continue
-        y = w["top"]
-        key = round(y / y_tol) * y_tol
-        rows.setdefault(key, []).append(w)
-
-    lines = []
-    for y in sorted(rows.keys()):
-        row_words = sorted(rows[y], key=lambda ww: ww["x0"])
-        line = " ".join(ww["text"] for ww in row_words)
-        line = " ".join(line.split())
-        if line:
-            lines.append(line)
-    return lines
-
 # get all lines in internship participation section
 def extract_table_lines_word_based(page):
     lines = build_lines_from_words(page)
@@ -155,7 +52,7 @@ def extract_table_lines_word_based(page):
             end_idx = i
             break
         # if line is a unit name or appendix the stop
-        if school_pattern.fullmatch(lines[i].strip()):
+        if is_unit_line(lines[i].strip()):
             end_idx = i - 1
             break
 
@@ -168,7 +65,7 @@ def extract_table_lines_word_based(page):
 def clip_at_new_unit_or_appendix(lines):
     out = []
     for ln in lines:
-        if appendixStop.search(ln) or school_pattern.fullmatch(ln.strip()):
+        if appendixStop.search(ln) or is_unit_line(ln.strip()):
             break
         out.append(ln)
     return out
@@ -513,79 +410,29 @@ def extract_conversion_outcomes_from_window(window_lines, year=None):
         }
 
     # MODE C: 2015–2018 pie-chart (and any other non-inline pre-2020 chart)
-    out = extract_pie_2015_2018(chart, year=year)
+    out = extract_pie_2015_2018(chart)
     if out.get("did_not_pursue_pct") is None and did_not_pursue_pct is not None:
         out["did_not_pursue_pct"] = did_not_pursue_pct
     return out
 
 
-# Main extraction
-# collects percent and frequency
-year_unit_data = {}  # (year_str, unit) -> row dict
-#marks end of a sentence
-SENT_BOUNDARY = re.compile(r"[.!?\n]")
-
-## approximates area of the sentence
-def _sentence_window(text, anchor_match, max_chars=400):
-    if not text or not anchor_match:
-        return ""
-
-    a0, a1 = anchor_match.start(), anchor_match.end()
-
-    # left boundary: scan left for the last sentence end punctuation
-    left_limit = max(0, a0 - max_chars)
-    left_chunk = text[left_limit:a0]
-
-    # find last boundary in left_chunk
-    left_boundary_idx = None
-    for m in SENT_BOUNDARY.finditer(left_chunk):
-        left_boundary_idx = m.end()
-
-    sent_start = left_limit + (left_boundary_idx if left_boundary_idx is not None else 0)
-
-    # right boundary: scan right for the next sentence end punctuation 
-    right_limit = min(len(text), a1 + max_chars)
-    right_chunk = text[a1:right_limit]
-    m_right = SENT_BOUNDARY.search(right_chunk)
-    sent_end = a1 + (m_right.end() if m_right else len(right_chunk))
-
-    return text[sent_start:sent_end]
 # returns percent matching a starting phrase(anchor)
 def pct_nearest_anchor_same_sentence(text, anchor_pat, stop_pat=None, max_chars=300,
                                     require_pat=None, block_pat=None, tail_chars=260):
-    m = anchor_pat.search(text)
-    if not m:
-        return None
-
-    sentence = _sentence_window(text, m, max_chars=max_chars)
-    if not sentence:
-        return None
-
-    if require_pat and not require_pat.search(sentence):
-        return None
-    if block_pat and block_pat.search(sentence):
-        return None
-
-    m2 = anchor_pat.search(sentence)
-    if not m2:
+    # the sentence boundaries and percents of text are found once and shared
+    # by the paid / credit fallbacks run on the same text
+    window = anchor_window(text)
+    found = window.anchor_sentence(anchor_pat, max_chars, require_pat, block_pat)
+    if not found:
         return None
 
     # scanning backwards produces better results
-    back = sentence[:m2.start()]
-    back_tail = back[-tail_chars:]
-    hits = list(PCT_ANY.finditer(back_tail))
-    if hits:
-        return hits[-1].group(1)
+    pct = window.pct_before(found, tail_chars)
+    if pct is not None:
+        return pct
 
     # scan forward from anchor is match was not found scanning back
-    forward = sentence[m2.end():]
-    if stop_pat:
-        s = stop_pat.search(forward)
-        if s:
-            forward = forward[:s.start()]
-
-    mf = PCT_ANY.search(forward)
-    return mf.group(1) if mf else None
+    return window.pct_after(found, stop_pat)
 
 # multiple charts use "paid" so must be exact
 paidAnchor_strict = re.compile(r"\bpaid\s+internship(?:s)?\b", re.IGNORECASE)
@@ -615,7 +462,7 @@ freqHeader = re.compile(r"\b(?:Internship\s*Frequency|Number\s+of\s+Internships)
 freqStop = re.compile(r"\b(?:Paid\b|For[-\s]*Credit|Academic\s+Credit|Conversion|Transition|Full[-–—]?Time|APPENDIX)\b",
     re.IGNORECASE)
 
-re = re.compile(r"(?is)(?:\bpercent\b|%).{0,220}\bpaid\b.{0,220}\binternship"
+paidReq = re.compile(r"(?is)(?:\bpercent\b|%).{0,220}\bpaid\b.{0,220}\binternship"
     r"|(?:\bpercent\b|%).{0,220}\binternship.{0,220}\bpaid\b")
 PAID_SENT_STRICT = re.compile(r"(?is)\b(?:\w+-)?percent\b\s*\(\s*(<?\d{1,3}(?:\.\d+)?)\s*%\s*\)"
     r".{0,220}?\bpaid\b.{0,220}?\binternship",)
@@ -660,213 +507,234 @@ def pct_after_label_in_lines(lines, label_pat, forward=6):
     return None
 
 
-for file in os.listdir(gradReportFolder):
-    if not file.endswith(".pdf"):
-        continue
-
-    year = file.split(" ")[0]
-    fullPath = os.path.join(gradReportFolder, file)
-
-    with pdfplumber.open(fullPath) as pdf:
-        page_texts = [p.extract_text() or "" for p in pdf.pages]
-
-        current_unit = None
-        last_school_norm = None
-        last_table_page = None
-        # finding name of current school
-        for page_num, page in enumerate(pdf.pages, start=1):
-            raw = page_texts[page_num - 1] or ""
-            top = "\n".join(raw.splitlines()[:40])
-            flat_top = " ".join(top.split())
-            if not re.search(r"Table\s+of\s+Contents|Contents\b", flat_top, re.IGNORECASE):
-                m_unit = school_pattern.search(flat_top)
-                if m_unit:
-                    cand = normalize_unit(m_unit.group(0))
-                    if cand:
-                        current_unit = cand
-                        last_school_norm = cand
-
-            lines_this = extract_table_lines_word_based(page)
-            if not lines_this:
-                continue
-            if not internshipHeader.search("\n".join(lines_this)):
-                continue
+# per document memory vars
+def new_document_state(year):
+    return {
+        "year": year,
+        "rows": {},  # (year_str, unit) -> row dict
+        "current_unit": None,
+        "last_school_norm": None,
+        "last_table_page": None,
+    }
 
-            lines_next = []
-            if page_num < len(pdf.pages):
-                next_page = pdf.pages[page_num]  # 0-indexed
-                lines_next = build_lines_from_words(next_page)
-                lines_next = clip_at_new_unit_or_appendix(lines_next)
-
-            window_lines = lines_this + lines_next
-            window_text = "\n".join(window_lines)
-
-            school_norm = current_unit
-            if not school_norm and last_school_norm and last_table_page == page_num - 1:
-                school_norm = last_school_norm
-            if not school_norm and last_school_norm is None:
-                school_norm = "University-Wide"
-            if not school_norm:
-                continue
+# state that flows from one page to the next
+CARRIED_STATE = ("current_unit", "last_school_norm", "last_table_page")
+
+# unit headers at the top of a page switch the current unit
+def update_unit_context(state, page_num, page_texts):
+    head = section_index(page_texts).header(page_num - 1)
+    if head is not None:
+        cand = normalize_unit(head)
+        if cand:
+            state["current_unit"] = cand
+            state["last_school_norm"] = cand
+
+# text-only part of process_page, cheap guess of the carried state
+prepass_page = update_unit_context
+
+# school for this page, None if the page should be skipped
+def current_school(state, page_num):
+    school_norm = state["current_unit"]
+    if not school_norm and state["last_school_norm"] and state["last_table_page"] == page_num - 1:
+        school_norm = state["last_school_norm"]
+    if not school_norm and state["last_school_norm"] is None:
+        school_norm = "University-Wide"
+    return school_norm
+
+# collects percent and frequency from one page
+def process_page(state, page_num, page, next_page, page_texts):
+    year = state["year"]
+    year_unit_data = state["rows"]
+
+    # finding name of current school
+    update_unit_context(state, page_num, page_texts)
+
+    lines_this = extract_table_lines_word_based(page)
+    if not lines_this:
+        return
+    if not internshipHeader.search("\n".join(lines_this)):
+        return
+
+    lines_next = []
+    if next_page is not None:
+        lines_next = build_lines_from_words(next_page)
+        lines_next = clip_at_new_unit_or_appendix(lines_next)
+
+    window_lines = lines_this + lines_next
+    window_text = "\n".join(window_lines)
+
+    school_norm = current_school(state, page_num)
+    if not school_norm:
+        return
+
+    participation_pct = pct_for_keyword(window_lines, participation_line_pat)
+    # --- Paid / For-credit: try line-based first, then paragraph-based fallback ---
+    paid_pct=None
+    credit_pct=None
+
+    if paid_pct is None or credit_pct is None:
+        joined = " ".join(window_lines)
+        if INSUFFICIENT_DATA.search(joined):
+            paid_pct = None
+            credit_pct = None
+        else:
+            # if "none" or "all" should be 0% or 100%
+            if paid_pct is None and paidNone.search(joined):
+                paid_pct = "0"
+
+            if credit_pct is None and allCredit.search(joined):
+                credit_pct = "100"
+
+            if paid_pct is None:
+                # using strict regex first
+                paid_pct = pct_nearest_anchor_same_sentence(
+                    joined,
+                    paidAnchor_strict,
+                    stop_pat=creditStop,
+                    max_chars=450,
+                    require_pat=percentReq,
+                    tail_chars=260
+                )
+
+            if paid_pct is None:
+                # use more relaxed if that doesnt work
+                paid_pct = pct_nearest_anchor_same_sentence(
+                    joined,
+                    loosePaid,
+                    stop_pat=creditStop,
+                    max_chars=450,
+                    require_pat=paidReq,
+                    block_pat=unpaidBlock,
+                    tail_chars=260
+                )
+
+            if credit_pct is None:
+                credit_pct = pct_nearest_anchor_same_sentence(
+                    joined,
+                    creditAnchor,
+                    stop_pat=None,
+                    max_chars=450,
+                    require_pat=percentReq,
+                    tail_chars=260
+                )
+
+    # if paid and credit end up identical, re-extract using strict sentence patterns
+    # prevents paid stealing credits percent
+    if paid_pct and credit_pct and paid_pct == credit_pct:
+        # prevents code breaking due to weird line breaks
+        joined = " ".join(window_lines)
+
+        mp = PAID_SENT_STRICT.search(joined)
+        mc = CREDIT_SENT_STRICT.search(joined)
+
+        paid_fix = mp.group(1) if mp else None
+        credit_fix = mc.group(1) if mc else None
+
+        # prefer fixes if they actually separate the values
+        if paid_fix and paid_fix != credit_pct:
+            paid_pct = paid_fix
+        if credit_fix and credit_fix != paid_pct:
+            credit_pct = credit_fix
+
+
+
+    # extract internship frequency percents
+    one_label = re.compile(rf"\b1\b{OPT_WS}(?:Internship(?:s)?)?\b", re.IGNORECASE)
+    two_label = re.compile(rf"\b2\b{OPT_WS}(?:Internship(?:s)?)?\b", re.IGNORECASE)
+    three_label = re.compile(rf"^\s*3{OPT_WS}\+(?=\s|$){OPT_WS}(?:Internship(?:s)?)?\b",re.IGNORECASE)
+
+    one_pct = None
+    two_pct = None
+    three_pct = None
+
+    freq_block = get_frequency_block_from_lines(window_lines)
+    if freq_block:
+        one_pct = pct_after_label_in_lines(freq_block, one_label, forward=6)
+        two_pct = pct_after_label_in_lines(freq_block, two_label, forward=6)
+        three_pct = pct_after_label_in_lines(freq_block, three_label, forward=6)
+
+
+    # conversion outcomes
+    conv = extract_conversion_outcomes_from_window(
+        window_lines,
+        year=year,
+    )
 
-            participation_pct = pct_for_keyword(window_lines, participation_line_pat)
-            # --- Paid / For-credit: try line-based first, then paragraph-based fallback ---
-            paid_pct=None
-            credit_pct=None
-
-            if paid_pct is None or credit_pct is None:
-                joined = " ".join(window_lines)
-                if INSUFFICIENT_DATA.search(joined):
-                    paid_pct = None
-                    credit_pct = None
-                else:
-                    # if "none" or "all" should be 0% or 100%
-                    if paid_pct is None and paidNone.search(joined):
-                        paid_pct = "0"
-
-                    if credit_pct is None and allCredit.search(joined):
-                        credit_pct = "100"
-
-                    if paid_pct is None:
-                        # using strict regex first
-                        paid_pct = pct_nearest_anchor_same_sentence(
-                            joined,
-                            paidAnchor_strict,
-                            stop_pat=creditStop,
-                            max_chars=450,
-                            require_pat=percentReq,
-                            tail_chars=260
-                        )
-
-                    if paid_pct is None:
-                        # use more relaxed if that doesnt work
-                        paid_pct = pct_nearest_anchor_same_sentence(
-                            joined,
-                            loosePaid,
-                            stop_pat=creditStop,
-                            max_chars=450,
-                            require_pat=re,
-                            block_pat=unpaidBlock,
-                            tail_chars=260
-                        )
-
-                    if credit_pct is None:
-                        credit_pct = pct_nearest_anchor_same_sentence(
-                            joined,
-                            creditAnchor,
-                            stop_pat=None,
-                            max_chars=450,
-                            require_pat=percentReq,
-                            tail_chars=260
-                        )
-
-            # if paid and credit end up identical, re-extract using strict sentence patterns
-            # prevents paid stealing credits percent
-            if paid_pct and credit_pct and paid_pct == credit_pct:
-                # prevents code breaking due to weird line breaks
-                joined = " ".join(window_lines)
-
-                mp = PAID_SENT_STRICT.search(joined)
-                mc = CREDIT_SENT_STRICT.search(joined)
-
-                paid_fix = mp.group(1) if mp else None
-                credit_fix = mc.group(1) if mc else None
-
-                # prefer fixes if they actually separate the values
-                if paid_fix and paid_fix != credit_pct:
-                    paid_pct = paid_fix
-                if credit_fix and credit_fix != paid_pct:
-                    credit_pct = credit_fix
-
-                
-
-            # extract internship frequency percents
-            one_label = re.compile(rf"\b1\b{OPT_WS}(?:Internship(?:s)?)?\b", re.IGNORECASE)
-            two_label = re.compile(rf"\b2\b{OPT_WS}(?:Internship(?:s)?)?\b", re.IGNORECASE)
-            three_label = re.compile(rf"^\s*3{OPT_WS}\+(?=\s|$){OPT_WS}(?:Internship(?:s)?)?\b",re.IGNORECASE)
-
-            one_pct = None
-            two_pct = None
-            three_pct = None
-
-            freq_block = get_frequency_block_from_lines(window_lines)
-            if freq_block:
-                one_pct = pct_after_label_in_lines(freq_block, one_label, forward=6)
-                two_pct = pct_after_label_in_lines(freq_block, two_label, forward=6)
-                three_pct = pct_after_label_in_lines(freq_block, three_label, forward=6)
-            
-
-            # conversion outcomes
-            conv = extract_conversion_outcomes_from_window(
-                window_lines,
-                year=year,
-            )
-
-            # SAFETY NET: never allow None to crash the script
-            if conv is None:
-                conv = {
-                    "accepted_pct": None,
-                    "offer_not_pct": None,
-                    "pursued_no_offer_pct": None,
-                    "did_not_pursue_pct": None
-                }
-
-
-            accepted_pct = conv.get("accepted_pct")
-            offer_not_pct = conv.get("offer_not_pct")
-            pursued_no_offer_pct = conv.get("pursued_no_offer_pct")
-            did_not_pursue_pct = conv.get("did_not_pursue_pct")
-
-            
-            key = (year, school_norm)
-            if key not in year_unit_data:
-                year_unit_data[key] = {
-                    "Unit": school_norm,
-                    "Year": year,
-                    "Internship Participation %": None,
-                    "1 Internship %": None,
-                    "2 Internships %": None,
-                    "3+ Internships %": None,
-                    "Paid Internship %": None,
-                    "For-Credit Internship %": None,
-                    "Accepted FT with Internship Employer %": None,
-                    "Received FT Offer (Not Accepted) %": None,
-                    "Pursued FT (No Offer) %": None,
-                    "Did Not Pursue FT with Host %": None,
-                }
-            if(three_pct == None and (one_pct != None and two_pct !=None)):
-                try:
-                    o = float(one_pct)
-                    t = float(two_pct)
-                    val = 100.0 - o - t
-
-                    # guard against PDF noise
-                    if 0 <= val <= 100:
-                        # round to nearest integer to match report style
-                        three_pct = str(int(round(val)))
-                except Exception:
-                    pass
+    # SAFETY NET: never allow None to crash the script
+    if conv is None:
+        conv = {
+            "accepted_pct": None,
+            "offer_not_pct": None,
+            "pursued_no_offer_pct": None,
+            "did_not_pursue_pct": None
+        }
 
-            row = year_unit_data[key]
-            row["Internship Participation %"] = participation_pct
-            row["1 Internship %"] = one_pct
-            row["2 Internships %"] = two_pct
-            row["3+ Internships %"] = three_pct
-            row["Paid Internship %"] = paid_pct
-            row["For-Credit Internship %"] = credit_pct
-            row["Accepted FT with Internship Employer %"] = accepted_pct
-            row["Received FT Offer (Not Accepted) %"] = offer_not_pct
-            row["Pursued FT (No Offer) %"] = pursued_no_offer_pct
-            row["Did Not Pursue FT with Host %"] = did_not_pursue_pct
-
-            last_school_norm = school_norm
-            last_table_page = page_num
 
-# csv creation
-years = sorted({int(year) for (year, _unit) in year_unit_data.keys()})
-template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
+    accepted_pct = conv.get("accepted_pct")
+    offer_not_pct = conv.get("offer_not_pct")
+    pursued_no_offer_pct = conv.get("pursued_no_offer_pct")
+    did_not_pursue_pct = conv.get("did_not_pursue_pct")
+
+
+    key = (year, school_norm)
+    if key not in year_unit_data:
+        year_unit_data[key] = {
+            "Unit": school_norm,
+            "Year": year,
+            "Internship Participation %": None,
+            "1 Internship %": None,
+            "2 Internships %": None,
+            "3+ Internships %": None,
+            "Paid Internship %": None,
+            "For-Credit Internship %": None,
+            "Accepted FT with Internship Employer %": None,
+            "Received FT Offer (Not Accepted) %": None,
+            "Pursued FT (No Offer) %": None,
+            "Did Not Pursue FT with Host %": None,
+        }
+    if(three_pct == None and (one_pct != None and two_pct !=None)):
+        try:
+            o = float(one_pct)
+            t = float(two_pct)
+            val = 100.0 - o - t
+
+            # guard against PDF noise
+            if 0 <= val <= 100:
+                # round to nearest integer to match report style
+                three_pct = str(int(round(val)))
+        except Exception:
+            pass
+
+    row = year_unit_data[key]
+    row["Internship Participation %"] = participation_pct
+    row["1 Internship %"] = one_pct
+    row["2 Internships %"] = two_pct
+    row["3+ Internships %"] = three_pct
+    row["Paid Internship %"] = paid_pct
+    row["For-Credit Internship %"] = credit_pct
+    row["Accepted FT with Internship Employer %"] = accepted_pct
+    row["Received FT Offer (Not Accepted) %"] = offer_not_pct
+    row["Pursued FT (No Offer) %"] = pursued_no_offer_pct
+    row["Did Not Pursue FT with Host %"] = did_not_pursue_pct
+    row["Page"] = page_num
+
+    state["last_school_norm"] = school_norm
+    state["last_table_page"] = page_num
+
+def document_results(state):
+    return state["rows"]
+
+# later reports win for the same (year, unit), like the old single loop
+def merge_results(partials):
+    year_unit_data = {}
+    for rows in partials:
+        year_unit_data.update(rows)
+    return year_unit_data
 
-metric_cols = [
+# csv creation
+# csv metric columns, all percents (column types for typed output, see
+# typed_output)
+PERCENT_COLUMNS = (
     "Internship Participation %",
     "1 Internship %",
     "2 Internships %",
@@ -877,25 +745,54 @@ metric_cols = [
     "Received FT Offer (Not Accepted) %",
     "Pursued FT (No Offer) %",
     "Did Not Pursue FT with Host %",
-]
-
-final_rows = []
-for base in template_rows:
-    yr = base["Year"]
-    unit = base["Unit"]
-    key = (str(yr), unit)
-
-    found = year_unit_data.get(key, {})
-    row = dict(base)
-    for col in metric_cols:
-        row[col] = found.get(col, "") or ""
-    final_rows.append(row)
-
-df = pd.DataFrame(final_rows)
-for c in metric_cols:
-    if c not in df.columns:
-        df[c] = ""
-
-df = df[["Unit", "Year"] + metric_cols]
-out_path = None
-df.to_csv(out_path, index=False)
\ No newline at end of file
+)
+COUNT_COLUMNS = ()
+METRIC_COLUMNS = list(PERCENT_COLUMNS)
+
+
+# writes the csv and returns its frame
+def write_csv(year_unit_data, out_path):
+    years = sorted({int(year) for (year, _unit) in year_unit_data.keys()})
+    template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
+
+    metric_cols = list(METRIC_COLUMNS)
+
+    final_rows = []
+    for base in template_rows:
+        yr = base["Year"]
+        unit = base["Unit"]
+        key = (str(yr), unit)
+
+        found = year_unit_data.get(key, {})
+        row = dict(base)
+        for col in metric_cols:
+            row[col] = found.get(col, "") or ""
+        final_rows.append(row)
+
+    return write_rows(final_rows, ["Unit", "Year"] + metric_cols, out_path)
+
+
+# one document's rows for the fact store: (years, [(year, unit, column,
+# value, page)]), blank values included since a later report's row replaces
+# an earlier one whole
+def document_facts(year_unit_data):
+    years = sorted({int(year) for (year, _unit) in year_unit_data})
+    facts = [(int(year), unit, col, row.get(col), row.get("Page"))
+             for (year, unit), row in year_unit_data.items() for col in METRIC_COLUMNS]
+    return years, facts
+
+
+# csv from fact store values {(year, unit): {column: value}}
+def write_facts(years, values, out_path):
+    return write_csv({(str(year), unit): row for (year, unit), row in values.items()}, out_path)
+
+
+def main():
+    from cli import script_main
+
+    script_main("internship", {"input": gradReportFolder, "output": out_path,
+                               "cache_dir": layoutCacheFolder, "workers": workerCount})
+
+
+if __name__ == "__main__":
+    main()
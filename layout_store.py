@@ -0,0 +1,399 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+
+from page_layout import WordStore, release_page
+from pdf_backend import open_pdf
+
+# persistent on-disk cache of per-page words and page text
+# warm runs are served straight from the cache file and never parse the pdf
+#
+# file layout (all sections 8-byte aligned):
+#   MAGIC | u64 header length | json header | column sections...
+# columns: x0, x1, top, bottom (float64 per word), word_page (word offsets per
+# page), word_text_off + word_text (utf-8 blob), page_text_off + page_text
+
+# bump whenever word/text extraction settings change so old caches are ignored
+PARSER_VERSION = "1"
+
+# libraries whose versions decide the words a page gives, part of the cache key
+PARSER_LIBRARIES = ("pdfplumber", "pdfminer.six")
+
+MAGIC = b"GRLAYOUT"
+WORD_COLUMNS = ("x0", "x1", "top", "bottom")
+# every section of a layout in file order, with its array typecode
+SECTION_TYPES = {
+    **{name: "d" for name in WORD_COLUMNS},
+    "word_page": "Q",
+    "word_text_off": "Q",
+    "word_text": "B",
+    "page_text_off": "Q",
+    "page_text": "B",
+}
+
+
+# content hash of a report, so renamed/copied files share one cache entry
+def report_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+_layout_version = None
+
+
+# installed version of a distribution, from its dist-info folder name on
+# sys.path; importlib.metadata (which imports email, zipfile, ...) is only the
+# fallback, it would cost a cached run more than half its startup
+def _library_version(name):
+    prefix = name.replace(".", "_").replace("-", "_").lower() + "-"
+    for folder in sys.path:
+        try:
+            entries = os.listdir(folder or ".")
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.endswith(".dist-info") and entry.lower().startswith(prefix):
+                return entry[len(prefix):-len(".dist-info")]
+
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "missing"
+
+
+# PARSER_VERSION plus the installed parser library versions, so a library
+# upgrade misses everything kept from the words the old one gave
+def layout_version():
+    global _layout_version
+    if _layout_version is None:
+        parts = [PARSER_VERSION] + [f"{name}{_library_version(name)}" for name in PARSER_LIBRARIES]
+        _layout_version = "-".join(parts)
+    return _layout_version
+
+
+def cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}-v{layout_version()}.layout")
+
+
+def _pad(n):
+    return (8 - n % 8) % 8
+
+
+# columns for a run of pdfplumber pages (a whole document or one shard of it)
+def columns_from_pages(pages):
+    cols = {name: array("d") for name in WORD_COLUMNS}
+    word_page = array("Q", [0])
+    word_text_off = array("Q", [0])
+    word_text = bytearray()
+    page_text_off = array("Q", [0])
+    page_text = bytearray()
+    widths = []
+    heights = []
+
+    for page in pages:
+        for w in page.extract_words(use_text_flow=True) or []:
+            cols["x0"].append(w.get("x0", 0.0))
+            cols["x1"].append(w.get("x1", 0.0))
+            cols["top"].append(w["top"])
+            cols["bottom"].append(w.get("bottom", w["top"]))
+            word_text += (w.get("text") or "").encode("utf-8")
+            word_text_off.append(len(word_text))
+        word_page.append(len(cols["x0"]))
+
+        page_text += (page.extract_text() or "").encode("utf-8")
+        page_text_off.append(len(page_text))
+
+        widths.append(float(page.width))
+        heights.append(float(page.height))
+        release_page(page)
+
+    sections = dict(cols)
+    sections["word_page"] = word_page
+    sections["word_text_off"] = word_text_off
+    sections["word_text"] = bytes(word_text)
+    sections["page_text_off"] = page_text_off
+    sections["page_text"] = bytes(page_text)
+    return widths, heights, sections
+
+
+# parses pages [start, end) of a report, used by page-shard workers
+def parse_page_range(path, start, end):
+    with open_pdf(path) as pdf:
+        return columns_from_pages(pdf.pages[start:end])
+
+
+# joins shard columns back into one document, offsets are rebased per shard
+def concat_columns(parts):
+    widths = []
+    heights = []
+    sections = {name: array("d") for name in WORD_COLUMNS}
+    for name in ("word_page", "word_text_off", "page_text_off"):
+        sections[name] = array("Q", [0])
+    word_text = bytearray()
+    page_text = bytearray()
+
+    for part_widths, part_heights, part in parts:
+        widths.extend(part_widths)
+        heights.extend(part_heights)
+        n_words = len(sections["x0"])
+        for name in WORD_COLUMNS:
+            sections[name].extend(part[name])
+        sections["word_page"].extend(off + n_words for off in part["word_page"][1:])
+        sections["word_text_off"].extend(off + len(word_text) for off in part["word_text_off"][1:])
+        sections["page_text_off"].extend(off + len(page_text) for off in part["page_text_off"][1:])
+        word_text += part["word_text"]
+        page_text += part["page_text"]
+
+    # same section order as columns_from_pages
+    return widths, heights, {
+        **{name: sections[name] for name in WORD_COLUMNS},
+        "word_page": sections["word_page"],
+        "word_text_off": sections["word_text_off"],
+        "word_text": bytes(word_text),
+        "page_text_off": sections["page_text_off"],
+        "page_text": bytes(page_text),
+    }
+
+
+# file header for sections of the given [(name, nbytes, typecode)], in order
+def _header(widths, heights, sizes):
+    layout = {}
+    offset = 0
+    for name, nbytes, typecode in sizes:
+        layout[name] = [offset, nbytes, typecode]
+        offset += nbytes + _pad(nbytes)
+    header = json.dumps({
+        "parser_version": layout_version(),
+        "widths": widths,
+        "heights": heights,
+        "sections": layout,
+    }).encode("utf-8")
+    return header + b" " * _pad(len(MAGIC) + 8 + len(header))
+
+
+# write_sections(f) writes the padded sections after the header
+def _write_file(path, header, write_sections):
+    # write to a temp file first so a crashed run never leaves half a cache
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            write_sections(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_layout(path, widths, heights, sections):
+    raws = []
+    for name, data in sections.items():
+        raw = data.tobytes() if isinstance(data, array) else bytes(data)
+        raws.append((name, raw, data.typecode if isinstance(data, array) else "B"))
+
+    def write_sections(f):
+        for _name, raw, _typecode in raws:
+            f.write(raw)
+            f.write(b"\0" * _pad(len(raw)))
+
+    header = _header(widths, heights, [(name, len(raw), typecode) for name, raw, typecode in raws])
+    _write_file(path, header, write_sections)
+
+
+# a layout file built from page-range columns as they come (a report's parse
+# chunks, in page order), each section spooled to a temp file so no more than
+# one range is held in memory; close() writes the same file as
+# write_layout(path, *concat_columns(ranges))
+class LayoutWriter:
+    def __init__(self, path):
+        import tempfile
+
+        self.path = path
+        self.widths = []
+        self.heights = []
+        self.spools = {}
+        for name in SECTION_TYPES:
+            self.spools[name] = tempfile.TemporaryFile(dir=os.path.dirname(path) or None)
+        self.sizes = dict.fromkeys(SECTION_TYPES, 0)
+        self.n_words = 0
+        self.word_text_len = 0
+        self.page_text_len = 0
+        for name in ("word_page", "word_text_off", "page_text_off"):
+            self._write(name, array("Q", [0]))
+
+    def _write(self, name, data):
+        raw = data.tobytes() if isinstance(data, array) else bytes(data)
+        self.spools[name].write(raw)
+        self.sizes[name] += len(raw)
+
+    # adds the next page range's (widths, heights, sections), offsets rebased
+    # as concat_columns does
+    def add(self, widths, heights, part):
+        self.widths.extend(widths)
+        self.heights.extend(heights)
+        for name in WORD_COLUMNS:
+            self._write(name, part[name])
+        self._write("word_page", array("Q", (off + self.n_words for off in part["word_page"][1:])))
+        self._write("word_text_off",
+                    array("Q", (off + self.word_text_len for off in part["word_text_off"][1:])))
+        self._write("page_text_off",
+                    array("Q", (off + self.page_text_len for off in part["page_text_off"][1:])))
+        self._write("word_text", part["word_text"])
+        self._write("page_text", part["page_text"])
+        self.n_words += len(part["x0"])
+        self.word_text_len += len(part["word_text"])
+        self.page_text_len += len(part["page_text"])
+
+    def close(self):
+        def write_sections(f):
+            for name in SECTION_TYPES:
+                spool = self.spools[name]
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                f.write(b"\0" * _pad(self.sizes[name]))
+
+        try:
+            sizes = [(name, self.sizes[name], typecode) for name, typecode in SECTION_TYPES.items()]
+            _write_file(self.path, _header(self.widths, self.heights, sizes), write_sections)
+        finally:
+            self.discard()
+
+    # drops the spooled sections without writing the file
+    def discard(self):
+        for spool in self.spools.values():
+            spool.close()
+        self.spools = {}
+
+
+# memory-maps a cache file and returns (widths, heights, sections)
+# any unreadable file (empty, truncated, partly written, old parser) raises
+# ValueError, which callers take as a cache miss
+def read_layout(path):
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buf)
+    try:
+        return _read_sections(path, view)
+    except (struct.error, IndexError, KeyError, TypeError) as e:
+        raise ValueError(f"corrupt layout cache file: {path}") from e
+
+
+def _read_sections(path, view):
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"not a layout cache file: {path}")
+    (header_len,) = struct.unpack_from("<Q", view, len(MAGIC))
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(view[start:start + header_len]))
+    if header.get("parser_version") != layout_version():
+        raise ValueError(f"stale layout cache file: {path}")
+
+    data_start = start + header_len
+    sections = {}
+    for name, (offset, nbytes, typecode) in header["sections"].items():
+        if data_start + offset + nbytes > len(view):
+            raise ValueError(f"truncated layout cache file: {path}")
+        chunk = view[data_start + offset:data_start + offset + nbytes]
+        sections[name] = chunk if typecode == "B" else chunk.cast(typecode)
+    return header["widths"], header["heights"], sections
+
+
+# stand-in for a pdfplumber page backed by the cached columns
+# supports the parts of the page API the extractors use
+class CachedPage:
+    def __init__(self, doc, index):
+        self.pdf = doc
+        self.page_number = index + 1
+        self.width = doc.widths[index]
+        self.height = doc.heights[index]
+        self.bbox = (0, 0, self.width, self.height)
+        self._index = index
+
+    def extract_words(self, use_text_flow=True, **kwargs):
+        if not use_text_flow or kwargs:
+            raise ValueError("cached pages only hold extract_words(use_text_flow=True)")
+        s = self.pdf.sections
+        w0, w1 = s["word_page"][self._index], s["word_page"][self._index + 1]
+        off = s["word_text_off"]
+        blob = s["word_text"]
+        x0, x1, top, bottom = s["x0"], s["x1"], s["top"], s["bottom"]
+        words = []
+        for j in range(w0, w1):
+            words.append({
+                "text": bytes(blob[off[j]:off[j + 1]]).decode("utf-8"),
+                "x0": x0[j],
+                "x1": x1[j],
+                "top": top[j],
+                "bottom": bottom[j],
+            })
+        return words
+
+    # the page's words for page_layout.page_words, sliced from the columns
+    # without building a dict per word
+    def word_store(self):
+        s = self.pdf.sections
+        w0, w1 = s["word_page"][self._index], s["word_page"][self._index + 1]
+        off = s["word_text_off"]
+        blob = s["word_text"]
+        text = [sys.intern(bytes(blob[off[j]:off[j + 1]]).decode("utf-8")) for j in range(w0, w1)]
+        return WordStore(text, s["x0"][w0:w1], s["x1"][w0:w1], s["top"][w0:w1], s["bottom"][w0:w1])
+
+    def extract_text(self, **kwargs):
+        s = self.pdf.sections
+        off = s["page_text_off"]
+        return bytes(s["page_text"][off[self._index]:off[self._index + 1]]).decode("utf-8")
+
+    def close(self):
+        pass
+
+
+# stand-in for a pdfplumber PDF, usable as a context manager
+class CachedDocument:
+    def __init__(self, path, widths, heights, sections):
+        self.path = path
+        self.widths = widths
+        self.heights = heights
+        self.sections = sections
+        self.pages = [CachedPage(self, i) for i in range(len(widths))]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pages = []
+        self.sections = {}
+
+
+# opens a report through the layout cache
+# without a cache_dir this is just the pdf backend's open
+def open_report(path, cache_dir=None):
+    if cache_dir is None:
+        return open_pdf(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = cache_path(cache_dir, report_hash(path))
+    if os.path.exists(cached):
+        try:
+            return CachedDocument(path, *read_layout(cached))
+        except ValueError:
+            pass
+
+    with open_pdf(path) as pdf:
+        widths, heights, sections = columns_from_pages(pdf.pages)
+    write_layout(cached, widths, heights, sections)
+    return CachedDocument(path, widths, heights, sections)
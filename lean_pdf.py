@@ -0,0 +1,114 @@
+from unicodedata import normalize as normalize_unicode
+
+import pdfplumber
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LTChar, LTContainer
+from pdfminer.pdfinterp import PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+from pdfplumber.page import Page
+from pdfplumber.utils.exceptions import PdfminerException
+
+# the "lean" pdf backend (see pdf_backend): pdfplumber pages whose chars come
+# from a trimmed pdfminer pass
+#
+# pdfplumber turns every layout object of a page into a dict of all its
+# attributes (colours, graphics state, font, matrix, resolved through the pdf
+# object tree) before extract_words / extract_text see the chars; that
+# conversion, not pdfminer, is most of a page's parse time. here paths and
+# images are dropped while the page is interpreted and a char becomes a dict
+# of just the keys word and text extraction read, with pdfplumber's own
+# coordinate arithmetic, so words and text come out the same
+
+
+# layout device that only collects chars (and the figures holding them)
+class CharAggregator(PDFPageAggregator):
+    def paint_path(self, gstate, stroke, fill, evenodd, path):
+        pass
+
+    def render_image(self, name, stream):
+        pass
+
+
+class LeanPage(Page):
+    @property
+    def layout(self):
+        if hasattr(self, "_layout"):
+            return self._layout
+        device = CharAggregator(self.pdf.rsrcmgr, pageno=self.page_number, laparams=None)
+        interpreter = PDFPageInterpreter(self.pdf.rsrcmgr, device)
+        try:
+            interpreter.process_page(self.page_obj)
+        except Exception as e:
+            raise PdfminerException(e)
+        self._layout = device.get_result()
+        return self._layout
+
+    def parse_objects(self):
+        chars = []
+        mb_x0, mb_top = self.mediabox[:2]
+        height = self.height
+        doctop = self.initial_doctop
+        norm = self.pdf.unicode_norm
+        page_number = self.page_number
+
+        stack = [iter(self.layout._objs)]
+        while stack:
+            for obj in stack[-1]:
+                if isinstance(obj, LTContainer):
+                    stack.append(iter(obj._objs))
+                    break
+                if not isinstance(obj, LTChar):
+                    continue
+                text = obj.get_text()
+                top = (height - obj.y1) + mb_top
+                x0, x1 = obj.x0, obj.x1
+                if mb_x0 != 0:
+                    x0 = x0 + mb_x0
+                    x1 = x1 + mb_x0
+                chars.append({
+                    "object_type": "char",
+                    "page_number": page_number,
+                    "text": normalize_unicode(norm, text) if norm is not None else text,
+                    "fontname": obj.fontname,
+                    "size": obj.size,
+                    "upright": obj.upright,
+                    "x0": x0,
+                    "x1": x1,
+                    "y0": obj.y0,
+                    "y1": obj.y1,
+                    "width": obj.width,
+                    "height": obj.height,
+                    "top": top,
+                    "bottom": (height - obj.y0) + mb_top,
+                    "doctop": doctop + top,
+                })
+            else:
+                stack.pop()
+        return {"char": chars}
+
+
+class LeanPDF(pdfplumber.PDF):
+    @property
+    def pages(self):
+        if hasattr(self, "_pages"):
+            return self._pages
+
+        doctop = 0
+        pp = self.pages_to_parse
+        self._pages = []
+        try:
+            page_objs = list(PDFPage.create_pages(self.doc))
+        except Exception as e:
+            raise PdfminerException(e)
+        for i, page_obj in enumerate(page_objs):
+            page_number = i + 1
+            if pp is not None and page_number not in pp:
+                continue
+            page = LeanPage(self, page_obj, page_number=page_number, initial_doctop=doctop)
+            self._pages.append(page)
+            doctop += page.height
+        return self._pages
+
+
+def open_pdf(path):
+    return LeanPDF.open(path)
@@ -1,112 +1,34 @@
-import pdfplumber
-import pandas as pd
-import os
 import re
 
-gradReportFolder = None
+from anchor_text import anchor_window
+from csv_output import write_rows
+from page_layout import build_lines_from_words, column_layout, top_lines
+from section_index import section_index
+from unit_names import UNIT_ORDER as unit_order, normalize_unit
 
-# order for csv rows
-unit_order = [
-    "University-Wide",
-    "College of Agriculture and Natural Resources",
-    "College of Arts and Humanities",
-    "College of Behavioral and Social Sciences",
-    "College of Computer, Mathematical, and Natural Sciences",
-    "College of Education",
-    "College of Information",
-    "The A. James Clark School of Engineering",
-    "Philip Merrill College of Journalism",
-    "School of Architecture, Planning, and Preservation",
-    "School of Public Health",
-    "School of Public Policy",
-    "The Robert H. Smith School of Business",
-    "College Park Scholars",
-    "Honors College",
-    "Letters and Sciences",
-    "Undergraduate Studies"
-]
-unit_mapping = {u.lower(): u for u in unit_order}
-
-# normalize differences in unit names
-def normalize_unit(name):
-    if not name:
-        return None
-    n = " ".join(name.strip().split()).lower()
-    n = n.replace("&", "and")
-    n = n.replace("university wide", "university-wide")
-    n = n.replace("letters & sciences", "letters and sciences")
-    n = n.replace("college of information studies", "college of information")
-    n = n.replace("school of architecture, planning and preservation",
-                  "school of architecture, planning, and preservation")
-    n = n.replace("phillip merrill college of journalism", "philip merrill college of journalism")
-    n = n.replace("office of undergraduate studies", "undergraduate studies")
-    n = n.replace("office of undergrad studies", "undergraduate studies")
-    n = n.replace("the school of public policy", "school of public policy")
-    n = n.replace("school of public policy and administration", "school of public policy")
-
-    if "clark school of engineering" in n:
-        n = "the a. james clark school of engineering"
-    if n in ["overall"]:
-        n = "university-wide"
-    if n in ["a. james clark school of engineering", "james clark school of engineering"]:
-        n = "the a. james clark school of engineering"
-    if n.startswith("college of computer, mathematical"):
-        n = "college of computer, mathematical, and natural sciences"
-    if "school of architecture" in n:
-        n = "school of architecture, planning, and preservation"
-
-    return unit_mapping.get(n, None)
-
-# all schools in reports
-school_pattern = re.compile(
-    r"("
-    r"College of Agriculture and Natural Resources|"
-    r"College of Arts and Humanities|"
-    r"College of Behavioral and Social Sciences|"
-    r"College of Computer, Mathematical, and Natural Sciences|"
-    r"College of Computer, Mathematical,|"
-    r"College of Computer, Mathematical|"
-    r"College of Education|"
-    r"College of Information Studies|"
-    r"College of Information|"
-    r"(?:The\s+)?A\.?\s*James\s+Clark\s+School\s+of\s+Engineering|"
-    r"Clark\s+School\s+of\s+Engineering|"
-    r"Philip Merrill College of Journalism|"
-    r"Phillip Merrill College of Journalism|"
-    r"School of Architecture, Planning, and Preservation|"
-    r"SCHOOL OF ARCHITECTURE, PLANNING|"
-    r"School of Architecture, Planning and Preservation|"
-    r"SCHOOL OF ARCHITECTURE,\s*PLANNING\s*AND\s*PRESERVATION|"
-    r"SCHOOL OF PUBLIC HEALTH|"
-    r"School of Public Health|"
-    r"School of Public Policy|"
-    r"The School of Public Policy|"
-    r"School of Public Policy and Administration|"
-    r"The Robert H\. Smith School of Business|"
-    r"College Park Scholars|"
-    r"Honors College|"
-    r"Letters\s*&\s*Sciences|"
-    r"Letters and Sciences|"
-    r"Overall|"
-    r"University Wide|"
-    r"University-Wide|"
-    r"Undergraduate Studies|"
-    r"Office of Undergraduate Studies|"
-    r"OFFICE OF UNDERGRADUATE STUDIES|"
-    r")",
-    re.IGNORECASE
-)
+gradReportFolder = None
+out_path = None
+# set to a folder to keep parsed page layouts between runs
+layoutCacheFolder = None
+# worker processes for reports (1 = serial, 0 = one per core)
+workerCount = 1
+CSV_NAME = "nature_of_position_week3.csv"
+# code changes are picked up by result_cache's fingerprint; bump this when
+# rows change for another reason (e.g. a pdfplumber upgrade)
+EXTRACTOR_VERSION = "1"
 
 # regex helpers
 WS = r"(?:[\s\u00A0]+)"
 PCT_ANY = re.compile(r"\(?(<?\d{1,3}(?:\.\d+)?)\s*%\)?")
 COUNT_ANY = re.compile(r"\b([\d]{1,3}(?:,\d{3})+|\d+)\b")
-SENT_BOUNDARY = re.compile(r"[.!?\n]")
 
 # section header + stop
 sectionHeader = re.compile(rf"\bNATURE{WS}OF{WS}POSITION\b", re.IGNORECASE)
 salaryStop = re.compile(r"\bSALARY\b|\bAPPENDIX\b", re.IGNORECASE)  # stop at salary/appendix
 
+# words that have to be on a page for it to hold the nature of position section
+PAGE_MARKERS = (("nature", "of", "position"),)
+
 # total response
 totalN = re.compile(
     rf"("
@@ -167,27 +89,6 @@ FIELD_UNRELATED_LBL = re.compile(r"\bUnrelated\b", re.IGNORECASE)
 
 percentReq = re.compile(r"\bpercent\b|%", re.IGNORECASE)
 
-# word based line reconstruction 
-def build_lines_from_words(page, y_tol=2.0):
-    words = page.extract_words(use_text_flow=True) or []
-    rows = {}
-    for w in words:
-        txt = (w.get("text") or "").strip()
-        if not txt:
-            continue
-        y = w["top"]
-        key = round(y / y_tol) * y_tol
-        rows.setdefault(key, []).append(w)
-
-    lines = []
-    for y in sorted(rows.keys()):
-        row_words = sorted(rows[y], key=lambda ww: ww["x0"])
-        line = " ".join(ww["text"] for ww in row_words)
-        line = " ".join(line.split())
-        if line:
-            lines.append(line)
-    return lines
-
 def clip_at_stop(lines):
     out = []
     for ln in lines:
@@ -215,9 +116,7 @@ def extract_nature_block_with_pre(page, next_page=None, pre_lines=90, post_lines
     block = lines[a:b]
 
     if next_page is not None:
-        nxt = build_lines_from_words(next_page)
-        if nxt:
-            block = block + nxt[:60]
+        block = block + top_lines(next_page, 60)
 
     block = clip_at_stop(block)
     return block
@@ -226,108 +125,47 @@ def extract_nature_block_with_pre(page, next_page=None, pre_lines=90, post_lines
 def _sentence_window(text, anchor_match, max_chars=400):
     if not text or not anchor_match:
         return ""
-
-    a0, a1 = anchor_match.start(), anchor_match.end()
-
-    left_limit = max(0, a0 - max_chars)
-    left_chunk = text[left_limit:a0]
-    left_boundary_idx = None
-    for m in SENT_BOUNDARY.finditer(left_chunk):
-        left_boundary_idx = m.end()
-    sent_start = left_limit + (left_boundary_idx if left_boundary_idx is not None else 0)
-
-    right_limit = min(len(text), a1 + max_chars)
-    right_chunk = text[a1:right_limit]
-    m_right = SENT_BOUNDARY.search(right_chunk)
-    sent_end = a1 + (m_right.end() if m_right else len(right_chunk))
-
-    return text[sent_start:sent_end]
+    start, end = anchor_window(text).sentence_span(anchor_match, max_chars)
+    return text[start:end]
 
 # extracts percent closest to the anchor phrase
 def pct_nearest_anchor_same_sentence(text, anchor_pat, stop_pat=None, max_chars=300,
                                     require_pat=None, block_pat=None, tail_chars=260, backScan=None):
-    m = anchor_pat.search(text)
-    if not m:
-        return None
-
-    sentence = _sentence_window(text, m, max_chars=max_chars)
-    if not sentence:
-        return None
-
-    if require_pat and not require_pat.search(sentence):
-        return None
-    if block_pat and block_pat.search(sentence):
-        return None
-
-    m2 = anchor_pat.search(sentence)
-    if not m2:
+    window = anchor_window(text)
+    found = window.anchor_sentence(anchor_pat, max_chars, require_pat, block_pat)
+    if not found:
         return None
 
+    m2 = found[2]
     if m2.lastindex and m2.lastindex >= 1:
         g1 = m2.group(1)
         if g1 is not None:
             return g1
 
     if backScan is False:
-        forward = sentence[m2.end():]
-        if stop_pat:
-            s = stop_pat.search(forward)
-            if s:
-                forward = forward[:s.start()]
-        mf = PCT_ANY.search(forward)
-        return mf.group(1) if mf else None
+        return window.pct_after(found, stop_pat)
 
     if backScan is True:
-        back = sentence[:m2.start()]
-        hits = list(PCT_ANY.finditer(back[-tail_chars:]))
-        return hits[-1].group(1) if hits else None
-
-    back = sentence[:m2.start()]
-    hits = list(PCT_ANY.finditer(back[-tail_chars:]))
-    if hits:
-        return hits[-1].group(1)
-
-    forward = sentence[m2.end():]
-    if stop_pat:
-        s = stop_pat.search(forward)
-        if s:
-            forward = forward[:s.start()]
-    mf = PCT_ANY.search(forward)
-    return mf.group(1) if mf else None
+        return window.pct_before(found, tail_chars)
+
+    pct = window.pct_before(found, tail_chars)
+    if pct is not None:
+        return pct
+    return window.pct_after(found, stop_pat)
 
 # for extracting bill pay percent
 # takes nearest percent near anchor phrase
 def pct_nearest_anchor_billpay(text, anchor_pat, stop_pat=None, max_chars=300,
                               require_pat=None, block_pat=None, tail_chars=260):
-    m = anchor_pat.search(text)
-    if not m:
+    window = anchor_window(text)
+    found = window.anchor_sentence(anchor_pat, max_chars, require_pat, block_pat)
+    if not found:
         return None
 
-    sentence = _sentence_window(text, m, max_chars=max_chars)
-    if not sentence:
-        return None
-
-    if require_pat and not require_pat.search(sentence):
-        return None
-    if block_pat and block_pat.search(sentence):
-        return None
-
-    m2 = anchor_pat.search(sentence)
-    if not m2:
-        return None
-
-    back = sentence[:m2.start()]
-    hits = list(PCT_ANY.finditer(back[-tail_chars:]))
-    if hits:
-        return hits[-1].group(1)
-
-    forward = sentence[m2.end():]
-    if stop_pat:
-        s = stop_pat.search(forward)
-        if s:
-            forward = forward[:s.start()]
-    mf = PCT_ANY.search(forward)
-    return mf.group(1) if mf else None
+    pct = window.pct_before(found, tail_chars)
+    if pct is not None:
+        return pct
+    return window.pct_after(found, stop_pat)
 
 # Percent & N helpers
 def _pct_near_line(lines, idx, back=6, forward=2):
@@ -375,52 +213,10 @@ def count_for_keyword(lines, keyword):
                     return nums[0].group(1)
     return None
 
-# build line objects with x filtering so we can isolate LEFT column
-# helps with 2020-2023 split pages
-def build_line_objs_from_words(page, *, x0_min=None, x0_max=None, y_tol=2.0):
-    words = page.extract_words(use_text_flow=True) or []
-    rows = {}
-    for w in words:
-        txt = (w.get("text") or "").strip()
-        if not txt:
-            continue
-
-        x0 = w.get("x0", 0.0)
-        if x0_min is not None and x0 < x0_min:
-            continue
-        if x0_max is not None and x0 > x0_max:
-            continue
-
-        y = w["top"]
-        key = round(y / y_tol) * y_tol
-        rows.setdefault(key, []).append(w)
-
-    out = []
-    for y in sorted(rows.keys()):
-        row_words = sorted(rows[y], key=lambda ww: ww["x0"])
-        line = " ".join(ww["text"] for ww in row_words)
-        line = " ".join(line.split())
-        if line:
-            out.append({"y": y, "text": line})
-    return out
-
 # indicates if a page is split by a line like 2020-2023
-# returns true if there are alot of words on both sides of the page midpoint
+# true if there are alot of words on both sides of the page midpoint
 def page_looks_split(page):
-    words = page.extract_words(use_text_flow=True) or []
-    if not words:
-        return False
-
-    mid = page.width / 2.0
-    left = sum(1 for w in words if w.get("x0", 0) < mid - 10)
-    right = sum(1 for w in words if w.get("x0", 0) > mid + 10)
-
-    total = left + right
-    if total == 0:
-        return False
-
-    # if both sides have substantial content, it's split
-    return (left / total) > 0.30 and (right / total) > 0.30
+    return column_layout(page).split
 
 # takes lines starting at nature of position header for non split pages
 def extract_post2020_block_from_header(page, next_page=None, post_lines=240):
@@ -439,9 +235,7 @@ def extract_post2020_block_from_header(page, next_page=None, post_lines=240):
     block = lines[start_idx:start_idx + post_lines]
 
     if next_page is not None:
-        nxt = build_lines_from_words(next_page)
-        if nxt:
-            block = block + nxt[:60]
+        block = block + top_lines(next_page, 60)
 
     block = clip_at_stop(block)
     return block
@@ -449,13 +243,14 @@ def extract_post2020_block_from_header(page, next_page=None, post_lines=240):
 
 # extracts nature of position info from left or right side of the page only (for 2020-2023)
 def extract_post2020_blocks_split_safe(page, next_page=None, post_lines=240):
-    all_objs = build_line_objs_from_words(page)
+    layout = column_layout(page)
+    all_objs = layout.lines
     if not all_objs:
         return None, None, None
 
     start_idx = None
     for i, L in enumerate(all_objs):
-        if sectionHeader.search(L["text"]):
+        if sectionHeader.search(L.text):
             start_idx = i
             break
     if start_idx is None:
@@ -464,41 +259,34 @@ def extract_post2020_blocks_split_safe(page, next_page=None, post_lines=240):
     a = start_idx
     b = min(len(all_objs), start_idx + post_lines)
 
-    all_lines = [x["text"] for x in all_objs[a:b]]
+    all_lines = [x.text for x in all_objs[a:b]]
     all_lines = clip_at_stop(all_lines)
 
     # y-range for the block
-    y0 = all_objs[a]["y"] - 3
-    y1 = all_objs[b - 1]["y"] + 18
-
-    mid = page.width / 2.0
+    y0 = all_objs[a].y - 3
+    y1 = all_objs[b - 1].y + 18
 
     # LEFT column
-    left_objs = build_line_objs_from_words(page, x0_max=mid)
-    left_lines = [x["text"] for x in left_objs if (y0 <= x["y"] <= y1)]
+    left_lines = [x.text for x in layout.lines_between("left", y0, y1)]
     left_lines = clip_at_stop(left_lines)
 
     # RIGHT column
-    right_objs = build_line_objs_from_words(page, x0_min=mid)
-    right_lines = [x["text"] for x in right_objs if (y0 <= x["y"] <= y1)]
+    right_lines = [x.text for x in layout.lines_between("right", y0, y1)]
     right_lines = clip_at_stop(right_lines)
 
     if next_page is not None:
-        mid2 = next_page.width / 2.0
+        next_layout = column_layout(next_page)
 
         # extend LEFT
-        left_next = build_line_objs_from_words(next_page, x0_max=mid2)
-        left_lines.extend([x["text"] for x in left_next[:40]])
+        left_lines.extend([x.text for x in next_layout.left[:40]])
         left_lines = clip_at_stop(left_lines)
 
         # extend RIGHT
-        right_next = build_line_objs_from_words(next_page, x0_min=mid2)
-        right_lines.extend([x["text"] for x in right_next[:40]])
+        right_lines.extend([x.text for x in next_layout.right[:40]])
         right_lines = clip_at_stop(right_lines)
 
         # extend ALL
-        all_next = build_line_objs_from_words(next_page)
-        all_lines.extend([x["text"] for x in all_next[:60]])
+        all_lines.extend([x.text for x in next_layout.lines[:60]])
         all_lines = clip_at_stop(all_lines)
 
     return left_lines, right_lines, all_lines
@@ -550,222 +338,282 @@ def pays_bills_by_subtraction(direct_str, step_str):
     except Exception:
         return None
 
-# main extraction
-year_unit_data = {}  # (year_str, unit) -> row dict
-
-for file in os.listdir(gradReportFolder):
-    if not file.endswith(".pdf"):
-        continue
-
-    year = file.split(" ")[0]
-    fullPath = os.path.join(gradReportFolder, file)
-
-    with pdfplumber.open(fullPath) as pdf:
-        page_texts = [p.extract_text() or "" for p in pdf.pages]
-
-        current_unit = None
-        last_school_norm = None
-        last_table_page = None
-
-        for page_num, page in enumerate(pdf.pages, start=1):
-            raw = page_texts[page_num - 1] or ""
-            top = "\n".join(raw.splitlines()[:40])
-            flat_top = " ".join(top.split())
-            if not re.search(r"Table\s+of\s+Contents|Contents\b", flat_top, re.IGNORECASE):
-                m_unit = school_pattern.search(flat_top)
-                if m_unit:
-                    cand = normalize_unit(m_unit.group(0))
-                    if cand:
-                        current_unit = cand
-                        last_school_norm = cand
-
-            next_page = pdf.pages[page_num] if page_num < len(pdf.pages) else None
-            yr_i = int(year)
-
-            # figure out school
-            school_norm = current_unit
-            if not school_norm and last_school_norm and last_table_page == page_num - 1:
-                school_norm = last_school_norm
-            if not school_norm and last_school_norm is None:
-                school_norm = "University-Wide"
-            if not school_norm:
-                continue
-
-            # -----------------------------
-            # PRE-2020
-            # -----------------------------
-            if yr_i <= 2019:
-                window_lines = extract_nature_block_with_pre(page, next_page=next_page, pre_lines=90, post_lines=220)
-                if not window_lines:
-                    continue
-
-                totalResponses = count_for_keyword(window_lines, totalN)
-                joined = " ".join(window_lines)
-
-                directlyAligned = pct_nearest_anchor_same_sentence(
-                    joined, directReg, stop_pat=steppingReg,
-                    max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
-                )
-                steppingStone = pct_nearest_anchor_same_sentence(
-                    joined, steppingReg, stop_pat=paysBillsReg,
-                    max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
-                )
-                paysBills = pct_nearest_anchor_billpay(
-                    joined, paysBillsReg, stop_pat=salaryStop,
-                    max_chars=450, require_pat=percentReq, tail_chars=260
-                )
-
-                directlyRelated=pct_nearest_anchor_same_sentence(
-                    joined, directRelatedReg, stop_pat=utilizesReg,
-                    max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
-                )
-                utilizesKnowledge=pct_nearest_anchor_same_sentence(
-                    joined, utilizesReg, stop_pat=notRelatedReg,
-                    max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
-                )
-
-                notRelated = pct_nearest_anchor_billpay(
-                    joined, notRelatedReg, stop_pat=salaryStop,
-                    max_chars=450, require_pat=percentReq, tail_chars=260
-                )
-
-                if directlyAligned is None or steppingStone is None or paysBills is None:
-                    d2, s2, b2 = pct_from_chart_labels(window_lines)
-                    if directlyAligned is None:
-                        directlyAligned = d2
-                    if steppingStone is None:
-                        steppingStone = s2
-                    if paysBills is None:
-                        paysBills = b2
-
-            # -----------------------------
-            # 2020+: split-page safe:
-            #   - pull LEFT column only for summary sentence + chart
-            #   - compute paysBills by subtraction
-            # -----------------------------
-            else:
-                if page_looks_split(page):
-                    left_lines, right_lines, all_lines = extract_post2020_blocks_split_safe(
-                        page, next_page=next_page, post_lines=260
-                    )
-                    if not left_lines or not all_lines:
-                        continue
+# per document memory vars
+def new_document_state(year):
+    return {
+        "year": year,
+        "rows": {},  # (year_str, unit) -> row dict
+        "current_unit": None,
+        "last_school_norm": None,
+        "last_table_page": None,
+        # field-of-study values carry over to later 2020+ pages that
+        # don't set them (same as the old single loop, but per document)
+        "directlyRelated": None,
+        "utilizesKnowledge": None,
+        "notRelated": None,
+    }
+
+# state that flows from one page to the next
+CARRIED_STATE = ("current_unit", "last_school_norm", "last_table_page",
+                 "directlyRelated", "utilizesKnowledge", "notRelated")
+
+# unit headers at the top of a page switch the current unit
+def update_unit_context(state, page_num, page_texts):
+    head = section_index(page_texts).header(page_num - 1)
+    if head is not None:
+        cand = normalize_unit(head)
+        if cand:
+            state["current_unit"] = cand
+            state["last_school_norm"] = cand
+
+# text-only part of process_page, cheap guess of the carried state
+prepass_page = update_unit_context
+
+# school for this page, None if the page should be skipped
+def current_school(state, page_num):
+    school_norm = state["current_unit"]
+    if not school_norm and state["last_school_norm"] and state["last_table_page"] == page_num - 1:
+        school_norm = state["last_school_norm"]
+    if not school_norm and state["last_school_norm"] is None:
+        school_norm = "University-Wide"
+    return school_norm
+
+# nature of position rows from one page
+def process_page(state, page_num, page, next_page, page_texts):
+    year = state["year"]
+    year_unit_data = state["rows"]
+
+    update_unit_context(state, page_num, page_texts)
+
+    yr_i = int(year)
+
+    # figure out school
+    school_norm = current_school(state, page_num)
+    if not school_norm:
+        return
+
+    # -----------------------------
+    # PRE-2020
+    # -----------------------------
+    if yr_i <= 2019:
+        window_lines = extract_nature_block_with_pre(page, next_page=next_page, pre_lines=90, post_lines=220)
+        if not window_lines:
+            return
+
+        totalResponses = count_for_keyword(window_lines, totalN)
+        joined = " ".join(window_lines)
+
+        directlyAligned = pct_nearest_anchor_same_sentence(
+            joined, directReg, stop_pat=steppingReg,
+            max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
+        )
+        steppingStone = pct_nearest_anchor_same_sentence(
+            joined, steppingReg, stop_pat=paysBillsReg,
+            max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
+        )
+        paysBills = pct_nearest_anchor_billpay(
+            joined, paysBillsReg, stop_pat=salaryStop,
+            max_chars=450, require_pat=percentReq, tail_chars=260
+        )
+
+        directlyRelated=pct_nearest_anchor_same_sentence(
+            joined, directRelatedReg, stop_pat=utilizesReg,
+            max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
+        )
+        utilizesKnowledge=pct_nearest_anchor_same_sentence(
+            joined, utilizesReg, stop_pat=notRelatedReg,
+            max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
+        )
+
+        notRelated = pct_nearest_anchor_billpay(
+            joined, notRelatedReg, stop_pat=salaryStop,
+            max_chars=450, require_pat=percentReq, tail_chars=260
+        )
+
+        if directlyAligned is None or steppingStone is None or paysBills is None:
+            d2, s2, b2 = pct_from_chart_labels(window_lines)
+            if directlyAligned is None:
+                directlyAligned = d2
+            if steppingStone is None:
+                steppingStone = s2
+            if paysBills is None:
+                paysBills = b2
+
+    # -----------------------------
+    # 2020+: split-page safe:
+    #   - pull LEFT column only for summary sentence + chart
+    #   - compute paysBills by subtraction
+    # -----------------------------
+    else:
+        if page_looks_split(page):
+            left_lines, right_lines, all_lines = extract_post2020_blocks_split_safe(
+                page, next_page=next_page, post_lines=260
+            )
+            if not left_lines or not all_lines:
+                return
+
+            totalResponses = count_for_keyword(all_lines, totalN)
+
+            joined_full = " ".join(all_lines)
+            directlyAligned, steppingStone = extract_direct_step_from_summary(joined_full)
+
+            joined_right = " ".join(right_lines)
+
+            directlyRelated = pct_nearest_anchor_same_sentence(
+                joined_right, directRelatedReg, stop_pat=utilizesReg,
+                max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
+            )
+
+            utilizesKnowledge = pct_nearest_anchor_same_sentence(
+                joined_right, utilizesReg, stop_pat=notRelatedReg,
+                max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
+            )
+
+            notRelated = pct_nearest_anchor_billpay(
+                joined_right, notRelatedReg, stop_pat=salaryStop,
+                max_chars=450, require_pat=percentReq, tail_chars=260
+            )
+
+
+            # fallback to left only (fixes 2020-2023)
+            if directlyAligned is None or steppingStone is None:
+                joined_left = " ".join(left_lines)
+                directlyAligned, steppingStone = extract_direct_step_from_summary(joined_left)
+
+        else:
+            post_lines = extract_post2020_block_from_header(page, next_page=next_page, post_lines=260)
+            if not post_lines:
+                return
+
+            # field-of-study values aren't on this layout, keep the last ones found
+            directlyRelated = state["directlyRelated"]
+            utilizesKnowledge = state["utilizesKnowledge"]
+            notRelated = state["notRelated"]
+
+
+            totalResponses = count_for_keyword(post_lines, totalN)
+
+            joined_text = " ".join(post_lines)
+            directlyAligned, steppingStone = extract_direct_step_from_summary(joined_text)
+
+        paysBills = pays_bills_by_subtraction(directlyAligned, steppingStone)
+
+
+        # fallback: chart labels (LEFT column only), then recompute paysBills
+        if directlyAligned is None or steppingStone is None or paysBills is None:
+            if page_looks_split(page):
+                d2, s2, _b2 = pct_from_chart_labels(all_lines)
+                if (d2 is None or s2 is None):
+                    d2, s2, _b2 = pct_from_chart_labels(left_lines)
 
-                    totalResponses = count_for_keyword(all_lines, totalN)
+            else:
+                d2, s2, _b2 = pct_from_chart_labels(post_lines)
 
-                    joined_full = " ".join(all_lines)
-                    directlyAligned, steppingStone = extract_direct_step_from_summary(joined_full)
+            if directlyAligned is None:
+                directlyAligned = d2
+            if steppingStone is None:
+                steppingStone = s2
+            if paysBills is None:
+                paysBills = pays_bills_by_subtraction(directlyAligned, steppingStone)
 
-                    joined_right = " ".join(right_lines)
 
-                    directlyRelated = pct_nearest_anchor_same_sentence(
-                        joined_right, directRelatedReg, stop_pat=utilizesReg,
-                        max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
-                    )
+    # store row
+    key = (year, school_norm)
+    if key not in year_unit_data:
+        year_unit_data[key] = {
+            "Unit": school_norm,
+            "Year": year,
+            "Directly Aligned": None,
+            "Stepping Stone": None,
+            "Pays the Bills": None,
+            "Directly Related": None,
+            "Utilizes Knowledge/Skills":None,
+            "Not Related": None,
+            "N": None
+        }
+    if directlyAligned == None and steppingStone == None:
+        totalResponses=""
+    if directlyRelated != None and utilizesKnowledge != None:
+        notRelated= 100 - int(directlyRelated)-int(utilizesKnowledge)
+
+    row = year_unit_data[key]
+    row["Directly Aligned"] = directlyAligned
+    row["Stepping Stone"] = steppingStone
+    row["Pays the Bills"] = paysBills
+    row["Directly Related"] = directlyRelated
+    row["Utilizes Knowledge/Skills"] = utilizesKnowledge
+    row["Not Related"] = notRelated
+    row["N"] = totalResponses
+    row["Page"] = page_num
+
+    state["directlyRelated"] = directlyRelated
+    state["utilizesKnowledge"] = utilizesKnowledge
+    state["notRelated"] = notRelated
+    state["last_school_norm"] = school_norm
+    state["last_table_page"] = page_num
+
+def document_results(state):
+    return state["rows"]
+
+# later reports win for the same (year, unit), like the old single loop
+def merge_results(partials):
+    year_unit_data = {}
+    for rows in partials:
+        year_unit_data.update(rows)
+    return year_unit_data
 
-                    utilizesKnowledge = pct_nearest_anchor_same_sentence(
-                        joined_right, utilizesReg, stop_pat=notRelatedReg,
-                        max_chars=450, require_pat=percentReq, tail_chars=260, backScan=False
-                    )
+# csv creation
+# column types for typed output (see typed_output)
+PERCENT_COLUMNS = ("Directly Aligned", "Stepping Stone", "Pays the Bills","Directly Related","Utilizes Knowledge/Skills","Not Related")
+COUNT_COLUMNS = ("N",)
+METRIC_COLUMNS = [*PERCENT_COLUMNS, *COUNT_COLUMNS]
 
-                    notRelated = pct_nearest_anchor_billpay(
-                        joined_right, notRelatedReg, stop_pat=salaryStop,
-                        max_chars=450, require_pat=percentReq, tail_chars=260
-                    )
 
+# writes the csv and returns its frame
+def write_csv(year_unit_data, out_path):
+    years = sorted({int(year) for (year, _unit) in year_unit_data.keys()})
+    template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
 
-                    # fallback to left only (fixes 2020-2023)
-                    if directlyAligned is None or steppingStone is None:
-                        joined_left = " ".join(left_lines)
-                        directlyAligned, steppingStone = extract_direct_step_from_summary(joined_left)
+    metric_cols = list(METRIC_COLUMNS)
 
-                else:
-                    post_lines = extract_post2020_block_from_header(page, next_page=next_page, post_lines=260)
-                    if not post_lines:
-                        continue
-                    
+    final_rows = []
+    for base in template_rows:
+        yr = base["Year"]
+        unit = base["Unit"]
+        key = (str(yr), unit)
 
-                    totalResponses = count_for_keyword(post_lines, totalN)
+        found = year_unit_data.get(key, {})
+        row = dict(base)
+        for col in metric_cols:
+            row[col] = found.get(col, "") or ""
+        final_rows.append(row)
 
-                    joined_text = " ".join(post_lines)
-                    directlyAligned, steppingStone = extract_direct_step_from_summary(joined_text)
+    df = write_rows(final_rows, ["Unit", "Year"] + metric_cols, out_path)
+    print("Wrote:", out_path)
+    return df
 
-                paysBills = pays_bills_by_subtraction(directlyAligned, steppingStone)
 
+# one document's rows for the fact store: (years, [(year, unit, column,
+# value, page)]), blank values included since a later report's row replaces
+# an earlier one whole
+def document_facts(year_unit_data):
+    years = sorted({int(year) for (year, _unit) in year_unit_data})
+    facts = [(int(year), unit, col, row.get(col), row.get("Page"))
+             for (year, unit), row in year_unit_data.items() for col in METRIC_COLUMNS]
+    return years, facts
 
-                # fallback: chart labels (LEFT column only), then recompute paysBills
-                if directlyAligned is None or steppingStone is None or paysBills is None:
-                    if page_looks_split(page):
-                        d2, s2, _b2 = pct_from_chart_labels(all_lines)
-                        if (d2 is None or s2 is None):
-                            d2, s2, _b2 = pct_from_chart_labels(left_lines)
-
-                    else:
-                        d2, s2, _b2 = pct_from_chart_labels(post_lines)
-
-                    if directlyAligned is None:
-                        directlyAligned = d2
-                    if steppingStone is None:
-                        steppingStone = s2
-                    if paysBills is None:
-                        paysBills = pays_bills_by_subtraction(directlyAligned, steppingStone)
-
-
-            # store row
-            key = (year, school_norm)
-            if key not in year_unit_data:
-                year_unit_data[key] = {
-                    "Unit": school_norm,
-                    "Year": year,
-                    "Directly Aligned": None,
-                    "Stepping Stone": None,
-                    "Pays the Bills": None,
-                    "Directly Related": None,
-                    "Utilizes Knowledge/Skills":None,
-                    "Not Related": None,
-                    "N": None
-                }
-            if directlyAligned == None and steppingStone == None:
-                totalResponses=""
-            if directlyRelated != None and utilizesKnowledge != None:
-                notRelated= 100 - int(directlyRelated)-int(utilizesKnowledge)
-
-            row = year_unit_data[key]
-            row["Directly Aligned"] = directlyAligned
-            row["Stepping Stone"] = steppingStone
-            row["Pays the Bills"] = paysBills
-            row["Directly Related"] = directlyRelated
-            row["Utilizes Knowledge/Skills"] = utilizesKnowledge
-            row["Not Related"] = notRelated
-            row["N"] = totalResponses
-
-            last_school_norm = school_norm
-            last_table_page = page_num
 
-# csv creation
-years = sorted({int(year) for (year, _unit) in year_unit_data.keys()})
-template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
+# csv from fact store values {(year, unit): {column: value}}
+def write_facts(years, values, out_path):
+    return write_csv({(str(year), unit): row for (year, unit), row in values.items()}, out_path)
 
-metric_cols = ["Directly Aligned", "Stepping Stone", "Pays the Bills","Directly Related","Utilizes Knowledge/Skills","Not Related", "N"]
 
-final_rows = []
-for base in template_rows:
-    yr = base["Year"]
-    unit = base["Unit"]
-    key = (str(yr), unit)
+def main():
+    from cli import script_main
 
-    found = year_unit_data.get(key, {})
-    row = dict(base)
-    for col in metric_cols:
-        row[col] = found.get(col, "") or ""
-    final_rows.append(row)
+    script_main("nature", {"input": gradReportFolder, "output": out_path,
+                           "cache_dir": layoutCacheFolder, "workers": workerCount})
 
-df = pd.DataFrame(final_rows)
-for c in metric_cols:
-    if c not in df.columns:
-        df[c] = ""
 
-df = df[["Unit", "Year"] + metric_cols]
-out_path = None
-df.to_csv(out_path, index=False)
-print("Wrote:", out_path)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+import sys
+import weakref
+from array import array
+from collections import OrderedDict
+from itertools import count
+
+# numpy, imported by _numpy once it pays for itself (see _use_numpy);
+# without it rows are grouped with dicts
+np = None
+_numpy_tried = False
+# words grouped with dicts so far in this process
+_dict_words = 0
+
+# shared page layout layer for all four scripts
+# each page's words are pulled from pdfplumber once and every line view
+# (all columns, left column, right column) is built from that one word list
+
+# default memory budget for cached words + lines
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# rough cost of one word in a WordStore (4 float64s, a flag and a list slot),
+# texts are interned and counted once per store
+WORD_OVERHEAD = 48
+# one slotted Line plus its three floats, on top of its text
+LINE_OVERHEAD = 140
+# below this many words per page the dict grouping is faster than numpy's
+# fixed per-call cost (benchmarks/bench_lines.py)
+NUMPY_MIN_WORDS = 32
+# numpy's import costs about what it saves over grouping this many words
+# (a few tenths of a microsecond each), so a process only imports it after
+# grouping that many with dicts and small runs never pay for it
+NUMPY_IMPORT_WORDS = 300_000
+
+# a page is two-column when more than SPLIT_SHARE of its words start more
+# than SPLIT_MARGIN points left of the midpoint and as many right of it
+SPLIT_MARGIN = 10
+SPLIT_SHARE = 0.30
+
+
+# LRU cache that evicts by estimated size instead of entry count
+class LayoutCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        # anything bigger than the whole budget is just not kept
+        if size > self.max_bytes:
+            return value
+        self.entries[key] = (value, size)
+        self.nbytes += size
+        self.evict()
+        return value
+
+    # drop least recently used entries until we are back under budget
+    def evict(self):
+        while self.nbytes > self.max_bytes and self.entries:
+            _key, (_value, old_size) = self.entries.popitem(last=False)
+            self.nbytes -= old_size
+
+    def discard_page(self, doc, page):
+        for key in [k for k in self.entries if k[1] == doc and k[2] == page]:
+            _value, size = self.entries.pop(key)
+            self.nbytes -= size
+
+    def discard_doc(self, doc):
+        for key in [k for k in self.entries if k[1] == doc]:
+            _value, size = self.entries.pop(key)
+            self.nbytes -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+
+layout_cache = LayoutCache()
+
+# ids for open documents (never reused, unlike id())
+_doc_ids = weakref.WeakKeyDictionary()
+_next_doc_id = count(1)
+
+
+def set_max_bytes(max_bytes):
+    layout_cache.max_bytes = max_bytes
+    layout_cache.evict()
+
+
+def _doc_key(page):
+    pdf = getattr(page, "pdf", None)
+    if pdf is None:
+        return ("page", id(page))
+    try:
+        doc = _doc_ids.get(pdf)
+        if doc is None:
+            doc = next(_next_doc_id)
+            _doc_ids[pdf] = doc
+        return doc
+    except TypeError:
+        return ("pdf", id(pdf))
+
+
+def _page_key(page):
+    return getattr(page, "page_number", None)
+
+
+# drop every cached view of a document once it is closed
+def release_document(pdf):
+    doc = _doc_ids.pop(pdf, None)
+    if doc is not None:
+        layout_cache.discard_doc(doc)
+
+
+# drop everything held for one page: our words/lines and pdfplumber's own
+# parsed objects (pdfplumber keeps those until the whole file is closed)
+def release_page(page):
+    layout_cache.discard_page(_doc_key(page), _page_key(page))
+    flush = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+    if flush is not None:
+        flush()
+
+
+# (page_num, page, next_page) for pages start..end-1, releasing each page
+# once the window has moved past it so at most two pages are parsed at a time
+def iter_page_windows(pages, start=0, end=None):
+    if end is None:
+        end = len(pages)
+    n_pages = len(pages)
+    for i in range(start, end):
+        next_page = pages[i + 1] if i + 1 < n_pages else None
+        yield i + 1, pages[i], next_page
+        release_page(pages[i])
+    # the last next_page was only looked at, never walked past
+    if end < n_pages:
+        release_page(pages[end])
+
+
+# page text for a document, pulled from a page the first time it is asked for
+# (pdfplumber builds text and words from the same parsed chars of a page object)
+class PageTexts:
+    def __init__(self, pages):
+        self.pages = pages
+        self.texts = [None] * len(pages)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, i):
+        text = self.texts[i]
+        if text is None:
+            text = self.texts[i] = self.pages[i].extract_text() or ""
+        return text
+
+    def __iter__(self):
+        for i in range(len(self.texts)):
+            yield self[i]
+
+
+# a page's words as columns instead of a dict per word: x0/x1/top/bottom
+# float arrays, interned text and a has-text flag, index i is one word
+class WordStore:
+    __slots__ = ("text", "has_text", "x0", "x1", "top", "bottom")
+
+    def __init__(self, text, x0, x1, top, bottom):
+        self.text = text
+        self.has_text = bytes(bool(t.strip()) for t in text)
+        self.x0 = x0
+        self.x1 = x1
+        self.top = top
+        self.bottom = bottom
+
+    def __len__(self):
+        return len(self.text)
+
+    def nbytes(self):
+        return len(self.text) * WORD_OVERHEAD + sum(sys.getsizeof(t) for t in set(self.text))
+
+
+# WordStore from pdfplumber's extract_words() dicts
+def store_from_words(words):
+    text = []
+    x0, x1, top, bottom = array("d"), array("d"), array("d"), array("d")
+    for w in words:
+        text.append(sys.intern(w.get("text") or ""))
+        x0.append(w.get("x0", 0.0))
+        x1.append(w.get("x1", 0.0))
+        top.append(w["top"])
+        bottom.append(w.get("bottom", w["top"]))
+    return WordStore(text, x0, x1, top, bottom)
+
+
+# one reconstructed line: row key y, text and the row's x extent
+class Line:
+    __slots__ = ("y", "text", "x0", "x1")
+
+    def __init__(self, y, text, x0, x1):
+        self.y = y
+        self.text = text
+        self.x0 = x0
+        self.x1 = x1
+
+
+# words for a page, pulled once and shared by all line views
+# (cached layout pages hand over their columns without building word dicts)
+def page_words(page):
+    key = ("words", _doc_key(page), _page_key(page))
+    words = layout_cache.get(key)
+    if words is not None:
+        return words
+
+    word_store = getattr(page, "word_store", None)
+    if word_store is not None:
+        words = word_store()
+    else:
+        words = store_from_words(page.extract_words(use_text_flow=True) or [])
+    return layout_cache.put(key, words, words.nbytes())
+
+
+# word indexes ordered by (row key, x0, word order), with each word's row
+# key; words with no text or outside [x0_min, x0_max] are left out
+def _row_order(words, y_tol, x0_min, x0_max):
+    has_text, xs, tops = words.has_text, words.x0, words.top
+    rows = {}
+    for i in range(len(has_text)):
+        if not has_text[i]:
+            continue
+
+        x0 = xs[i]
+        if x0_min is not None and x0 < x0_min:
+            continue
+        if x0_max is not None and x0 > x0_max:
+            continue
+
+        key = round(tops[i] / y_tol) * y_tol
+        rows.setdefault(key, []).append(i)
+
+    order = []
+    keys = []
+    for y in sorted(rows.keys()):
+        row = sorted(rows[y], key=xs.__getitem__)
+        order.extend(row)
+        keys.extend([y] * len(row))
+    return order, keys
+
+
+def _numpy():
+    global np, _numpy_tried
+    if not _numpy_tried:
+        _numpy_tried = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np
+
+
+# whether to group n_words with numpy; both ways give the same rows
+def _use_numpy(n_words):
+    global _dict_words
+    if n_words < NUMPY_MIN_WORDS:
+        return False
+    if not _numpy_tried and _dict_words < NUMPY_IMPORT_WORDS:
+        _dict_words += n_words
+        return False
+    return _numpy() is not None
+
+
+# same as _row_order over numpy views of the store's columns: filter with
+# masks and one lexsort
+def _row_order_np(words, y_tol, x0_min, x0_max):
+    np = _numpy()
+    x0 = np.frombuffer(words.x0, float)
+    keep = np.frombuffer(words.has_text, np.bool_).copy()
+    if x0_min is not None:
+        keep &= x0 >= x0_min
+    if x0_max is not None:
+        keep &= x0 <= x0_max
+    idx = np.flatnonzero(keep)
+    keys = np.round(np.frombuffer(words.top, float)[idx] / y_tol) * y_tol
+    pos = np.lexsort((idx, x0[idx], keys))
+    return idx[pos].tolist(), keys[pos].tolist()
+
+
+# Lines from ordered words, a new line wherever the row key changes
+def _lines_from_order(words, order, keys):
+    text, xs, x1s = words.text, words.x0, words.x1
+    out = []
+    n = len(order)
+    s = 0
+    while s < n:
+        y = keys[s]
+        e = s + 1
+        while e < n and keys[e] == y:
+            e += 1
+        row = order[s:e]
+        line = " ".join(" ".join(text[i] for i in row).split())
+        if line:
+            out.append(Line(y, line, xs[row[0]], max(x1s[i] for i in row)))
+        s = e
+    return out
+
+
+# groups words with similar 'top' into Lines
+def _group_rows(words, y_tol, x0_min, x0_max):
+    return _lines_from_order(words, *_row_order(words, y_tol, x0_min, x0_max))
+
+
+def _group_rows_np(words, y_tol, x0_min, x0_max):
+    return _lines_from_order(words, *_row_order_np(words, y_tol, x0_min, x0_max))
+
+
+def _line_objs(page, y_tol, x0_min, x0_max):
+    key = ("lines", _doc_key(page), _page_key(page), y_tol, x0_min, x0_max)
+    objs = layout_cache.get(key)
+    if objs is not None:
+        return objs
+
+    words = page_words(page)
+    if _use_numpy(len(words)):
+        objs = _group_rows_np(words, y_tol, x0_min, x0_max)
+    else:
+        objs = _group_rows(words, y_tol, x0_min, x0_max)
+    size = sum(LINE_OVERHEAD + sys.getsizeof(o.text) for o in objs)
+    return layout_cache.put(key, objs, size)
+
+
+# a page's columns from one pass over its words: whether it is two-column
+# and the lines of the whole page and of each half, all cut from one
+# ordering of the words (the lists are shared, callers must not change them)
+class ColumnLayout:
+    __slots__ = ("mid", "split", "lines", "left", "right")
+
+    def __init__(self, mid, split, lines, left, right):
+        self.mid = mid
+        self.split = split
+        self.lines = lines
+        self.left = left
+        self.right = right
+
+    # lines of a column ("lines", "left" or "right") with y0 <= y <= y1
+    def lines_between(self, column, y0, y1):
+        return [o for o in getattr(self, column) if y0 <= o.y <= y1]
+
+
+def _layout_from_words(words, width, y_tol):
+    xs = words.x0
+    mid = width / 2.0
+    n_left = n_right = 0
+    for x0 in xs:
+        if x0 < mid - SPLIT_MARGIN:
+            n_left += 1
+        elif x0 > mid + SPLIT_MARGIN:
+            n_right += 1
+    total = n_left + n_right
+    split = total > 0 and n_left / total > SPLIT_SHARE and n_right / total > SPLIT_SHARE
+
+    if _use_numpy(len(xs)):
+        order, keys = _row_order_np(words, y_tol, None, None)
+    else:
+        order, keys = _row_order(words, y_tol, None, None)
+    # a word exactly on the midpoint belongs to both halves, as with the
+    # x0_max / x0_min filters
+    left = [(i, k) for i, k in zip(order, keys) if xs[i] <= mid]
+    right = [(i, k) for i, k in zip(order, keys) if xs[i] >= mid]
+    return ColumnLayout(
+        mid, split,
+        _lines_from_order(words, order, keys),
+        _lines_from_order(words, [i for i, _k in left], [k for _i, k in left]),
+        _lines_from_order(words, [i for i, _k in right], [k for _i, k in right]),
+    )
+
+
+# column layout for a page, built once from the shared words; its full-page
+# lines also serve build_lines_from_words for the same page
+def column_layout(page, y_tol=2.0):
+    doc, pg = _doc_key(page), _page_key(page)
+    key = ("columns", doc, pg, y_tol)
+    layout = layout_cache.get(key)
+    if layout is not None:
+        return layout
+
+    layout = _layout_from_words(page_words(page), float(page.width), y_tol)
+    sizes = [sum(LINE_OVERHEAD + sys.getsizeof(o.text) for o in lines)
+             for lines in (layout.lines, layout.left, layout.right)]
+    lines_key = ("lines", doc, pg, y_tol, None, None)
+    if lines_key not in layout_cache.entries:
+        layout_cache.put(lines_key, layout.lines, sizes[0])
+    return layout_cache.put(key, layout, sum(sizes))
+
+
+# build Lines with x filtering so we can isolate one column
+# (callers get their own list, the cached one is never handed out)
+def build_line_objs_from_words(page, *, x0_min=None, x0_max=None, y_tol=2.0):
+    return list(_line_objs(page, y_tol, x0_min, x0_max))
+
+
+# turns words into stable line strings
+def build_lines_from_words(page, y_tol=2.0, *, x0_min=None, x0_max=None):
+    return [o.text for o in _line_objs(page, y_tol, x0_min, x0_max)]
+
+
+# first n lines of a page (the page after a section is only read from the top)
+def top_lines(page, n, y_tol=2.0):
+    return build_lines_from_words(page, y_tol)[:n]
@@ -0,0 +1,31 @@
+# which library turns a report into pages for the extractors; a page has
+# extract_words(use_text_flow=True), extract_text(), chars, width, height,
+# bbox, page_number and close(), a document is a context manager with .pages
+#
+#   pdfplumber  the reference, pdfplumber.open
+#   lean        pdfplumber's word and text extraction over chars from a trimmed
+#               pdfminer pass (lean_pdf), about twice as fast per page
+#
+# every backend has to give the same words and text as pdfplumber, so the
+# layout cache and the csvs do not depend on which one parsed a report;
+# benchmarks/backend_parity.py checks that on a folder of reports
+
+BACKENDS = ("pdfplumber", "lean")
+
+backend = "pdfplumber"
+
+
+def set_backend(name):
+    global backend
+    if name not in BACKENDS:
+        raise ValueError(f"unknown pdf backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    backend = name
+
+
+# opens a report with the current backend (or the one named)
+def open_pdf(path, name=None):
+    if (name or backend) == "lean":
+        import lean_pdf
+        return lean_pdf.open_pdf(path)
+    import pdfplumber
+    return pdfplumber.open(path)
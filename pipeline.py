@@ -0,0 +1,217 @@
+import queue
+import threading
+import time
+
+import tracing
+from layout_store import CachedDocument, parse_page_range
+from page_layout import PageTexts, release_document
+from pdf_backend import open_pdf
+
+# staged extraction: parse workers turn page chunks of the reports into
+# layout columns, the main process runs the extractors over the pages as the
+# chunks arrive, and the per-report results are assembled in report order
+#
+#   producer thread   submits chunk parses to the pool, in report and page
+#                     order, through a bounded queue: it blocks while the
+#                     queue is full, so at most depth chunks are parsed ahead
+#                     of the extractors and memory stays flat
+#   extract (main)    StreamPages hands each report's pages to the usual page
+#                     walk, pulling chunks off the queue as it gets to them and
+#                     dropping chunks it has walked past (their text stays)
+#
+# every stage counts items and busy / blocked seconds; extraction that spends
+# longer waiting for parsed pages than working on them is held up by parsing,
+# otherwise parsing is ahead of it (the producer then sits on a full queue)
+
+# pages per parse job; every job opens the report again, which costs about a
+# tenth of the parse time at this size
+CHUNK_PAGES = 16
+
+
+class StageCounter:
+    __slots__ = ("name", "unit", "items", "busy", "blocked")
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+
+    def rate(self):
+        return self.items / self.busy if self.busy else 0.0
+
+
+# parse stage job, runs in a pool worker: (columns, seconds)
+def parse_chunk(path, start, end):
+    t0 = time.perf_counter()
+    columns = parse_page_range(path, start, end)
+    return columns, time.perf_counter() - t0
+
+
+def page_count(path):
+    with open_pdf(path) as pdf:
+        return len(pdf.pages)
+
+
+# queue items:
+#   ("report", index, n_pages, layout file or None, digest)  before each report's chunks
+#   ("chunk", start, end, future)                             its chunks, in page order
+#   ("error", exception)                                      the producer failed
+#   None                                                      all reports queued
+# submit(fn, *args) puts a job on the parse pool and returns its future
+# (read with tracing.job_result); cached_layout(path) is (the report's content
+# hash, a layout cache file that already holds it or None), the hash None
+# without a layout cache
+class Producer(threading.Thread):
+    def __init__(self, reports, submit, depth, cached_layout, counter):
+        super().__init__(daemon=True)
+        self.reports = reports
+        self.submit = submit
+        self.queue = queue.Queue(maxsize=depth)
+        self.cached_layout = cached_layout
+        self.counter = counter
+        self.stopping = threading.Event()
+
+    def _put(self, item):
+        t0 = time.perf_counter()
+        while not self.stopping.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.counter.blocked += time.perf_counter() - t0
+
+    def run(self):
+        try:
+            for i, (_year, path) in enumerate(self.reports):
+                # hashed only when its turn comes, so the first report's
+                # pages are queued without waiting on the others' hashes
+                if self.stopping.is_set():
+                    return
+                digest, layout_file = self.cached_layout(path)
+                if layout_file is not None:
+                    self._put(("report", i, None, layout_file, digest))
+                    continue
+                n_pages = tracing.job_result(self.submit(page_count, path))
+                self._put(("report", i, n_pages, None, digest))
+                for start in range(0, n_pages, CHUNK_PAGES):
+                    if self.stopping.is_set():
+                        return
+                    end = min(start + CHUNK_PAGES, n_pages)
+                    future = self.submit(parse_chunk, path, start, end)
+                    self._put(("chunk", start, end, future))
+            self._put(None)
+        except BaseException as e:
+            self._put(("error", e))
+
+    # next queue item, counting the time the consumer sat on an empty queue
+    def get(self, consumer):
+        t0 = time.perf_counter()
+        item = self.queue.get()
+        consumer.blocked += time.perf_counter() - t0
+        if item is not None and item[0] == "error":
+            raise item[1]
+        return item
+
+    # unblocks and ends the thread when the consumer gives up early
+    def stop(self):
+        self.stopping.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.join()
+
+
+# a report's pages as a sequence over the chunks coming off the queue; the
+# page walk only looks at pages i and i + 1 going forward, so chunks before
+# the one holding page i - 1 are dropped once page i is asked for. with a
+# layout_store.LayoutWriter each chunk is also added to it as it arrives
+class StreamPages:
+    def __init__(self, path, n_pages, producer, parse, extract, writer=None):
+        self.path = path
+        self.n_pages = n_pages
+        self.producer = producer
+        self.parse = parse
+        self.extract = extract
+        self.texts = [None] * n_pages
+        self.loaded = []   # (start, end, document) in page order
+        self.next_start = 0
+        self.writer = writer
+
+    def __len__(self):
+        return self.n_pages
+
+    def _load_next(self):
+        kind, start, end, future = self.producer.get(self.extract)
+        if kind != "chunk" or start != self.next_start:
+            raise RuntimeError(f"pipeline out of order at page {self.next_start} of {self.path}")
+        t0 = time.perf_counter()
+        columns, seconds = tracing.job_result(future)
+        self.extract.blocked += time.perf_counter() - t0
+        self.parse.items += end - start
+        self.parse.busy += seconds
+        if self.writer is not None:
+            self.writer.add(*columns)
+
+        doc = CachedDocument(self.path, *columns)
+        for k, page in enumerate(doc.pages):
+            page.page_number = start + k + 1
+            self.texts[start + k] = page.extract_text()
+        self.loaded.append((start, end, doc))
+        self.next_start = end
+
+    def _drop_before(self, i):
+        while self.loaded and self.loaded[0][1] <= i:
+            _start, _end, doc = self.loaded.pop(0)
+            release_document(doc)
+            doc.close()
+
+    def load_through(self, i):
+        while self.next_start <= i:
+            self._load_next()
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.n_pages:
+            raise IndexError(i)
+        self.load_through(i)
+        self._drop_before(i - 1)
+        for start, end, doc in self.loaded:
+            if start <= i < end:
+                return doc.pages[i - start]
+        raise IndexError(f"page {i} of {self.path} was already released")
+
+    def close(self):
+        self._drop_before(self.n_pages)
+
+
+# page text of streamed pages, kept after their chunk is dropped
+class StreamTexts(PageTexts):
+    def __init__(self, pages):
+        super().__init__(pages)
+        self.texts = pages.texts
+
+    def __getitem__(self, i):
+        text = self.texts[i]
+        if text is None:
+            self.pages.load_through(i)
+            text = self.texts[i]
+        return text or ""
+
+
+# stage table: items, busy and blocked seconds (parse: summed over the
+# workers, blocked on a full queue; extract: blocked waiting for pages) and
+# items per busy second, then the parse workers' load and the bottleneck
+def format_counters(counters, workers, seconds):
+    out = [f"{'stage':<10}{'items':>12}{'busy s':>9}{'blocked s':>11}{'per busy s':>12}"]
+    for c in counters:
+        out.append(f"{c.name:<10}{c.items:>7} {c.unit:<4}{c.busy:>9.2f}{c.blocked:>11.2f}{c.rate():>12.1f}")
+    parse, extract = counters[0], counters[1]
+    load = parse.busy / (workers * seconds) if seconds else 0.0
+    bottleneck = "parse" if extract.blocked > extract.busy else "extract"
+    out.append(f"{seconds:.2f} s wall, parse workers {load:.0%} busy over {workers}, "
+               f"bottleneck: {bottleneck}")
+    return "\n".join(out)
@@ -0,0 +1,562 @@
+import functools
+import importlib
+import os
+import time
+
+import report_manifest
+import result_cache
+import csv_output
+import fact_store
+import tracing
+import typed_output
+from layout_store import (CachedDocument, LayoutWriter, cache_path, concat_columns, open_report,
+                          parse_page_range, read_layout, report_hash, write_layout)
+import pdf_backend
+import pipeline
+from page_layout import PageTexts, iter_page_windows, release_document
+from section_index import page_markers
+
+# opens each report once and streams its pages through every extractor
+gradReportFolder = None
+outputFolder = None
+# set to a folder to keep parsed page layouts between runs
+layoutCacheFolder = None
+# worker processes for reports (1 = serial, 0 = one per core)
+workerCount = 1
+# page ranges each report is split into across the workers (1 = whole reports)
+pageShards = 1
+# set to a path to write a chrome trace-event json of the run
+traceFile = None
+# set to a json path to only extract new or changed reports (see report_manifest)
+manifestFile = None
+# set to a folder to keep each extractor's results per report, so a rebuild
+# only re-runs extractors whose code changed (see result_cache)
+resultCacheFolder = None
+# library that parses the reports, "pdfplumber" or "lean" (see pdf_backend)
+pdfBackend = "pdfplumber"
+# set to a number of page chunks to overlap parsing (workerCount processes)
+# with extraction, parsed chunks are queued at most this deep (see pipeline)
+pipelineDepth = 0
+# set to "parquet" or "arrow" to also write each csv as a typed table next to
+# it: int counts, float percents with a less-than flag (see typed_output)
+typedOutput = None
+# set to a sqlite path to keep every value as a fact row (year, unit, metric,
+# value, source page) and export the csvs from views over it (see fact_store)
+factDatabase = None
+# "plain" writes the csvs with the csv module, "pandas" through a DataFrame;
+# the files are the same, plain keeps pandas out of the run (see csv_output)
+csvEngine = "plain"
+
+# extractor name -> script that implements it
+EXTRACTORS = {
+    "cont_ed": "continuing_education_week1",
+    "internship": "internship_participation_week2",
+    "nature": "nature_of_position_week3",
+    "geo": "top_employers_stretch",
+}
+
+
+def load_extractors(names=None):
+    if names is None:
+        names = EXTRACTORS
+    return [(name, importlib.import_module(EXTRACTORS[name])) for name in names]
+
+
+# (year, path) for every report in the folder, in listdir order
+def report_files(folder):
+    reports = []
+    for file in os.listdir(folder):
+        if not file.endswith(".pdf"):
+            continue
+        year = file.split(" ")[0]
+        reports.append((year, os.path.join(folder, file)))
+    return reports
+
+
+# peak resident memory of this process in bytes (since the last reset_peak_rss)
+def peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # whole-process peak, KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# start a new peak measurement (linux only, elsewhere peaks are per process)
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+# whether a page can hold the extractor's section, from its PAGE_MARKERS
+# (and NEXT_PAGE_MARKERS on the following page)
+def is_candidate_page(mod, page_num, page_texts):
+    markers = page_markers(page_texts)
+    if markers.has_any(page_num - 1, mod.PAGE_MARKERS):
+        return True
+    next_markers = getattr(mod, "NEXT_PAGE_MARKERS", ())
+    return bool(next_markers) and page_num < len(page_texts) and markers.has_any(page_num, next_markers)
+
+
+# runs one page through an extractor; pages that can't hold its section only
+# get the text-only part (unit context), which is all process_page would do
+def visit_page(mod, state, page_num, page, next_page, page_texts):
+    if is_candidate_page(mod, page_num, page_texts):
+        mod.process_page(state, page_num, page, next_page, page_texts)
+    else:
+        mod.prepass_page(state, page_num, page_texts)
+
+
+# every extractor over every page of a document, in one walk
+def extract_pages(pages, page_texts, year, extractors):
+    states = {name: mod.new_document_state(year) for name, mod in extractors}
+    for page_num, page, next_page in iter_page_windows(pages):
+        for name, mod in extractors:
+            visit_page(mod, states[name], page_num, page, next_page, page_texts)
+    return {name: mod.document_results(states[name]) for name, mod in extractors}
+
+
+# one parse of a report, every extractor sees every page
+def extract_report(path, year, extractors, cache_dir=None):
+    reset_peak_rss()
+    with open_report(path, cache_dir) as pdf:
+        results = extract_pages(pdf.pages, PageTexts(pdf.pages), year, extractors)
+        release_document(pdf)
+
+    peak = peak_rss()
+    if peak is not None:
+        print(f"{os.path.basename(path)}: peak memory {peak / 2**20:.0f} MB")
+    return results
+
+
+# pool.submit that brings worker trace data back when tracing is on,
+# read the result with tracing.job_result
+def _submit(pool, fn, *args):
+    return pool.submit(tracing.run_job, tracing.enabled, fn, *args)
+
+
+# runs in a worker process, extractors are re-imported there by name
+def _extract_report_job(path, year, names, cache_dir):
+    return extract_report(path, year, load_extractors(names), cache_dir)
+
+
+# dict that notes which carried keys a page shard read before writing them
+class TrackedState(dict):
+    def __init__(self, state, tracked):
+        super().__init__(state)
+        self.tracked = frozenset(tracked)
+        self.reads = set()
+        self.writes = set()
+
+    def __getitem__(self, key):
+        if key in self.tracked and key not in self.writes:
+            self.reads.add(key)
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        if key in self.tracked:
+            self.writes.add(key)
+        dict.__setitem__(self, key, value)
+
+
+# [start, end) page ranges, as even as possible
+def page_ranges(n_pages, shards):
+    shards = max(1, min(shards, n_pages))
+    bounds = [n_pages * i // shards for i in range(shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# carried state at the start of every shard, from the text-only pre-pass
+def guess_carried_state(mod, year, page_texts, ranges):
+    state = mod.new_document_state(year)
+    guesses = []
+    for start, end in ranges:
+        guesses.append({key: state[key] for key in mod.CARRIED_STATE})
+        for page_num in range(start + 1, end + 1):
+            mod.prepass_page(state, page_num, page_texts)
+    return guesses
+
+
+# runs one extractor over pages [start, end) starting from the given carried state
+# returns (results, carried state at the end, keys read, keys written)
+def extract_shard(pdf, page_texts, year, mod, start, end, carried):
+    state = mod.new_document_state(year)
+    state.update(carried)
+    state = TrackedState(state, mod.CARRIED_STATE)
+
+    for page_num, page, next_page in iter_page_windows(pdf.pages, start, end):
+        visit_page(mod, state, page_num, page, next_page, page_texts)
+
+    final = {key: dict.__getitem__(state, key) for key in mod.CARRIED_STATE}
+    return mod.document_results(state), final, state.reads, state.writes
+
+
+def _extract_shard_job(layout_file, path, year, names, start, end, guesses):
+    pdf = CachedDocument(path, *read_layout(layout_file))
+    page_texts = PageTexts(pdf.pages)
+    out = {}
+    for name, mod in load_extractors(names):
+        out[name] = extract_shard(pdf, page_texts, year, mod, start, end, guesses[name])
+    release_document(pdf)
+    pdf.close()
+    return out
+
+
+# layout file for a report, parsed in page ranges across the pool on a miss
+# returns (path, is_temp)
+def _sharded_layout(path, pool, shards, cache_dir=None):
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        layout_file = cache_path(cache_dir, report_hash(path))
+        if os.path.exists(layout_file):
+            try:
+                read_layout(layout_file)
+                return layout_file, False
+            except ValueError:
+                pass
+    else:
+        import tempfile
+
+        fd, layout_file = tempfile.mkstemp(suffix=".layout")
+        os.close(fd)
+
+    with pdf_backend.open_pdf(path) as pdf:
+        n_pages = len(pdf.pages)
+    futures = [_submit(pool, parse_page_range, path, start, end)
+               for start, end in page_ranges(n_pages, shards)]
+    write_layout(layout_file, *concat_columns([tracing.job_result(f) for f in futures]))
+    return layout_file, cache_dir is None
+
+
+# one report split into page shards across the pool
+# each shard starts from the pre-pass guess of the carried state; a shard
+# whose guess turns out wrong for a key it actually read is redone locally,
+# so results always match extract_report
+def extract_report_sharded(path, year, extractors, pool, shards, cache_dir=None):
+    layout_file, is_temp = _sharded_layout(path, pool, shards, cache_dir)
+    try:
+        pdf = CachedDocument(path, *read_layout(layout_file))
+        page_texts = PageTexts(pdf.pages)
+        ranges = page_ranges(len(page_texts), shards)
+        guesses = {name: guess_carried_state(mod, year, page_texts, ranges)
+                   for name, mod in extractors}
+
+        names = [name for name, _mod in extractors]
+        futures = []
+        for i, (start, end) in enumerate(ranges):
+            shard_guesses = {name: guesses[name][i] for name in names}
+            futures.append(_submit(pool, _extract_shard_job, layout_file, path, year,
+                                   names, start, end, shard_guesses))
+        shard_out = [tracing.job_result(f) for f in futures]
+
+        results = {}
+        for name, mod in extractors:
+            initial = mod.new_document_state(year)
+            actual = {key: initial[key] for key in mod.CARRIED_STATE}
+            partials = []
+            for i, (start, end) in enumerate(ranges):
+                res, final, reads, writes = shard_out[i][name]
+                if any(guesses[name][i][key] != actual[key] for key in reads):
+                    res, final, reads, writes = extract_shard(
+                        pdf, page_texts, year, mod, start, end, actual)
+                partials.append(res)
+                actual = {key: final[key] if key in writes else actual[key] for key in actual}
+            results[name] = mod.merge_results(partials)
+
+        release_document(pdf)
+        pdf.close()
+    finally:
+        if is_temp:
+            os.remove(layout_file)
+    return results
+
+
+# worker setup: this process's pdf_backend setting
+def _init_worker(backend):
+    pdf_backend.set_backend(backend)
+
+
+# worker pool, workers get this process's settings
+def _pool(workers):
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(pdf_backend.backend,))
+
+
+# (content hash, layout cache file already holding the report or None on a
+# miss), (None, None) without a cache
+def _cached_layout(cache_dir, path):
+    if cache_dir is None:
+        return None, None
+    digest = report_hash(path)
+    layout_file = cache_path(cache_dir, digest)
+    if os.path.exists(layout_file):
+        try:
+            read_layout(layout_file)
+            return digest, layout_file
+        except ValueError:
+            pass
+    return digest, None
+
+
+# extract_reports as a pipeline (see pipeline): the pool parses page chunks
+# ahead of this process, which walks each report's pages as they arrive;
+# reports missing from the layout cache are added to it chunk by chunk
+def extract_reports_pipelined(reports, extractors, cache_dir=None, workers=1, depth=2):
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+    parse = pipeline.StageCounter("parse", "pages")
+    extract = pipeline.StageCounter("extract", "pages")
+    results = []
+    start = time.perf_counter()
+    with _pool(workers) as pool:
+        producer = pipeline.Producer(reports, functools.partial(_submit, pool), depth,
+                                     functools.partial(_cached_layout, cache_dir), parse)
+        producer.start()
+        try:
+            for year, path in reports:
+                _kind, _i, n_pages, layout_file, digest = producer.get(extract)
+                blocked = extract.blocked
+                t0 = time.perf_counter()
+                if layout_file is not None:
+                    pdf = CachedDocument(path, *read_layout(layout_file))
+                    n_pages = len(pdf.pages)
+                    results.append(extract_pages(pdf.pages, PageTexts(pdf.pages), year, extractors))
+                    release_document(pdf)
+                    pdf.close()
+                else:
+                    writer = LayoutWriter(cache_path(cache_dir, digest)) if digest is not None else None
+                    pages = pipeline.StreamPages(path, n_pages, producer, parse, extract, writer)
+                    try:
+                        results.append(extract_pages(pages, pipeline.StreamTexts(pages), year, extractors))
+                    except BaseException:
+                        if writer is not None:
+                            writer.discard()
+                        raise
+                    if writer is not None:
+                        pages.load_through(n_pages - 1)  # every chunk, even if the walk stopped short
+                        writer.close()
+                    pages.close()
+                extract.items += n_pages
+                extract.busy += time.perf_counter() - t0 - (extract.blocked - blocked)
+        finally:
+            producer.stop()
+
+    print(pipeline.format_counters([parse, extract], workers, time.perf_counter() - start))
+    peak = peak_rss()
+    if peak is not None:
+        print(f"peak memory {peak / 2**20:.0f} MB")
+    return results
+
+
+# per-report results in the same order as reports, whatever the worker count
+# depth: > 0 runs parsing and extraction as a pipeline (shards is unused then)
+def extract_reports(reports, extractors, cache_dir=None, workers=1, shards=1, depth=0):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if depth > 0:
+        return extract_reports_pipelined(reports, extractors, cache_dir, workers, depth)
+    if shards > 1 and workers > 1:
+        # reports one after another, each spread over the whole pool
+        with _pool(workers) as pool:
+            return [extract_report_sharded(path, year, extractors, pool, shards, cache_dir)
+                    for year, path in reports]
+    if workers <= 1 or len(reports) <= 1:
+        return [extract_report(path, year, extractors, cache_dir) for year, path in reports]
+
+    names = [name for name, _mod in extractors]
+    # biggest reports first so one huge file doesn't start last and straggle
+    order = sorted(range(len(reports)), key=lambda i: -os.path.getsize(reports[i][1]))
+
+    results = [None] * len(reports)
+    with _pool(min(workers, len(reports))) as pool:
+        futures = {}
+        for i in order:
+            year, path = reports[i]
+            futures[i] = _submit(pool, _extract_report_job, path, year, names, cache_dir)
+        for i, fut in futures.items():
+            results[i] = tracing.job_result(fut)
+    return results
+
+
+# extract_reports reusing earlier results: a (report, extractor) pair is only
+# extracted if neither the manifest nor the result cache has it for this
+# report content and extractor version; the results are the same as
+# extracting every report (copies of a report are extracted once and reused)
+def extract_reports_cached(reports, extractors, manifest_path=None, result_dir=None,
+                           cache_dir=None, workers=1, shards=1, depth=0):
+    manifest = report_manifest.load_manifest(manifest_path) if manifest_path else None
+    entries = manifest["reports"] if manifest else {}
+    versions = {name: result_cache.extractor_version(mod) for name, mod in extractors}
+    digests = [report_hash(path) for _year, path in reports]
+    keys = [report_manifest.report_key(digest, year) for digest, (year, _path) in zip(digests, reports)]
+
+    # stored results per distinct report, and the extractors it still needs
+    found = {}
+    todo = {}
+    for (year, path), digest, key in zip(reports, digests, keys):
+        if key in found:
+            continue
+        entry = entries.get(key, {})
+        found[key] = {}
+        for name, _mod in extractors:
+            stored = entry.get(name)
+            if stored is not None and stored.get("version") == versions[name]:
+                found[key][name] = stored["results"]
+            elif result_dir:
+                encoded = result_cache.load_result(result_dir, digest, year, name, versions[name])
+                if encoded is not None:
+                    found[key][name] = encoded
+        names = tuple(name for name, _mod in extractors if name not in found[key])
+        todo[key] = (year, path, digest, names)
+
+    # one extract_reports call per set of stale extractors
+    groups = {}
+    for key, (_year, _path, _digest, names) in todo.items():
+        if names:
+            groups.setdefault(names, []).append(key)
+    for names, group in groups.items():
+        subset = [(name, mod) for name, mod in extractors if name in names]
+        results = extract_reports([todo[key][:2] for key in group], subset, cache_dir, workers,
+                                  shards, depth)
+        for key, res in zip(group, results):
+            year, _path, digest, _names = todo[key]
+            for name in names:
+                found[key][name] = result_cache.encode_results(res[name])
+                if result_dir:
+                    result_cache.store_result(result_dir, digest, year, name, versions[name],
+                                              found[key][name])
+
+    skipped = sum(1 for *_rest, names in todo.values() if not names)
+    print(f"{len(todo) - skipped} reports extracted, {skipped} served from earlier results, "
+          f"{len(reports) - len(todo)} duplicates")
+
+    # the manifest keeps only reports still in the folder
+    if manifest is not None:
+        for key, (_year, _path, _digest, names) in todo.items():
+            entry = entries.setdefault(key, {})
+            for name, _mod in extractors:
+                if name in names or entry.get(name, {}).get("version") != versions[name]:
+                    entry[name] = {
+                        "version": versions[name],
+                        "rows": result_cache.row_keys(result_cache.decode_results(found[key][name])),
+                        "results": found[key][name],
+                    }
+            entry["files"] = sorted(
+                os.path.basename(path) for (_y, path), k in zip(reports, keys) if k == key)
+        manifest["reports"] = {key: entries[key] for key in todo}
+        report_manifest.save_manifest(manifest_path, manifest)
+
+    # fresh results go through the same json round trip as stored ones
+    return [{name: result_cache.decode_results(found[key][name]) for name, _mod in extractors}
+            for key in keys]
+
+
+# loads each report's results into the fact store, one transaction per
+# report, then writes the csvs from its views; returns the csv frames
+def write_through_fact_store(db_path, reports, extractors, all_results, out_paths):
+    conn = fact_store.open_store(db_path)
+    try:
+        fact_store.clear(conn, [name for name, _mod in extractors])
+        for seq, ((_year, path), results) in enumerate(zip(reports, all_results)):
+            fact_store.insert_document(conn, os.path.basename(path), seq,
+                                       [(name, mod, results[name]) for name, mod in extractors])
+        frames = {}
+        for name, mod in extractors:
+            fact_store.create_csv_view(conn, name, mod.METRIC_COLUMNS)
+            years, values = fact_store.csv_values(conn, name)
+            frames[name] = mod.write_facts(years, values, out_paths[name])
+        return frames
+    finally:
+        conn.close()
+
+
+# writes the extractors' csvs (through the fact store when fact_db is set) and
+# typed tables from per-report results in report order
+def write_outputs(reports, extractors, all_results, out_paths, typed_format=None, fact_db=None):
+    if fact_db:
+        frames = write_through_fact_store(fact_db, reports, extractors, all_results, out_paths)
+    else:
+        frames = {name: mod.write_csv(mod.merge_results([results[name] for results in all_results]),
+                                      out_paths[name])
+                  for name, mod in extractors}
+
+    if typed_format:
+        sources = {}
+        for year, path in reports:
+            sources.setdefault(str(year), []).append(os.path.basename(path))
+        sources = {year: ", ".join(names) for year, names in sources.items()}
+        for name, mod in extractors:
+            path = typed_output.typed_path(out_paths[name], typed_format)
+            typed_output.write_typed(frames[name], path, typed_format, mod.COUNT_COLUMNS,
+                                     mod.PERCENT_COLUMNS, sources)
+
+
+# process-wide settings for a run, before any worker pool is started
+def configure(backend="pdfplumber", csv_engine="plain", typed_format=None):
+    if typed_format:
+        typed_output.check_format(typed_format)
+    pdf_backend.set_backend(backend)
+    csv_output.set_engine(csv_engine)
+
+
+# runs the given extractors over a folder and writes one csv per extractor
+# out_paths: extractor name -> csv path
+# cache_dir: layout cache folder, reruns on unchanged reports skip pdf parsing
+# workers: report-level worker processes, output is identical to a serial run
+# shards: with workers > 1, split each report into this many page ranges instead
+# trace_file: write a chrome trace of the run there (workers included)
+# manifest_path: incremental run, only reports not yet in this manifest (or
+# changed since) are extracted
+# result_dir: per-extractor result cache, only extractors whose code changed
+# are re-run on reports seen before
+# backend: pdf library the reports are parsed with (see pdf_backend)
+# pipeline_depth: > 0 overlaps parsing in the workers with extraction here,
+# with at most this many parsed page chunks queued (see pipeline)
+# typed_format: "parquet" / "arrow", also write a typed table next to each csv
+# fact_db: sqlite fact store the csvs are exported through (see fact_store)
+# csv_engine: "plain" or "pandas" csv writer (see csv_output)
+def run_extractors(folder, out_paths, cache_dir=None, workers=1, shards=1, trace_file=None,
+                   manifest_path=None, result_dir=None, backend="pdfplumber",
+                   pipeline_depth=0, typed_format=None, fact_db=None, csv_engine="plain"):
+    configure(backend, csv_engine, typed_format)
+    if trace_file:
+        tracing.enable()
+    extractors = load_extractors(out_paths)
+
+    reports = report_files(folder)
+    if manifest_path or result_dir:
+        all_results = extract_reports_cached(reports, extractors, manifest_path, result_dir,
+                                             cache_dir, workers, shards, pipeline_depth)
+    else:
+        all_results = extract_reports(reports, extractors, cache_dir, workers, shards, pipeline_depth)
+    write_outputs(reports, extractors, all_results, out_paths, typed_format, fact_db)
+
+    if trace_file:
+        tracing.write(trace_file)
+        print(tracing.summary())
+
+
+def main():
+    out_paths = {}
+    for name, mod in load_extractors():
+        out_paths[name] = os.path.join(outputFolder or ".", mod.CSV_NAME)
+    run_extractors(gradReportFolder, out_paths, layoutCacheFolder, workerCount, pageShards, traceFile,
+                   manifestFile, resultCacheFolder, pdfBackend, pipelineDepth,
+                   typedOutput, factDatabase, csvEngine)
+
+
+if __name__ == "__main__":
+    main()
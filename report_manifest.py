@@ -0,0 +1,50 @@
+import json
+import os
+
+from layout_store import layout_version
+
+# manifest of reports already processed, for incremental runs
+#
+#   {"manifest_version": 1, "parser_version": "1-pdfplumber0.11.10-pdfminer.six20260107",
+#    "reports": {"<content hash>:<year>": {
+#        "files": [file names with this content and year],
+#        "<extractor>": {"version": extractor version, "rows": [row keys],
+#                        "results": document results as json}}}}
+#
+# a report is keyed by its content hash and the year from its file name (the
+# year goes into every row), so a copy under another name is extracted once;
+# an extractor's entry is reused while its version (result_cache) is unchanged
+
+MANIFEST_VERSION = 1
+
+
+def new_manifest():
+    return {"manifest_version": MANIFEST_VERSION, "parser_version": layout_version(), "reports": {}}
+
+
+# manifest at path, a fresh one if it is missing, unreadable or was written
+# with other word extraction settings or parser library versions
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest()
+    if (manifest.get("manifest_version") != MANIFEST_VERSION
+            or manifest.get("parser_version") != layout_version()):
+        return new_manifest()
+    return manifest
+
+
+def save_manifest(path, manifest):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def report_key(digest, year):
+    return f"{digest}:{year}"
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import sys
+import types
+
+from layout_store import layout_version
+
+# per-extractor document results on disk, keyed by (report content hash,
+# year, extractor, extractor version) so a rebuild only re-runs the
+# extractors whose code changed
+#
+# an extractor's version is its EXTRACTOR_VERSION plus a fingerprint of what
+# decides its results: the source of every module in this folder its code can
+# reach (the script, the shared layout / section / unit / anchor helpers)
+# except the ones that only write results out, the modules that turn a pdf
+# into words, the layout version (parser library versions) and the page walk
+# code of report_engine and pipeline. editing a pattern or a helper changes it;
+# editing another extractor's script, the csv writers or the rest of the
+# driver does not
+
+# reached through write_rows etc., but they only write what was extracted
+OUTPUT_MODULES = ("csv_output", "typed_output", "fact_store")
+
+# decide which words a page gives whether or not a script imports them; read
+# from disk, not imported (lean_pdf would pull in pdfplumber)
+PARSER_MODULES = ("layout_store", "pdf_backend", "lean_pdf")
+
+# functions and classes of the driver that decide which pages an extractor
+# sees and with what state: the serial walk, the sharded walk (pre-pass
+# guesses, shard runs and the redo of wrong guesses) and the streamed pages
+# of the pipelined walk
+DRIVER_FUNCTIONS = {
+    "report_engine": ("is_candidate_page", "visit_page", "extract_pages", "TrackedState",
+                      "page_ranges", "guess_carried_state", "extract_shard",
+                      "extract_report_sharded"),
+    "pipeline": ("StreamPages", "StreamTexts"),
+}
+
+
+# repo modules reachable from mod through its globals: imported modules and
+# the modules of imported functions and classes, output modules left out
+def _code_modules(mod):
+    root = os.path.dirname(os.path.abspath(mod.__file__))
+    found = {}
+    stack = [mod]
+    while stack:
+        m = stack.pop()
+        path = getattr(m, "__file__", None)
+        if (m.__name__ in found or m.__name__ in OUTPUT_MODULES or not path
+                or os.path.dirname(os.path.abspath(path)) != root):
+            continue
+        found[m.__name__] = path
+        for value in vars(m).values():
+            if isinstance(value, types.ModuleType):
+                stack.append(value)
+            elif isinstance(value, (types.FunctionType, type)):
+                dep = sys.modules.get(value.__module__)
+                if dep is not None:
+                    stack.append(dep)
+    return found
+
+
+# the DRIVER_FUNCTIONS as parsed from their modules, without line numbers
+# or comments, so other edits to the driver leave them alone
+def _driver_functions(root):
+    import ast
+
+    dumps = []
+    for module, names in DRIVER_FUNCTIONS.items():
+        with open(os.path.join(root, f"{module}.py"), "rb") as f:
+            tree = ast.parse(f.read())
+        dumps += [ast.dump(node) for node in tree.body
+                  if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in names]
+    return dumps
+
+
+# modules whose whole source goes into an extractor's fingerprint, name -> path
+def _fingerprint_modules(mod):
+    root = os.path.dirname(os.path.abspath(mod.__file__))
+    modules = _code_modules(mod)
+    for name in PARSER_MODULES:
+        path = os.path.join(root, f"{name}.py")
+        if os.path.exists(path):
+            modules.setdefault(name, path)
+    return modules
+
+
+# every file an extractor's fingerprint is read from, so a caller can stat
+# them and only recompute the fingerprint when one of them was saved
+def fingerprint_files(mod):
+    root = os.path.dirname(os.path.abspath(mod.__file__))
+    files = {os.path.abspath(path) for path in _fingerprint_modules(mod).values()}
+    files.update(os.path.join(root, f"{module}.py") for module in DRIVER_FUNCTIONS)
+    return sorted(files)
+
+
+def extractor_fingerprint(mod):
+    root = os.path.dirname(os.path.abspath(mod.__file__))
+    modules = _fingerprint_modules(mod)
+    h = hashlib.sha256(layout_version().encode("utf-8"))
+    for name, path in sorted(modules.items()):
+        h.update(name.encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            h.update(f.read())
+    for function in _driver_functions(root):
+        h.update(function.encode("utf-8"))
+    return h.hexdigest()
+
+
+def extractor_version(mod):
+    return f"{getattr(mod, 'EXTRACTOR_VERSION', '0')}-{extractor_fingerprint(mod)[:16]}"
+
+
+# document results as json: (year, unit) keyed row dicts become [key, row]
+# pairs (in order), lists of tables are kept as they are
+def encode_results(results):
+    if isinstance(results, dict):
+        return {"pairs": [[list(key), row] for key, row in results.items()]}
+    return {"items": results}
+
+
+def decode_results(data):
+    if "pairs" in data:
+        return {tuple(key): row for key, row in data["pairs"]}
+    return data["items"]
+
+
+# (year, unit) keys a document produced
+def row_keys(results):
+    if isinstance(results, dict):
+        return [list(key) for key in results]
+    return [[t["year"], t["school"]] for t in results]
+
+
+def result_path(cache_dir, digest, year, name, version):
+    return os.path.join(cache_dir, f"{digest}-{year}-{name}-{version}.json")
+
+
+# encoded results for one report and extractor, None if not cached
+def load_result(cache_dir, digest, year, name, version):
+    try:
+        with open(result_path(cache_dir, digest, year, name, version)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_result(cache_dir, digest, year, name, version, encoded):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = result_path(cache_dir, digest, year, name, version)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(encoded, f)
+    os.replace(tmp, path)
@@ -0,0 +1,120 @@
+import re
+
+from unit_names import match_unit
+
+# one forward pass over a document's page text recording what each page's
+# header says, so finding the unit for a page is a lookup instead of a
+# regex scan back over earlier pages
+
+TOC_PATTERN = re.compile(r"Table\s+of\s+Contents|Contents\b", re.IGNORECASE)
+SURVEY_PATTERN = re.compile(r"Survey\s+Response\s+Rate", re.IGNORECASE)
+
+
+# top of a page (first 40 lines) flattened to single spaces
+def flat_top(raw):
+    top = "\n".join((raw or "").splitlines()[:40])
+    return " ".join(top.split())
+
+
+class SectionIndex:
+    def __init__(self, page_texts):
+        self.page_texts = page_texts
+        self.heads = []        # unit alias at the start of each page ("" if none), None on TOC pages
+        self.last_header = []  # nearest page <= p with a head, -1 if none
+        self.last_survey = []  # nearest page <= p with a head and "Survey Response Rate"
+
+    # index pages up to p, page text is only pulled as far as it is asked for
+    def _extend_to(self, p):
+        last_header = self.last_header[-1] if self.last_header else -1
+        last_survey = self.last_survey[-1] if self.last_survey else -1
+        for q in range(len(self.heads), p + 1):
+            top = flat_top(self.page_texts[q])
+            head = None
+            # dont take school name from table of contents page
+            if not TOC_PATTERN.search(top):
+                head = match_unit(top)
+                last_header = q
+                if SURVEY_PATTERN.search(top):
+                    last_survey = q
+            self.heads.append(head)
+            self.last_header.append(last_header)
+            self.last_survey.append(last_survey)
+
+    # unit header at the top of page p (0-based), None if there isn't one
+    def header(self, p):
+        if p >= len(self.heads):
+            self._extend_to(p)
+        return self.heads[p]
+
+    # header governing page p, looking back no further than page stop (exclusive):
+    # the nearest header on a Survey Response Rate page, else the nearest header
+    def governing_header(self, p, stop=-1):
+        if p >= len(self.heads):
+            self._extend_to(p)
+        q = self.last_survey[p]
+        if q > stop:
+            return self.heads[q]
+        q = self.last_header[p]
+        if q > stop:
+            return self.heads[q]
+        return None
+
+
+_current = (None, None)
+# id(page_texts) -> (page_texts, SectionIndex, PageMarkers) for documents that
+# keep theirs between walks (watch mode), others share the one slot above
+_pinned = {}
+
+
+# index for a document, built once and shared by every script on that document
+def section_index(page_texts):
+    global _current
+    pinned = _pinned.get(id(page_texts))
+    if pinned is not None:
+        return pinned[1]
+    texts, index = _current
+    if texts is not page_texts:
+        index = SectionIndex(page_texts)
+        _current = (page_texts, index)
+    return index
+
+
+# which section markers each page's text mentions; a marker is a tuple of
+# words that all have to appear on the page (case and spacing ignored), loose
+# enough that any page whose word lines match a section header is included
+# (benchmarks/marker_check.py checks that on a folder of reports)
+class PageMarkers:
+    def __init__(self, page_texts):
+        self.page_texts = page_texts
+        self.squashed = {}  # page -> text with whitespace removed, casefolded
+
+    def has_any(self, p, markers):
+        text = self.squashed.get(p)
+        if text is None:
+            text = self.squashed[p] = "".join(self.page_texts[p].split()).casefold()
+        return any(all(word in text for word in marker) for marker in markers)
+
+
+_current_markers = (None, None)
+
+
+def page_markers(page_texts):
+    global _current_markers
+    pinned = _pinned.get(id(page_texts))
+    if pinned is not None:
+        return pinned[2]
+    texts, markers = _current_markers
+    if texts is not page_texts:
+        markers = PageMarkers(page_texts)
+        _current_markers = (page_texts, markers)
+    return markers
+
+
+# keeps a document's index and markers for as long as it stays pinned, however
+# many other documents are walked in between
+def pin_document(page_texts):
+    _pinned[id(page_texts)] = (page_texts, SectionIndex(page_texts), PageMarkers(page_texts))
+
+
+def unpin_document(page_texts):
+    _pinned.pop(id(page_texts), None)
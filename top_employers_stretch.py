@@ -1,85 +1,29 @@
-import pdfplumber
-import pandas as pd
-import os
 import re
 
-gradReportFolder = None
+from csv_output import write_rows
+from page_layout import build_lines_from_words, top_lines
+from section_index import section_index
+import unit_names
 
-# order for csv rows
+gradReportFolder = None
+out_path = None
+# set to a folder to keep parsed page layouts between runs
+layoutCacheFolder = None
+# worker processes for reports (1 = serial, 0 = one per core)
+workerCount = 1
+CSV_NAME = "top_employers_stretch.csv"
+# code changes are picked up by result_cache's fingerprint; bump this when
+# rows change for another reason (e.g. a pdfplumber upgrade)
+EXTRACTOR_VERSION = "1"
+
+# order for csv rows, only the university-wide summary is extracted here
 unit_order = [
     "University-Wide"
 ]
-unit_mapping = {u.lower(): u for u in unit_order}
 
-# normalize differences in unit names
+# other units map to None so their pages are skipped
 def normalize_unit(name):
-    if not name:
-        return None
-    n = " ".join(name.strip().split()).lower()
-    n = n.replace("&", "and")
-    n = n.replace("university wide", "university-wide")
-    n = n.replace("letters & sciences", "letters and sciences")
-    n = n.replace("college of information studies", "college of information")
-    n = n.replace("school of architecture, planning and preservation",
-                  "school of architecture, planning, and preservation")
-    n = n.replace("phillip merrill college of journalism", "philip merrill college of journalism")
-    n = n.replace("office of undergraduate studies", "undergraduate studies")
-    n = n.replace("office of undergrad studies", "undergraduate studies")
-    n = n.replace("the school of public policy", "school of public policy")
-    n = n.replace("school of public policy and administration", "school of public policy")
-
-    if "clark school of engineering" in n:
-        n = "the a. james clark school of engineering"
-    if n in ["overall"]:
-        n = "university-wide"
-    if n in ["a. james clark school of engineering", "james clark school of engineering"]:
-        n = "the a. james clark school of engineering"
-    if n.startswith("college of computer, mathematical"):
-        n = "college of computer, mathematical, and natural sciences"
-    if "school of architecture" in n:
-        n = "school of architecture, planning, and preservation"
-
-    return unit_mapping.get(n, None)
-
-# all schools in reports
-school_pattern = re.compile(
-    r"("
-    r"College of Agriculture and Natural Resources|"
-    r"College of Arts and Humanities|"
-    r"College of Behavioral and Social Sciences|"
-    r"College of Computer, Mathematical, and Natural Sciences|"
-    r"College of Computer, Mathematical,|"
-    r"College of Computer, Mathematical|"
-    r"College of Education|"
-    r"College of Information Studies|"
-    r"College of Information|"
-    r"(?:The\s+)?A\.?\s*James\s+Clark\s+School\s+of\s+Engineering|"
-    r"Clark\s+School\s+of\s+Engineering|"
-    r"Philip Merrill College of Journalism|"
-    r"Phillip Merrill College of Journalism|"
-    r"School of Architecture, Planning, and Preservation|"
-    r"SCHOOL OF ARCHITECTURE, PLANNING|"
-    r"School of Architecture, Planning and Preservation|"
-    r"SCHOOL OF ARCHITECTURE,\s*PLANNING\s*AND\s*PRESERVATION|"
-    r"SCHOOL OF PUBLIC HEALTH|"
-    r"School of Public Health|"
-    r"School of Public Policy|"
-    r"The School of Public Policy|"
-    r"School of Public Policy and Administration|"
-    r"The Robert H\. Smith School of Business|"
-    r"College Park Scholars|"
-    r"Honors College|"
-    r"Letters\s*&\s*Sciences|"
-    r"Letters and Sciences|"
-    r"Overall|"
-    r"University Wide|"
-    r"University-Wide|"
-    r"Undergraduate Studies|"
-    r"Office of Undergraduate Studies|"
-    r"OFFICE OF UNDERGRADUATE STUDIES|"
-    r")",
-    re.IGNORECASE
-)
+    return unit_names.normalize_unit(name, unit_order)
 
 # regex helpers
 WS = r"(?:[\s\u00A0]+)"
@@ -97,6 +41,11 @@ top10 = re.compile(
     re.IGNORECASE
 )
 
+# words that have to be on a page (or the next one, the block can start
+# there) for it to hold the geographic section
+PAGE_MARKERS = (("geographic", "distribution"), ("employment", "locations"))
+NEXT_PAGE_MARKERS = PAGE_MARKERS
+
 # top location pattern within summary text
 TOP_LOC_ITEM = re.compile(
     r"(<?\d{1,3}(?:\.\d+)?)\s*%\s*"
@@ -106,27 +55,6 @@ TOP_LOC_ITEM = re.compile(
     re.IGNORECASE
 )
 
-# word based line reconstruction
-def build_lines_from_words(page, y_tol=2.0):
-    words = page.extract_words(use_text_flow=True) or []
-    rows = {}
-    for w in words:
-        txt = (w.get("text") or "").strip()
-        if not txt:
-            continue
-        y = w["top"]
-        key = round(y / y_tol) * y_tol
-        rows.setdefault(key, []).append(w)
-
-    lines = []
-    for y in sorted(rows.keys()):
-        row_words = sorted(rows[y], key=lambda ww: ww["x0"])
-        line = " ".join(ww["text"] for ww in row_words)
-        line = " ".join(line.split())
-        if line:
-            lines.append(line)
-    return lines
-
 def clip_at_stop(lines):
     out = []
     for ln in lines:
@@ -150,7 +78,7 @@ def count_for_keyword(lines, keyword):
 def extract_geo_block_with_pre(page, next_page=None, pre_lines=40, post_lines=240):
     lines = build_lines_from_words(page)
     if next_page is not None:
-        lines += build_lines_from_words(next_page)[:120]
+        lines += top_lines(next_page, 120)
 
     start = None
     for i, ln in enumerate(lines):
@@ -187,101 +115,144 @@ def extract_top_location_and_count(joined_text):
 
     return best[1], best[2]
 
-# -----------------------------
-# main extraction
-# -----------------------------
-year_unit_data = {}  # (year_str, unit) -> row dict
-
-for file in os.listdir(gradReportFolder):
-    if not file.endswith(".pdf"):
-        continue
-
-    year = file.split(" ")[0]
-    fullPath = os.path.join(gradReportFolder, file)
-
-    with pdfplumber.open(fullPath) as pdf:
-        page_texts = [p.extract_text() or "" for p in pdf.pages]
-
-        current_unit = None
-        last_school_norm = None
-        last_table_page = None
-
-        for page_num, page in enumerate(pdf.pages, start=1):
-            raw = page_texts[page_num - 1] or ""
-            top = "\n".join(raw.splitlines()[:40])
-            flat_top = " ".join(top.split())
-            if not re.search(r"Table\s+of\s+Contents|Contents\b", flat_top, re.IGNORECASE):
-                m_unit = school_pattern.search(flat_top)
-                if m_unit:
-                    cand = normalize_unit(m_unit.group(0))
-                    if cand:
-                        current_unit = cand
-                        last_school_norm = cand
-
-            next_page = pdf.pages[page_num] if page_num < len(pdf.pages) else None
-
-            # figure out school
-            school_norm = current_unit
-            if not school_norm and last_school_norm and last_table_page == page_num - 1:
-                school_norm = last_school_norm
-            if not school_norm and last_school_norm is None:
-                school_norm = "University-Wide"
-            if not school_norm:
-                continue
-
-            if school_norm != "University-Wide":
-                continue
-
-            geo_lines = extract_geo_block_with_pre(page, next_page=next_page, pre_lines=40, post_lines=240)
-            if not geo_lines:
-                continue
-
-            joined = " ".join(geo_lines)
-            top_loc, top_cnt = extract_top_location_and_count(joined)
-
-            if top_loc is None or top_cnt is None:
-                continue
-
-            key = (year, school_norm)
-            if key not in year_unit_data:
-                year_unit_data[key] = {
-                    "Unit": school_norm,
-                    "Year": year,
-                    "Location": None,
-                    "Graduates N": None,
-                }
-
-            row = year_unit_data[key]
-            row["Location"] = top_loc
-            row["Graduates N"] = top_cnt
-
-            last_school_norm = school_norm
-            last_table_page = page_num
+# per document memory vars
+def new_document_state(year):
+    return {
+        "year": year,
+        "rows": {},  # (year_str, unit) -> row dict
+        "current_unit": None,
+        "last_school_norm": None,
+        "last_table_page": None,
+    }
+
+# state that flows from one page to the next
+CARRIED_STATE = ("current_unit", "last_school_norm", "last_table_page")
+
+# unit headers at the top of a page switch the current unit
+def update_unit_context(state, page_num, page_texts):
+    head = section_index(page_texts).header(page_num - 1)
+    if head is not None:
+        cand = normalize_unit(head)
+        if cand:
+            state["current_unit"] = cand
+            state["last_school_norm"] = cand
+
+# text-only part of process_page, cheap guess of the carried state
+prepass_page = update_unit_context
+
+# school for this page, None if the page should be skipped
+def current_school(state, page_num):
+    school_norm = state["current_unit"]
+    if not school_norm and state["last_school_norm"] and state["last_table_page"] == page_num - 1:
+        school_norm = state["last_school_norm"]
+    if not school_norm and state["last_school_norm"] is None:
+        school_norm = "University-Wide"
+    return school_norm
+
+# top location row from one page
+def process_page(state, page_num, page, next_page, page_texts):
+    year = state["year"]
+    year_unit_data = state["rows"]
+
+    update_unit_context(state, page_num, page_texts)
+
+    # figure out school
+    school_norm = current_school(state, page_num)
+    if not school_norm:
+        return
+
+    if school_norm != "University-Wide":
+        return
+
+    geo_lines = extract_geo_block_with_pre(page, next_page=next_page, pre_lines=40, post_lines=240)
+    if not geo_lines:
+        return
+
+    joined = " ".join(geo_lines)
+    top_loc, top_cnt = extract_top_location_and_count(joined)
+
+    if top_loc is None or top_cnt is None:
+        return
+
+    key = (year, school_norm)
+    if key not in year_unit_data:
+        year_unit_data[key] = {
+            "Unit": school_norm,
+            "Year": year,
+            "Location": None,
+            "Graduates N": None,
+        }
+
+    row = year_unit_data[key]
+    row["Location"] = top_loc
+    row["Graduates N"] = top_cnt
+    row["Page"] = page_num
+
+    state["last_school_norm"] = school_norm
+    state["last_table_page"] = page_num
+
+def document_results(state):
+    return state["rows"]
+
+# later reports win for the same (year, unit), like the old single loop
+def merge_results(partials):
+    year_unit_data = {}
+    for rows in partials:
+        year_unit_data.update(rows)
+    return year_unit_data
 
 # csv creation
-years = sorted({int(year) for (year, _unit) in year_unit_data.keys()})
-template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
+# column types for typed output (see typed_output), Location is text
+COUNT_COLUMNS = ("Graduates N",)
+PERCENT_COLUMNS = ()
+METRIC_COLUMNS = ["Location", "Graduates N"]
 
-metric_cols = ["Location", "Graduates N"]
 
-final_rows = []
-for base in template_rows:
-    yr = base["Year"]
-    unit = base["Unit"]
-    key = (str(yr), unit)
+# writes the csv and returns its frame
+def write_csv(year_unit_data, out_path):
+    years = sorted({int(year) for (year, _unit) in year_unit_data.keys()})
+    template_rows = [{"Year": y, "Unit": u} for y in years for u in unit_order]
 
-    found = year_unit_data.get(key, {})
-    row = dict(base)
-    for col in metric_cols:
-        row[col] = found.get(col, "") or ""
-    final_rows.append(row)
+    metric_cols = list(METRIC_COLUMNS)
 
-df = pd.DataFrame(final_rows)
-for c in metric_cols:
-    if c not in df.columns:
-        df[c] = ""
+    final_rows = []
+    for base in template_rows:
+        yr = base["Year"]
+        unit = base["Unit"]
+        key = (str(yr), unit)
 
-df = df[["Unit", "Year"] + metric_cols]
-out_path = None
-df.to_csv(out_path, index=False)
-print("Wrote:", out_path)
+        found = year_unit_data.get(key, {})
+        row = dict(base)
+        for col in metric_cols:
+            row[col] = found.get(col, "") or ""
+        final_rows.append(row)
+
+    df = write_rows(final_rows, ["Unit", "Year"] + metric_cols, out_path)
+    print("Wrote:", out_path)
+    return df
+
+
+# one document's rows for the fact store: (years, [(year, unit, column,
+# value, page)]), blank values included since a later report's row replaces
+# an earlier one whole
+def document_facts(year_unit_data):
+    years = sorted({int(year) for (year, _unit) in year_unit_data})
+    facts = [(int(year), unit, col, row.get(col), row.get("Page"))
+             for (year, unit), row in year_unit_data.items() for col in METRIC_COLUMNS]
+    return years, facts
+
+
+# csv from fact store values {(year, unit): {column: value}}
+def write_facts(years, values, out_path):
+    return write_csv({(str(year), unit): row for (year, unit), row in values.items()}, out_path)
+
+
+def main():
+    from cli import script_main
+
+    script_main("geo", {"input": gradReportFolder, "output": out_path,
+                        "cache_dir": layoutCacheFolder, "workers": workerCount})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+import functools
+import importlib
+import json
+import os
+import re
+import threading
+import time
+
+# opt-in instrumentation for the extraction pipeline
+#
+#   tracing.enable()            # wrap hot functions and regexes
+#   ... run extractors ...
+#   tracing.write("trace.json") # chrome://tracing / Perfetto
+#   print(tracing.summary())
+#
+# nothing is wrapped until enable() is called, so a normal run pays nothing.
+# enable() swaps every function in the traced modules (and the modules that
+# imported them by name) for a timing wrapper. the entry points in SPANS
+# (documents, pages, extractors, line building, the anchor cascades) each
+# record a chrome event; every other function only adds to its call count and
+# total time, so leaf helpers called per word or per cell neither flood the
+# trace nor skew the spans around them. compiled regexes at module level, and
+# in module-level dicts and lists, become proxies that count calls, matches
+# and time.
+
+TRACED_MODULES = [
+    "report_engine",
+    "pipeline",
+    "fact_store",
+    "csv_output",
+    "anchor_text",
+    "pdf_backend",
+    "lean_pdf",
+    "layout_store",
+    "page_layout",
+    "section_index",
+    "unit_names",
+    "continuing_education_week1",
+    "internship_participation_week2",
+    "nature_of_position_week3",
+    "top_employers_stretch",
+]
+
+# dunder methods that get wrapped too (all other dunders are left alone)
+TRACED_METHODS = {"PageTexts.__getitem__"}
+
+# functions that record a chrome event per call
+SPANS = {
+    # documents
+    "report_engine.extract_report",
+    "report_engine.extract_report_sharded",
+    "report_engine.extract_pages",
+    "report_engine.write_outputs",
+    "layout_store.open_report",
+    "layout_store.columns_from_pages",
+    "pipeline.parse_chunk",
+    # pages and extractors
+    "report_engine.visit_page",
+    "report_engine.extract_shard",
+    "continuing_education_week1.document_results",
+    # stages
+    "page_layout.build_lines_from_words",
+    "page_layout.column_layout",
+    "internship_participation_week2.extract_conversion_outcomes_from_window",
+    "internship_participation_week2.pct_nearest_anchor_same_sentence",
+    "nature_of_position_week3.pct_nearest_anchor_same_sentence",
+    "nature_of_position_week3.pct_nearest_anchor_billpay",
+    "nature_of_position_week3.extract_nature_block_with_pre",
+    "top_employers_stretch.extract_geo_block_with_pre",
+}
+
+# span arguments for the per-document / per-page entry points
+SPAN_ARGS = {
+    "report_engine.extract_report": lambda args: {"report": os.path.basename(args[0])},
+    "report_engine.extract_report_sharded": lambda args: {"report": os.path.basename(args[0])},
+    "report_engine.visit_page": lambda args: {"extractor": args[0].__name__, "page": args[2]},
+    "report_engine.extract_shard": lambda args: {"extractor": args[3].__name__,
+                                                 "pages": [args[4] + 1, args[5]]},
+}
+
+enabled = False
+
+_events = []
+_func_stats = {}   # function name -> [calls, total us]
+_regex_stats = {}  # "module.NAME" -> [calls, matches (search-type calls), total us]
+_originals = {}    # id(wrapper or proxy) -> original, for disable()
+_in_containers = []  # (dict or list, key, original pattern), for disable()
+
+
+def _now_us():
+    return time.perf_counter_ns() / 1000.0
+
+
+def _wrap_function(fn, name, category):
+    stats = _func_stats.setdefault(name, [0, 0.0])
+    if name not in SPANS:
+        @functools.wraps(fn)
+        def counted(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += (time.perf_counter_ns() - start) / 1000.0
+
+        return counted
+
+    make_args = SPAN_ARGS.get(name)
+
+    @functools.wraps(fn)
+    def traced(*args, **kwargs):
+        start = _now_us()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            dur = _now_us() - start
+            event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": dur,
+                     "pid": os.getpid(), "tid": threading.get_ident()}
+            if make_args is not None:
+                event["args"] = make_args(args)
+            _events.append(event)
+            stats[0] += 1
+            stats[1] += dur
+
+    return traced
+
+
+# stands in for a compiled pattern, counting calls, matches and time
+class TracedPattern:
+    def __init__(self, pattern, name):
+        self._pattern = pattern
+        self._stats = _regex_stats.setdefault(name, [0, 0, 0.0])
+
+    def __getattr__(self, attr):
+        return getattr(self._pattern, attr)
+
+    def _timed(self, method, *args, **kwargs):
+        start = _now_us()
+        result = getattr(self._pattern, method)(*args, **kwargs)
+        self._stats[0] += 1
+        self._stats[2] += _now_us() - start
+        if method in ("search", "match", "fullmatch", "findall") and result:
+            self._stats[1] += 1
+        return result
+
+    def search(self, *args, **kwargs):
+        return self._timed("search", *args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        return self._timed("match", *args, **kwargs)
+
+    def fullmatch(self, *args, **kwargs):
+        return self._timed("fullmatch", *args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        return self._timed("findall", *args, **kwargs)
+
+    def sub(self, *args, **kwargs):
+        return self._timed("sub", *args, **kwargs)
+
+    def split(self, *args, **kwargs):
+        return self._timed("split", *args, **kwargs)
+
+    # time spent pulling matches counts, not just creating the iterator
+    def finditer(self, *args, **kwargs):
+        start = _now_us()
+        found = list(self._pattern.finditer(*args, **kwargs))
+        self._stats[0] += 1
+        self._stats[2] += _now_us() - start
+        if found:
+            self._stats[1] += 1
+        return iter(found)
+
+
+def _traced_modules():
+    return [importlib.import_module(name) for name in TRACED_MODULES]
+
+
+# proxies for the patterns in a module-level dict or list, swapped in place so
+# the functions reading the container see them
+def _wrap_container(container, name):
+    keys = container.keys() if isinstance(container, dict) else range(len(container))
+    for key in list(keys):
+        value = container[key]
+        if isinstance(value, re.Pattern):
+            container[key] = TracedPattern(value, f"{name}[{key}]")
+            _in_containers.append((container, key, value))
+
+
+def enable():
+    global enabled
+    if enabled:
+        return
+    import inspect
+
+    modules = _traced_modules()
+
+    # wrap every function where it is defined, then point the modules that
+    # imported it by name at the same wrapper
+    replace = {}
+    for mod in modules:
+        for attr, value in list(vars(mod).items()):
+            if id(value) in replace:
+                continue  # second name for a function already wrapped
+            if inspect.isfunction(value) and value.__module__ == mod.__name__:
+                wrapper = _wrap_function(value, f"{mod.__name__}.{attr}", mod.__name__)
+                replace[id(value)] = wrapper
+                _originals[id(wrapper)] = value
+            elif inspect.isclass(value) and value.__module__ == mod.__name__:
+                for meth, fn in list(vars(value).items()):
+                    qual = f"{value.__name__}.{meth}"
+                    if inspect.isfunction(fn) and (not meth.startswith("__") or qual in TRACED_METHODS):
+                        wrapper = _wrap_function(fn, f"{mod.__name__}.{qual}", mod.__name__)
+                        setattr(value, meth, wrapper)
+                        _originals[id(wrapper)] = (value, meth, fn)
+            elif isinstance(value, re.Pattern):
+                proxy = TracedPattern(value, f"{mod.__name__}.{attr}")
+                setattr(mod, attr, proxy)
+                _originals[id(proxy)] = value
+            elif isinstance(value, (dict, list)) and not attr.startswith("__"):
+                _wrap_container(value, f"{mod.__name__}.{attr}")
+
+    for mod in modules:
+        for attr, value in list(vars(mod).items()):
+            if inspect.isfunction(value) and id(value) in replace:
+                setattr(mod, attr, replace[id(value)])
+    enabled = True
+
+
+def disable():
+    global enabled
+    if not enabled:
+        return
+    for mod in _traced_modules():
+        for attr, value in list(vars(mod).items()):
+            original = _originals.get(id(value))
+            if original is not None:
+                setattr(mod, attr, original)
+            if isinstance(value, type):
+                for meth, fn in list(vars(value).items()):
+                    original = _originals.get(id(fn))
+                    if original is not None:
+                        setattr(value, meth, original[2])
+    for container, key, pattern in _in_containers:
+        container[key] = pattern
+    _originals.clear()
+    _in_containers.clear()
+    enabled = False
+
+
+# zeroes the counters in place, the wrappers hold on to their lists
+def reset():
+    _events.clear()
+    for stats in _func_stats.values():
+        stats[:] = [0, 0.0]
+    for stats in _regex_stats.values():
+        stats[:] = [0, 0, 0.0]
+
+
+# everything recorded in this process so far, clearing it
+def drain():
+    data = {
+        "events": list(_events),
+        "functions": {k: list(v) for k, v in _func_stats.items() if v[0]},
+        "regex": {k: list(v) for k, v in _regex_stats.items() if v[0]},
+    }
+    reset()
+    return data
+
+
+# folds data from drain() in another process into this one
+def merge(data):
+    _events.extend(data["events"])
+    for name, (calls, total) in data["functions"].items():
+        stats = _func_stats.setdefault(name, [0, 0.0])
+        stats[0] += calls
+        stats[1] += total
+    for name, (calls, matches, total) in data["regex"].items():
+        stats = _regex_stats.setdefault(name, [0, 0, 0.0])
+        stats[0] += calls
+        stats[1] += matches
+        stats[2] += total
+
+
+# pool job wrapper: turns tracing on in the worker and ships its data back
+def run_job(trace, fn, *args):
+    if not trace:
+        return fn(*args), None
+    enable()
+    return fn(*args), drain()
+
+
+# result of a run_job future, merging any worker trace data
+def job_result(future):
+    result, data = future.result()
+    if data is not None:
+        merge(data)
+    return result
+
+
+# chrome trace-event json, stage and regex counters go under otherData
+def write(path):
+    events = list(_events)
+    for pid in sorted({e["pid"] for e in events}):
+        name = "main" if pid == os.getpid() else f"worker {pid}"
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}})
+    trace = {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {
+            "functions": {k: {"calls": c, "total_ms": t / 1000.0}
+                          for k, (c, t) in _func_stats.items() if c},
+            "regex": {k: {"calls": c, "matches": m, "total_ms": t / 1000.0}
+                      for k, (c, m, t) in _regex_stats.items() if c},
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(trace, f)
+
+
+# text table of the slowest stages and regexes (times are inclusive)
+def summary(top=25):
+    out = [f"{'function':<72}{'calls':>9}{'total ms':>12}"]
+    functions = [(name, stats) for name, stats in _func_stats.items() if stats[0]]
+    for name, (calls, total) in sorted(functions, key=lambda kv: -kv[1][1])[:top]:
+        out.append(f"{name:<72}{calls:>9}{total / 1000.0:>12.1f}")
+    out.append("")
+    out.append(f"{'regex':<72}{'calls':>9}{'matches':>9}{'total ms':>12}")
+    patterns = [(name, stats) for name, stats in _regex_stats.items() if stats[0]]
+    for name, (calls, matches, total) in sorted(patterns, key=lambda kv: -kv[1][2])[:top]:
+        out.append(f"{name:<72}{calls:>9}{matches:>9}{total / 1000.0:>12.1f}")
+    return "\n".join(out)
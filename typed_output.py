@@ -0,0 +1,122 @@
+import os
+import re
+
+# typed copy of an extractor's csv table, for loading without re-parsing
+#
+#   counts    "1,945", 404.0, "404"  -> int32
+#   percents  "37%", "52", "<1%"     -> float64, plus a bool "<col> Less Than"
+#                                       column right after it (true for "<1%")
+#   Unit, Year and other text        -> dictionary-encoded
+#
+# blanks are nulls (the flag too), and so is a cell that does not parse, with
+# a warning naming its column, unit and report (the csv is already written by
+# then, so the run carries on). written as parquet or as an uncompressed
+# arrow ipc file, which can be memory-mapped (pyarrow.memory_map) and read
+# without copying. pyarrow is only needed when typed output is asked for.
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+LESS_THAN_SUFFIX = " Less Than"
+
+PERCENT_VALUE = re.compile(r"\s*(<)?\s*(\d+(?:\.\d+)?)\s*%?\s*")
+
+
+# fails before a run, not after it, on a bad format or missing pyarrow
+def check_format(fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown typed output format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("typed output needs pyarrow (pip install pyarrow)") from None
+
+
+def typed_path(csv_path, fmt):
+    return os.path.splitext(csv_path)[0] + FORMATS[fmt]
+
+
+def _blank(value):
+    # pandas fills missing cells with NaN, the scripts with ""
+    return value is None or value != value or str(value).strip() == ""
+
+
+def parse_count(value, column):
+    if _blank(value):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(float(str(value).replace(",", "")))
+    except ValueError:
+        raise ValueError(f"{column}: not a count: {value!r}") from None
+
+
+# (percent, less than) for one cell, (None, None) if it is blank
+def parse_percent(value, column):
+    if _blank(value):
+        return None, None
+    if isinstance(value, (int, float)):
+        return float(value), False
+    m = PERCENT_VALUE.fullmatch(str(value))
+    if not m:
+        raise ValueError(f"{column}: not a percent: {value!r}")
+    return float(m.group(2)), m.group(1) is not None
+
+
+# parse(value, column) for each cell of a column, bad cells become blank
+# (and a warning for the row's unit and report)
+def _parse_column(parse, values, column, blank, where):
+    out = []
+    for i, value in enumerate(values):
+        try:
+            out.append(parse(value, column))
+        except ValueError as e:
+            print(f"warning: {e} ({where(i)}), written as null")
+            out.append(blank)
+    return out
+
+
+# arrow table for a script's output frame, same rows and column order;
+# sources maps a row's Year to the report(s) it came from, for warnings
+def to_table(df, count_columns=(), percent_columns=(), sources=None):
+    import pyarrow as pa
+
+    sources = sources or {}
+    units = df["Unit"].tolist()
+    years = df["Year"].tolist()
+
+    def where(i):
+        return f"{units[i]}, {sources.get(str(years[i]), f'year {years[i]}')}"
+
+    names = []
+    arrays = []
+    for col in df.columns:
+        values = df[col].tolist()
+        if col in count_columns:
+            names.append(col)
+            arrays.append(pa.array(_parse_column(parse_count, values, col, None, where),
+                                   type=pa.int32()))
+        elif col in percent_columns:
+            parsed = _parse_column(parse_percent, values, col, (None, None), where)
+            names += [col, col + LESS_THAN_SUFFIX]
+            arrays.append(pa.array([p for p, _lt in parsed], type=pa.float64()))
+            arrays.append(pa.array([lt for _p, lt in parsed], type=pa.bool_()))
+        elif col == "Year":
+            names.append(col)
+            arrays.append(pa.array([None if _blank(v) else int(v) for v in values],
+                                   type=pa.int16()).dictionary_encode())
+        else:
+            names.append(col)
+            arrays.append(pa.array([None if _blank(v) else str(v) for v in values],
+                                   type=pa.string()).dictionary_encode())
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def write_typed(df, path, fmt, count_columns=(), percent_columns=(), sources=None):
+    table = to_table(df, count_columns, percent_columns, sources)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        import pyarrow as pa
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
@@ -0,0 +1,184 @@
+from functools import lru_cache
+
+# unit names shared by all four scripts: the canonical list, every alias the
+# reports use, and a trie over the aliases so a header or line is recognized
+# in one left-to-right scan instead of a big regex alternation
+
+# order for csv rows
+UNIT_ORDER = [
+    "University-Wide",
+    "College of Agriculture and Natural Resources",
+    "College of Arts and Humanities",
+    "College of Behavioral and Social Sciences",
+    "College of Computer, Mathematical, and Natural Sciences",
+    "College of Education",
+    "College of Information",
+    "The A. James Clark School of Engineering",
+    "Philip Merrill College of Journalism",
+    "School of Architecture, Planning, and Preservation",
+    "School of Public Health",
+    "School of Public Policy",
+    "The Robert H. Smith School of Business",
+    "College Park Scholars",
+    "Honors College",
+    "Letters and Sciences",
+    "Undergraduate Studies"
+]
+unit_mapping = {u.lower(): u for u in UNIT_ORDER}
+
+# all unit names as they appear in reports, matched case-insensitively
+# earlier entries win when several match the start of a text
+# [..] is optional, ~ is an optional space (text is whitespace-normalized)
+UNIT_ALIASES = [
+    "College of Agriculture and Natural Resources",
+    "College of Arts and Humanities",
+    "College of Behavioral and Social Sciences",
+    "College of Computer, Mathematical, and Natural Sciences",
+    "College of Computer, Mathematical,",
+    "College of Computer, Mathematical",
+    "College of Education",
+    "College of Information Studies",
+    "College of Information",
+    "[The ]A[.]~James Clark School of Engineering",
+    "Clark School of Engineering",
+    "Philip Merrill College of Journalism",
+    "Phillip Merrill College of Journalism",
+    "School of Architecture, Planning, and Preservation",
+    "SCHOOL OF ARCHITECTURE, PLANNING",
+    "School of Architecture, Planning and Preservation",
+    "SCHOOL OF ARCHITECTURE,~PLANNING~AND~PRESERVATION",
+    "SCHOOL OF PUBLIC HEALTH",
+    "School of Public Health",
+    "School of Public Policy",
+    "The School of Public Policy",
+    "School of Public Policy and Administration",
+    "The Robert H. Smith School of Business",
+    "College Park Scholars",
+    "Honors College",
+    "Letters~&~Sciences",
+    "Letters and Sciences",
+    "Overall",
+    "University Wide",
+    "University-Wide",
+    "Undergraduate Studies",
+    "Office of Undergraduate Studies",
+    "OFFICE OF UNDERGRADUATE STUDIES",
+]
+
+# non-ascii characters that a case-insensitive match treats as ascii letters
+_FOLD = {"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"}
+
+
+def _fold(c):
+    return c.lower() if c < "\x80" else _FOLD.get(c, c)
+
+
+# every literal spelling of an alias
+def _expand(alias):
+    if not alias:
+        return [""]
+    head = alias[0]
+    if head == "[":
+        end = alias.index("]")
+        rest = _expand(alias[end + 1:])
+        opt = alias[1:end]
+        return [opt + r for r in rest] + rest
+    rest = _expand(alias[1:])
+    if head == "~":
+        return [" " + r for r in rest] + rest
+    return [head + r for r in rest]
+
+
+# nested dicts keyed by folded character, None marks the end of an alias and
+# holds its position in UNIT_ALIASES
+def _build_trie(aliases):
+    root = {}
+    for priority, alias in enumerate(aliases):
+        for spelling in _expand(alias):
+            node = root
+            for c in spelling:
+                node = node.setdefault(_fold(c), {})
+            node[None] = min(node.get(None, priority), priority)
+    return root
+
+
+_TRIE = _build_trie(UNIT_ALIASES)
+
+
+# normalize differences in unit names
+@lru_cache(maxsize=4096)
+def _canonical(name):
+    n = " ".join(name.strip().split()).lower()
+    n = n.replace("&", "and")
+    n = n.replace("university wide", "university-wide")
+    n = n.replace("letters & sciences", "letters and sciences")
+    n = n.replace("college of information studies", "college of information")
+    n = n.replace("school of architecture, planning and preservation",
+                  "school of architecture, planning, and preservation")
+    n = n.replace("phillip merrill college of journalism", "philip merrill college of journalism")
+
+    n = n.replace("office of undergraduate studies", "undergraduate studies")
+    n = n.replace("office of undergrad studies", "undergraduate studies")
+
+    n = n.replace("the school of public policy", "school of public policy")
+    n = n.replace("school of public policy and administration", "school of public policy")
+
+    if "clark school of engineering" in n:
+        n = "the a. james clark school of engineering"
+
+    if n in ["overall"]:
+        n = "university-wide"
+
+    if n in ["a. james clark school of engineering", "james clark school of engineering"]:
+        n = "the a. james clark school of engineering"
+
+    if n.startswith("college of computer, mathematical"):
+        n = "college of computer, mathematical, and natural sciences"
+    if "school of architecture" in n:
+        n = "school of architecture, planning, and preservation"
+
+    return unit_mapping.get(n, None)
+
+
+# canonical UNIT_ORDER name for a unit name, None if it isn't one
+# (pass units to only accept names from a shorter list)
+def normalize_unit(name, units=None):
+    if not name:
+        return None
+    unit = _canonical(name)
+    if units is not None and unit not in units:
+        return None
+    return unit
+
+
+# the alias text starts with (text is whitespace-normalized), taking the
+# earliest entry in UNIT_ALIASES when several fit; "" if none does. not
+# memoized: text is a page's whole top, which hardly ever repeats, and the
+# scan stops at the first character no alias continues with
+def match_unit(text):
+    node = _TRIE
+    best = None
+    end = 0
+    for i, c in enumerate(text):
+        node = node.get(_fold(c))
+        if node is None:
+            break
+        priority = node.get(None)
+        if priority is not None and (best is None or priority < best):
+            best = priority
+            end = i + 1
+    return text[:end]
+
+
+# whether a whole line (whitespace-normalized) is a unit name
+@lru_cache(maxsize=1 << 16)
+def is_unit_line(text):
+    # an empty line counts too, as it did with the old regex
+    if not text:
+        return True
+    node = _TRIE
+    for c in text:
+        node = node.get(_fold(c))
+        if node is None:
+            return False
+    return None in node
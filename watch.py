@@ -0,0 +1,246 @@
+import importlib
+import os
+import time
+import traceback
+
+import report_engine
+import result_cache
+from layout_store import (CachedDocument, cache_path, columns_from_pages, concat_columns,
+                          parse_page_range, read_layout, report_hash, write_layout)
+from page_layout import PageTexts, release_document
+from pdf_backend import open_pdf
+from pipeline import page_count
+from section_index import pin_document, unpin_document
+
+# watch mode: one long-lived process that keeps every report of a folder
+# loaded and the csvs current while reports and extractors change
+#
+#   python cli.py watch -i "Grad Reports" -o out --cache-dir .layouts
+#
+# each report's layout columns (see layout_store), page text, section index
+# and page markers stay in memory, so a report is parsed once per session and
+# the imports and worker pool are paid for once. every POLL_SECONDS:
+#   a new or changed pdf (size / mtime, then content hash) is loaded once it
+#   has stopped changing for a poll, and only that report is extracted; a
+#   removed pdf just drops out
+#   an extractor script that was saved is reloaded and re-run over the loaded
+#   reports, the other extractors are left alone; an edit to a module the
+#   extractors share (even one saved together with the script) needs a
+#   restart, which is said once. only the mtimes of the files an extractor's
+#   fingerprint is read from are looked at each poll, the fingerprint is only
+#   recomputed when one of them moved
+# a csv is only rewritten when its extractor's results changed
+
+POLL_SECONDS = 0.25
+
+
+# a report's content, held for the session
+class HotReport:
+    def __init__(self, path, widths, heights, sections):
+        self.doc = CachedDocument(path, widths, heights, sections)
+        self.texts = PageTexts(self.doc.pages)
+        pin_document(self.texts)
+
+    def drop(self):
+        unpin_document(self.texts)
+        release_document(self.doc)
+        self.doc.close()
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _mtimes(paths):
+    return {path: os.stat(path).st_mtime_ns for path in paths}
+
+
+class Watcher:
+    def __init__(self, folder, out_paths, cache_dir=None, workers=1, typed_format=None, fact_db=None):
+        self.folder = folder
+        self.out_paths = out_paths
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.typed_format = typed_format
+        self.fact_db = fact_db
+        self.extractors = report_engine.load_extractors(out_paths)
+        self.pool = report_engine._pool(workers) if workers > 1 else None
+        self.stamps = {}    # path -> stamp it was loaded at
+        self.settling = {}  # path -> stamp at the last poll, not loaded yet
+        self.loaded = {}    # path -> (digest, year) loaded for it
+        self.hot = {}       # digest -> HotReport
+        self.results = {}   # (digest, year) -> {extractor: document results}
+        self.written = {}   # extractor -> per-report results its csv was written from
+        self.sources = {name: self._source_state(mod) for name, mod in self.extractors}
+
+    # ({file: mtime} of the files its fingerprint is read from, fingerprint of
+    # the code it runs) for an extractor
+    def _source_state(self, mod):
+        return _mtimes(result_cache.fingerprint_files(mod)), result_cache.extractor_fingerprint(mod)
+
+    # layout columns of a report: from the layout cache, else parsed (in page
+    # ranges over the pool when there is one) and added to the cache; a cache
+    # file that can't be read (stale, truncated by an interrupted run) is a
+    # miss and gets overwritten
+    def _layout(self, path, digest):
+        cached = cache_path(self.cache_dir, digest) if self.cache_dir else None
+        if cached and os.path.exists(cached):
+            try:
+                return read_layout(cached)
+            except (OSError, ValueError) as e:
+                print(f"{os.path.basename(path)}: {e}, parsing it again", flush=True)
+        if self.pool is None:
+            with open_pdf(path) as pdf:
+                columns = columns_from_pages(pdf.pages)
+        else:
+            n_pages = self.pool.submit(page_count, path).result()
+            futures = [self.pool.submit(parse_page_range, path, start, end)
+                       for start, end in report_engine.page_ranges(n_pages, self.workers)]
+            columns = concat_columns([f.result() for f in futures])
+        if cached:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_layout(cached, *columns)
+        return columns
+
+    def _extract(self, digest, year, extractors):
+        hot = self.hot[digest]
+        return report_engine.extract_pages(hot.doc.pages, hot.texts, year, extractors)
+
+    # new and changed reports that have settled, (year, path) in folder order
+    def _scan(self, settle):
+        reports = []
+        changed = []
+        for year, path in report_engine.report_files(self.folder):
+            try:
+                stamp = _stamp(path)
+            except FileNotFoundError:
+                continue
+            reports.append((year, path))
+            if stamp == self.stamps.get(path):
+                continue
+            if settle and self.settling.get(path) != stamp:
+                self.settling[path] = stamp
+                continue
+            self.settling.pop(path, None)
+            self.stamps[path] = stamp
+            changed.append((year, path))
+
+        listed = {path for _year, path in reports}
+        for path in [path for path in self.stamps if path not in listed]:
+            del self.stamps[path]
+            self.loaded.pop(path, None)
+        for path in [path for path in self.settling if path not in listed]:
+            del self.settling[path]
+        return reports, changed
+
+    def _load(self, year, path):
+        digest = report_hash(path)
+        if digest not in self.hot:
+            self.hot[digest] = HotReport(path, *self._layout(path, digest))
+        if (digest, year) not in self.results:
+            self.results[(digest, year)] = self._extract(digest, year, self.extractors)
+        self.loaded[path] = (digest, year)
+
+    # reloads extractors whose script alone was saved and re-runs them
+    def _reload_extractors(self):
+        needs_restart = []
+        for name, mod in self.extractors:
+            old_mtimes, old_fingerprint = self.sources[name]
+            try:
+                mtimes = _mtimes(old_mtimes)
+                if mtimes == old_mtimes:
+                    continue
+                fingerprint = result_cache.extractor_fingerprint(mod)
+            except OSError:
+                continue  # mid-save, next poll
+            if fingerprint == old_fingerprint:
+                self.sources[name] = (mtimes, fingerprint)
+                continue
+            script = os.path.abspath(mod.__file__)
+            if any(mtimes[path] != old_mtimes[path] for path in mtimes if path != script):
+                self.sources[name] = (mtimes, fingerprint)
+                needs_restart.append(name)
+                continue
+            try:
+                importlib.reload(mod)
+                rerun = {key: self._extract(*key, [(name, mod)])[name] for key in self.results}
+                for key, results in rerun.items():
+                    self.results[key][name] = results
+            except Exception:
+                traceback.print_exc()
+                print(f"{name}: keeping its earlier results until the script is saved again", flush=True)
+            # the script may import other modules now
+            try:
+                self.sources[name] = self._source_state(mod)
+            except OSError:
+                self.sources[name] = (mtimes, fingerprint)
+        if needs_restart:
+            print(f"a module {', '.join(needs_restart)} use changed, restart the watch to pick it up",
+                  flush=True)
+
+    # drops reports no path refers to anymore
+    def _forget(self):
+        keys = set(self.loaded.values())
+        for key in [key for key in self.results if key not in keys]:
+            del self.results[key]
+        digests = {digest for digest, _year in keys}
+        for digest in [digest for digest in self.hot if digest not in digests]:
+            self.hot.pop(digest).drop()
+
+    # one look at the folder and the extractor scripts; settle=False loads
+    # every changed report right away (the first poll)
+    def poll(self, settle=True):
+        start = time.perf_counter()
+        reports, changed = self._scan(settle)
+        for year, path in changed:
+            try:
+                self._load(year, path)
+            except Exception:
+                traceback.print_exc()
+                print(f"{os.path.basename(path)}: skipped until it changes again", flush=True)
+        self._forget()
+        self._reload_extractors()
+
+        reports = [(year, path) for year, path in reports if path in self.loaded]
+        all_results = [self.results[self.loaded[path]] for _year, path in reports]
+        current = {name: [results[name] for results in all_results] for name, _mod in self.extractors}
+        stale = [(name, mod) for name, mod in self.extractors if current[name] != self.written.get(name)]
+        if not stale:
+            return
+        try:
+            report_engine.write_outputs(reports, stale, all_results, self.out_paths,
+                                        self.typed_format, self.fact_db)
+        except Exception:
+            traceback.print_exc()
+            return
+        for name, _mod in stale:
+            self.written[name] = current[name]
+        names = ", ".join(name for name, _mod in stale)
+        print(f"{time.strftime('%H:%M:%S')} {len(reports)} reports, updated {names} "
+              f"in {time.perf_counter() - start:.2f} s", flush=True)
+
+    def close(self):
+        for hot in self.hot.values():
+            hot.drop()
+        self.hot.clear()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+# runs until interrupted (ctrl-c)
+def watch(folder, out_paths, cache_dir=None, workers=1, typed_format=None, fact_db=None,
+          poll_seconds=POLL_SECONDS):
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    watcher = Watcher(folder, out_paths, cache_dir, workers, typed_format, fact_db)
+    try:
+        watcher.poll(settle=False)
+        print(f"watching {folder}, ctrl-c to stop", flush=True)
+        while True:
+            time.sleep(poll_seconds)
+            watcher.poll()
+    except KeyboardInterrupt:
+        print("stopped")
+    finally:
+        watcher.close()